@@ -0,0 +1,134 @@
+"""
+Throughput benchmark for the outbound call campaign scheduler.
+
+Seeds --restaurants restaurants with --bookings confirmed bookings each
+(--duplicate-rate of them reusing a phone number), creates one
+booking_confirmation campaign per restaurant and drains the queue with a
+CampaignRunner against the local fake VAPI server from bench_vapi. Reports
+calls/second overall and the peak per-restaurant rate, which should sit at
+or under --restaurant-rate.
+
+Needs a MongoDB reachable via MONGODB_URI; point DB_NAME at a scratch
+database. Seeded rows use "bench-" ids and are removed afterwards:
+
+    DB_NAME=bench python -m benchmarks.bench_campaigns --restaurants 5 --bookings 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import date
+
+from aiohttp import web
+
+from benchmarks.bench_vapi import build_stub_app, STUB_HOST, STUB_PORT
+from utils.campaigns import CampaignRunner, enqueue_campaign
+from utils.db import db
+from utils.vapi_client import VAPIClient
+
+DAY = date.today().isoformat()
+
+
+async def seed(args) -> list:
+    campaigns = []
+    for r in range(args.restaurants):
+        restaurant_id = f"bench-r{r}"
+        phones = []
+        bookings = []
+        for b in range(args.bookings):
+            if phones and random.random() < args.duplicate_rate:
+                phone = random.choice(phones)
+            else:
+                phone = f"+1555{r:03d}{b:04d}"
+                phones.append(phone)
+            bookings.append({
+                "_id": f"bench-b{r}-{b}", "restaurant_id": restaurant_id, "date": DAY, "time": "19:00",
+                "party_size": 2, "customer_phone": phone, "status": "confirmed"
+            })
+        await db.bookings.insert_many(bookings)
+        campaign = {
+            "_id": f"bench-c{r}", "restaurant_id": restaurant_id, "kind": "booking_confirmation",
+            "date": DAY, "order_status": "ready", "status": "running", "counts": {}
+        }
+        await db.campaigns.insert_one(campaign)
+        campaigns.append(campaign)
+    return campaigns
+
+
+async def cleanup() -> None:
+    bench = {"$regex": "^bench-"}
+    await db.bookings.delete_many({"_id": bench})
+    await db.campaigns.delete_many({"_id": bench})
+    await db.campaign_jobs.delete_many({"campaign_id": bench})
+
+
+async def run(args) -> None:
+    runner = web.AppRunner(build_stub_app({"latency": args.vapi_latency, "error_rate": args.error_rate}))
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    vapi = VAPIClient(base_url=f"http://{STUB_HOST}:{STUB_PORT}/call")
+    scheduler = CampaignRunner(
+        vapi,
+        workers=args.workers,
+        global_rate=args.global_rate,
+        restaurant_rate=args.restaurant_rate,
+        poll_interval=0.05
+    )
+
+    calls_by_second = defaultdict(int)
+    original_process = scheduler.process
+
+    async def process(job):
+        calls_by_second[(job["restaurant_id"], int(time.perf_counter()))] += 1
+        await original_process(job)
+
+    scheduler.process = process
+
+    await cleanup()
+    try:
+        campaigns = await seed(args)
+        queued = 0
+        for campaign in campaigns:
+            queued += await enqueue_campaign(campaign, "Bench Bistro")
+        print(f"bookings={args.restaurants * args.bookings} jobs_after_dedupe={queued}")
+
+        start = time.perf_counter()
+        scheduler.start()
+        while await db.campaign_jobs.count_documents({"campaign_id": {"$regex": "^bench-"}, "status": {"$in": ["queued", "in_progress"]}}):
+            await asyncio.sleep(0.2)
+        elapsed = time.perf_counter() - start
+        await scheduler.stop()
+
+        outcomes = {}
+        async for row in db.campaign_jobs.aggregate([
+            {"$match": {"campaign_id": {"$regex": "^bench-"}}},
+            {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+        ]):
+            outcomes[row["_id"]] = row["n"]
+        print(f"drained in {elapsed:.1f}s: {queued / elapsed:.1f} calls/s (global limit {args.global_rate}/s)")
+        print(f"peak per-restaurant rate: {max(calls_by_second.values())}/s (limit {args.restaurant_rate}/s)")
+        print(f"outcomes: {outcomes}")
+    finally:
+        await scheduler.stop()
+        await cleanup()
+        await vapi.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=5)
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--global-rate", type=float, default=50)
+    parser.add_argument("--restaurant-rate", type=float, default=10)
+    parser.add_argument("--vapi-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares the old dashboard path (pull raw orders, bucket in Python) with the
+server-side aggregation in utils.rollups and with the pre-aggregated rollups.
+
+Seeds synthetic orders into a scratch database on a local mongod (default
+1,000,000 orders across 50 restaurants and 90 days), then times a 30-day
+dashboard query for one restaurant through each path. Run from backend/:
+
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_dashboard_aggregation --orders 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import utils.rollups as rollups
+
+ITEMS = [("Burger", 9.5), ("Fries", 3.0), ("Cola", 2.0), ("Pizza", 14.0), ("Salad", 8.0), ("Wings", 11.0)]
+
+
+async def seed(db, orders: int, restaurants: int, days: int) -> None:
+    await db.orders.drop()
+    await db.daily_rollups.drop()
+    await db.rollup_status.drop()
+    now = datetime.utcnow()
+    batch = []
+    for i in range(orders):
+        placed = now - timedelta(seconds=random.randrange(days * 86400))
+        items = [
+            {"item": name, "qty": random.randint(1, 3), "price": price}
+            for name, price in random.sample(ITEMS, random.randint(1, 4))
+        ]
+        batch.append({
+            "restaurant_id": f"r{i % restaurants}",
+            "user_id": "bench",
+            "timestamp": placed.isoformat(),
+            "items": items,
+            "refunds": 5.0 if random.random() < 0.02 else 0
+        })
+        if len(batch) == 10000:
+            await db.orders.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.orders.insert_many(batch, ordered=False)
+    await db.orders.create_index([("restaurant_id", 1), ("timestamp", 1)])
+
+
+async def old_path(db, restaurant_id: str, start: datetime, now: datetime, days: int) -> list:
+    """
+    The original get_dashboard_stats loop, without its to_list(1000) truncation
+    """
+    orders = await db.orders.find({
+        "timestamp": {"$gte": start.isoformat(), "$lte": now.isoformat()},
+        "restaurant_id": restaurant_id
+    }).to_list(None)
+    revenue_by_day = [0.0] * days
+    for order in orders:
+        order_date = datetime.fromisoformat(order.get("timestamp", now.isoformat())[:10])
+        day_index = (order_date.date() - start.date()).days
+        if 0 <= day_index < days:
+            revenue_by_day[day_index] += sum(item.get("price", 0) * item.get("qty", 1) for item in order.get("items", []))
+    return revenue_by_day
+
+
+async def timed(label: str, coro_factory, repeats: int) -> None:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append(time.perf_counter() - start)
+    print(f"{label:<22} best={min(samples) * 1000:8.1f}ms mean={sum(samples) / len(samples) * 1000:8.1f}ms")
+
+
+async def main(args) -> None:
+    random.seed(11)
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    db = client[args.db]
+    rollups.db = db
+    if not args.skip_seed:
+        start = time.perf_counter()
+        await seed(db, args.orders, args.restaurants, args.days)
+        print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    now = datetime.utcnow()
+    start = (now - timedelta(days=29)).replace(hour=0, minute=0, second=0, microsecond=0)
+    restaurant_id = "r0"
+
+    await timed("python loop", lambda: old_path(db, restaurant_id, start, now, 30), args.repeats)
+    # The rollups functions bound the app's db as their default at import; pass the scratch one explicitly
+    match = {
+        "restaurant_id": restaurant_id,
+        "timestamp": {"$gte": start.isoformat(), "$lt": (now.date() + timedelta(days=1)).isoformat()}
+    }
+    await timed("aggregation pipeline", lambda: rollups.aggregate_daily_totals(match, database=db), args.repeats)
+    await rollups.backfill()
+    await timed("daily rollups", lambda: rollups.load_daily_rollups(restaurant_id, start.date(), now.date(), database=db), args.repeats)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--db", default="dashboard_bench")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse orders from a previous run")
+    asyncio.run(main(parser.parse_args()))
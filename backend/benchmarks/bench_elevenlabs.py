@@ -0,0 +1,92 @@
+"""
+Benchmarks ElevenLabsClient against a local stub TTS server.
+
+Fires N concurrent synthesis calls through the pooled async client and reports
+p50/p99 latency. Run from backend/:
+
+    python -m benchmarks.bench_elevenlabs --calls 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from aiohttp import web
+
+from utils.elevenlabs_client import ElevenLabsClient
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+
+
+def build_stub_app(latency: float, audio_bytes: int) -> web.Application:
+    """
+    Stub of the ElevenLabs text-to-speech API: waits `latency` seconds, then
+    streams `audio_bytes` of fake mp3 data in small chunks.
+    """
+    chunk = b"\xff" * 1024
+
+    async def tts(request: web.Request) -> web.StreamResponse:
+        await request.json()
+        await asyncio.sleep(latency)
+        response = web.StreamResponse(headers={"Content-Type": "audio/mpeg"})
+        await response.prepare(request)
+        sent = 0
+        while sent < audio_bytes:
+            await response.write(chunk)
+            sent += len(chunk)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/text-to-speech/{voice_id}", tts)
+    app.router.add_post("/v1/text-to-speech/{voice_id}/stream", tts)
+    return app
+
+
+async def run(calls: int, latency: float, audio_bytes: int, concurrency: int) -> None:
+    runner = web.AppRunner(build_stub_app(latency, audio_bytes))
+    await runner.setup()
+    site = web.TCPSite(runner, STUB_HOST, STUB_PORT)
+    await site.start()
+
+    os.environ.setdefault("ELEVENLABS_API_KEY", "bench-key")
+    os.environ.setdefault("ELEVENLABS_VOICE_ID", "bench-voice")
+    client = ElevenLabsClient(
+        max_concurrency=concurrency,
+        base_url=f"http://{STUB_HOST}:{STUB_PORT}/v1/text-to-speech"
+    )
+
+    async def one_call(i: int) -> float:
+        start = time.perf_counter()
+        size = 0
+        async for chunk in client.stream(f"Benchmark utterance number {i}"):
+            size += len(chunk)
+        assert size >= audio_bytes
+        return time.perf_counter() - start
+
+    try:
+        # Warm the keep-alive pool so we measure steady state, not handshakes
+        await one_call(-1)
+        wall_start = time.perf_counter()
+        latencies = await asyncio.gather(*(one_call(i) for i in range(calls)))
+        wall = time.perf_counter() - wall_start
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))]
+    print(f"calls={calls} concurrency_limit={concurrency} stub_latency={latency * 1000:.0f}ms")
+    print(f"p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms wall={wall * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="Stub server latency in seconds")
+    parser.add_argument("--audio-bytes", type=int, default=32 * 1024)
+    parser.add_argument("--concurrency", type=int, default=50, help="Client semaphore size")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.latency, args.audio_bytes, args.concurrency))
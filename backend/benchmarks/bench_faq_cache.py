@@ -0,0 +1,128 @@
+"""
+Hit rate of the FAQ answer cache on a replayed stream of caller questions.
+
+Draws --calls questions for --restaurants restaurants from a bank of common
+questions, each asked in several wordings (filler words, plurals, different
+openings) plus opening-hours questions. Some groups differ only by a
+number or a negation ("12 inch" / "16 inch pizza", "party of 10" / "party
+of 20"). Every miss goes to a fake LLM that sleeps --llm-latency-ms and
+returns an answer unique to the question's group, so a cached answer
+served for the wrong group is counted as a wrong answer. Halfway through,
+one restaurant's menu changes, so its cached answers are invalidated.
+Reports answers by source, the hit rate, the LLM calls avoided and the
+wrong-answer rate, with the similarity tier on and off:
+
+    python -m benchmarks.bench_faq_cache --calls 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from utils.faq_cache import FAQCache, np
+from utils.restaurant_directory import RestaurantContext
+
+OPENINGS = ["", "hi ", "hey, ", "um, ", "hello, could you tell me ", "I was wondering "]
+QUESTIONS = [
+    ["do you have vegan options", "do you guys have any vegan options", "have you got a vegan option"],
+    ["do you have vegan pizza", "do you have any vegan pizzas", "is there a vegan pizza"],
+    ["do you take reservations", "do you guys take reservations", "do you take a reservation"],
+    ["is there parking", "is there any parking", "is there parking please"],
+    ["can I bring my dog", "can we bring our dog", "can I bring my dogs"],
+    ["do you deliver", "do you guys deliver", "do you deliver please"],
+    ["where are you located", "where are you guys located", "where exactly are you located"],
+    ["do you have a kids menu", "do you have a kid menu", "is there a kids menu"],
+    ["are your fries gluten free", "are the fries gluten free", "is your fries gluten free"],
+    ["do you have wifi", "do you have free wifi", "is there wifi"],
+    # Near neighbours whose answers differ
+    ["how much is the 12 inch pizza", "how much is a 12 inch pizza", "how much are the 12 inch pizzas"],
+    ["how much is the 16 inch pizza", "how much is a 16 inch pizza", "how much are the 16 inch pizzas"],
+    ["do you have a table for 2 tonight", "have you got a table for 2 tonight", "is there a table for 2 tonight"],
+    ["do you have a table for 8 tonight", "have you got a table for 8 tonight", "is there a table for 8 tonight"],
+    ["can you take a party of 10", "can you fit a party of 10", "can we book a party of 10"],
+    ["can you take a party of 20", "can you fit a party of 20", "can we book a party of 20"],
+    ["is the curry spicy", "is your curry spicy", "is the curry very spicy"],
+    ["is the curry not spicy", "is your curry not spicy", "is the curry not very spicy"],
+]
+HOURS_QUESTIONS = ["are you open sunday", "what time do you close tonight", "what are your hours", "are you open right now"]
+
+
+def make_restaurants(count: int) -> list:
+    return [
+        RestaurantContext({
+            "_id": f"bench-r{r}",
+            "name": f"Bench Bistro {r}",
+            "hours": {"mon-fri": "11-10", "sat": "10am-11pm", "sun": "closed"},
+            "menu": ["margherita", "vegan pizza", "fries"]
+        })
+        for r in range(count)
+    ]
+
+
+def question_stream(args) -> list:
+    stream = []
+    for _ in range(args.calls):
+        if random.random() < args.hours_share:
+            group, question = None, random.choice(HOURS_QUESTIONS)
+        else:
+            # A few popular questions dominate, as they do on real lines
+            group = random.choices(range(len(QUESTIONS)), weights=[1 / (i + 1) ** 0.5 for i in range(len(QUESTIONS))])[0]
+            question = random.choice(QUESTIONS[group])
+        stream.append((random.randrange(args.restaurants), group, random.choice(OPENINGS) + question + "?"))
+    return stream
+
+
+async def replay(cache: FAQCache, restaurants: list, stream: list, args) -> dict:
+    latencies = []
+    wrong = 0
+
+    def fake_llm(group):
+        async def generate() -> str:
+            await asyncio.sleep(args.llm_latency_ms / 1000)
+            return f"Answer to question group {group}."
+        return generate
+
+    now = datetime(2024, 6, 1, 19, 0)
+    for i, (r, group, question) in enumerate(stream):
+        if i == len(stream) // 2:
+            restaurants[0].restaurant["menu"] = restaurants[0].restaurant["menu"] + ["tiramisu"]
+        start = time.perf_counter()
+        answer, source = await cache.answer(restaurants[r], question, fake_llm(group), now=now)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if group is not None and answer != f"Answer to question group {group}.":
+            wrong += 1
+    latencies.sort()
+    return {**cache.snapshot(), "p50_ms": round(latencies[len(latencies) // 2], 2), "wrong": wrong}
+
+
+async def run(args) -> None:
+    stream = question_stream(args)
+    modes = [("exact + hours", False)]
+    if np is not None:
+        modes.append(("exact + hours + similarity", True))
+    else:
+        print("numpy is not installed; skipping the similarity tier")
+    for label, semantic in modes:
+        cache = FAQCache()
+        cache.semantic = semantic
+        stats = await replay(cache, make_restaurants(args.restaurants), stream, args)
+        print(f"{label}: hit rate {stats['hit_rate']:.1%}, LLM calls {stats['llm']} "
+              f"(avoided {stats['llm_calls_avoided']} of {args.calls}), p50 {stats['p50_ms']}ms")
+        print(f"    by source: hours={stats['hours']} exact={stats['exact']} similar={stats['similar']} "
+              f"llm={stats['llm']} invalidations={stats['invalidations']}")
+        print(f"    wrong answers: {stats['wrong']} ({stats['wrong'] / args.calls:.2%} of calls)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--restaurants", type=int, default=5)
+    parser.add_argument("--hours-share", type=float, default=0.3)
+    parser.add_argument("--llm-latency-ms", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
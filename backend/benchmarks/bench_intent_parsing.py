@@ -0,0 +1,116 @@
+"""
+Intent reply parsing: single-pass validation and bounded repair versus
+re-asking the caller.
+
+Generates --replies simulated GPT intent replies, --bad-rate of which
+are invalid: malformed JSON, a 12-hour time, an empty order, or free text
+in place of a function call. Each reply is measured two ways:
+
+- parse cost: json.loads followed by model validation, versus
+  IntentAdapter.validate_json in one pass;
+- round trips: re-asking the caller costs a whole extra turn (--reask-ms
+  for the prompt, the caller speaking again, transcription and the LLM),
+  while IntentParser sends one repair call (--llm-ms). The simulated
+  model fixes a reply on repair with probability --repair-success.
+
+    python -m benchmarks.bench_intent_parsing --replies 2000 --bad-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from models.intent import IntentAdapter, QuestionIntent
+from utils.intent_parser import FUNCTION_NAME, IntentParser
+
+GOOD = [
+    '{"intent": "order", "items": [{"item": "Cheeseburger", "quantity": 2}, {"item": "Cola", "quantity": 1}], "special_instructions": "no onions"}',
+    '{"intent": "booking", "date": "2024-06-01", "time": "19:30", "party_size": 4}',
+    '{"intent": "question", "question": "what time do you close", "topic": "hours"}',
+]
+BAD = [
+    '{"intent": "order", "items": [{"item": "Cheeseburger", "quantity": 2}',
+    '{"intent": "booking", "date": "2024-06-01", "time": "7:30pm", "party_size": 4}',
+    '{"intent": "order", "items": []}',
+    None,
+]
+
+
+def reply(arguments) -> dict:
+    if arguments is None:
+        return {"role": "assistant", "content": "Sure, I can help with that booking."}
+    return {"role": "assistant", "content": None, "function_call": {"name": FUNCTION_NAME, "arguments": arguments}}
+
+
+def parse_cost(arguments: list, rounds: int) -> tuple:
+    """
+    Mean microseconds per reply for two-pass and single-pass parsing
+    """
+    def two_pass(raw):
+        try:
+            IntentAdapter.validate_python(json.loads(raw))
+        except Exception:
+            pass
+
+    def one_pass(raw):
+        try:
+            IntentAdapter.validate_json(raw)
+        except Exception:
+            pass
+
+    results = []
+    for parse in (two_pass, one_pass):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for raw in arguments:
+                parse(raw)
+        results.append((time.perf_counter() - start) / (rounds * len(arguments)) * 1e6)
+    return results
+
+
+async def run(args) -> None:
+    random.seed(args.seed)
+    first = [random.choice(BAD) if random.random() < args.bad_rate else random.choice(GOOD) for _ in range(args.replies)]
+    two_pass_us, one_pass_us = parse_cost([raw for raw in first if raw is not None], args.parse_rounds)
+
+    parser = IntentParser(max_repairs=1)
+    added_ms = []
+    reask_ms = []
+    for arguments in first:
+        fixed = random.random() < args.repair_success
+        replies = iter([reply(arguments), reply(random.choice(GOOD) if fixed else random.choice(BAD))])
+
+        async def complete(messages):
+            return next(replies)
+
+        _, result = await parser.run([{"role": "user", "content": "caller"}], complete, QuestionIntent())
+        added_ms.append(args.llm_ms if result != "ok" else 0.0)
+        reask_ms.append(args.reask_ms if result != "ok" else 0.0)
+
+    snapshot = parser.snapshot()
+    print(f"{args.replies} replies, {args.bad_rate:.0%} invalid on the first try")
+    print(f"parse: json.loads + validate {two_pass_us:.1f}us, validate_json {one_pass_us:.1f}us per reply")
+    print(f"outcomes: ok {snapshot.get('ok', 0)}, repaired {snapshot.get('repaired', 0)}, "
+          f"failed {snapshot.get('failed', 0)} (answered as a question), "
+          f"wasted round trips {snapshot['wasted_round_trips']}")
+    print(f"added latency per call: repair {statistics.mean(added_ms):.1f}ms mean vs re-ask "
+          f"{statistics.mean(reask_ms):.1f}ms mean; per affected call {args.llm_ms:.0f}ms vs {args.reask_ms:.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--bad-rate", type=float, default=0.05)
+    parser.add_argument("--repair-success", type=float, default=0.9)
+    parser.add_argument("--llm-ms", type=float, default=900)
+    parser.add_argument("--reask-ms", type=float, default=7000)
+    parser.add_argument("--parse-rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Offline harness for the Media Streams voice pipeline.
+
+Drives MediaStreamSession with the Twilio event protocol, using fake STT, LLM
+and TTS providers with configurable latencies, and reports time-to-first-audio
+(measured from the end of the caller's utterance) against the serial
+record -> transcribe -> GPT -> synthesize flow. Exits non-zero if the streamed
+time-to-first-audio exceeds --max-ttfa-ms, so it can run as a regression check.
+
+With the default fake latencies a streamed turn cannot beat about 700ms:
+STT 150ms, LLM first token 250ms, the nine tokens of the first sentence at
+20ms each, then TTS first byte 120ms. The serial flow takes about 990ms.
+The budget below leaves room for scheduling jitter; tighten it along with
+the latencies when modelling faster providers. Run from backend/:
+
+    python -m benchmarks.bench_media_stream --turns 5 --max-ttfa-ms 800
+"""
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import sys
+import time
+
+from utils.voice_pipeline import MediaStreamSession, FRAME_MS
+
+SPEECH_FRAME = b"\x00" * 160  # loudest mu-law value
+SILENCE_FRAME = b"\xff" * 160  # mu-law zero
+REPLY = (
+    "Sure, I have added two cheeseburgers to your order. "
+    "Would you like any drinks with that? "
+    "Your total so far is eighteen dollars."
+)
+
+
+class FakeSTT:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def transcribe(self, audio: bytes) -> str:
+        await asyncio.sleep(self.latency)
+        return "I'd like two cheeseburgers please."
+
+
+class FakeLLM:
+    def __init__(self, first_token: float, per_token: float):
+        self.first_token = first_token
+        self.per_token = per_token
+
+    async def stream(self, messages):
+        await asyncio.sleep(self.first_token)
+        for word in REPLY.split(" "):
+            await asyncio.sleep(self.per_token)
+            yield word + " "
+
+
+class FakeTTS:
+    def __init__(self, first_byte: float, per_chunk: float, chunks: int = 5):
+        self.first_byte = first_byte
+        self.per_chunk = per_chunk
+        self.chunks = chunks
+
+    async def stream(self, text: str):
+        await asyncio.sleep(self.first_byte)
+        for _ in range(self.chunks):
+            yield SILENCE_FRAME
+            await asyncio.sleep(self.per_chunk)
+
+
+def media(frame: bytes) -> str:
+    return json.dumps({"event": "media", "media": {"payload": base64.b64encode(frame).decode("ascii")}})
+
+
+async def streamed_turn(stt, llm, tts) -> float:
+    inbound: asyncio.Queue = asyncio.Queue()
+    turn_done = asyncio.Event()
+
+    async def send_text(message: str) -> None:
+        if json.loads(message)["event"] == "mark":
+            turn_done.set()
+
+    session = MediaStreamSession(stt, llm, tts, send_text)
+    await inbound.put(json.dumps({"event": "start", "start": {"streamSid": "MZbench", "customParameters": {}}}))
+    for _ in range(1000 // FRAME_MS):
+        await inbound.put(media(SPEECH_FRAME))
+    for _ in range(1000 // FRAME_MS):
+        await inbound.put(media(SILENCE_FRAME))
+
+    runner = asyncio.create_task(session.run(inbound.get))
+    await asyncio.wait_for(turn_done.wait(), timeout=30)
+    await inbound.put(json.dumps({"event": "stop"}))
+    await runner
+    await session.close()
+    return session.turns[0]["first_audio"]
+
+
+async def serial_turn(stt, llm, tts) -> float:
+    """
+    The turn-based webhook: every stage waits for the previous one to finish.
+    """
+    start = time.perf_counter()
+    text = await stt.transcribe(b"")
+    reply = "".join([token async for token in llm.stream([{"role": "user", "content": text}])])
+    async for _ in tts.stream(reply):
+        break
+    return time.perf_counter() - start
+
+
+async def run(args) -> int:
+    stt = FakeSTT(args.stt_ms / 1000)
+    llm = FakeLLM(args.llm_first_token_ms / 1000, args.llm_token_ms / 1000)
+    tts = FakeTTS(args.tts_first_byte_ms / 1000, args.tts_chunk_ms / 1000)
+
+    streamed = [await streamed_turn(stt, llm, tts) for _ in range(args.turns)]
+    serial = [await serial_turn(stt, llm, tts) for _ in range(args.turns)]
+
+    streamed_p50 = statistics.median(streamed) * 1000
+    serial_p50 = statistics.median(serial) * 1000
+    print(f"turns={args.turns}")
+    print(f"serial   time-to-first-audio p50={serial_p50:.1f}ms")
+    print(f"streamed time-to-first-audio p50={streamed_p50:.1f}ms (max {max(streamed) * 1000:.1f}ms)")
+    if args.max_ttfa_ms and max(streamed) * 1000 > args.max_ttfa_ms:
+        print(f"FAIL: streamed time-to-first-audio exceeds {args.max_ttfa_ms}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--stt-ms", type=float, default=150)
+    parser.add_argument("--llm-first-token-ms", type=float, default=250)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=120)
+    parser.add_argument("--tts-chunk-ms", type=float, default=20)
+    parser.add_argument("--max-ttfa-ms", type=float, default=0, help="Fail if streamed time-to-first-audio exceeds this")
+    sys.exit(asyncio.run(run(parser.parse_args())))
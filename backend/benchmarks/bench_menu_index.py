@@ -0,0 +1,146 @@
+"""
+Benchmarks MenuIndex matching against the old exact-lowercase dict lookup.
+
+Builds a synthetic 2,000-item menu and a 10,000-utterance corpus of the ways
+callers actually say item names (plurals, articles, synonyms, split compound
+words, typos), then reports match rate and per-lookup microseconds. A
+small real-world menu then checks the hard cases one by one: partial names
+("fries" for "French Fries"), plural synonyms ("chips"), spelled-out
+quantities ("two tacos") and ambiguous words ("chicken" on a menu with
+several chicken items), which must match nothing. Run from backend/:
+
+    python -m benchmarks.bench_menu_index --items 2000 --utterances 10000
+"""
+import argparse
+import random
+import time
+
+from utils.menu_index import MenuIndex
+
+SIZES = ["", "small ", "large ", "double ", "kids "]
+FLAVORS = [
+    "classic", "spicy", "bbq", "garlic", "smoked", "crispy", "grilled", "honey", "lemon", "truffle",
+    "cajun", "teriyaki", "buffalo", "pesto", "chipotle", "maple", "sesame", "mango", "ginger", "black pepper"
+]
+BASES = [
+    "cheeseburger", "chicken wings", "french fries", "hot dog", "milkshake", "iced tea", "cola",
+    "pepperoni pizza", "caesar salad", "fish taco", "onion rings", "chicken sandwich", "veggie wrap",
+    "pancakes", "brownie", "lemonade", "nachos", "quesadilla", "meatball sub", "club sandwich"
+]
+SPOKEN = {"cola": "coke", "milkshake": "shake", "veggie wrap": "veg wrap", "hot dog": "hotdog", "cheeseburger": "cheese burger"}
+
+HARD_MENU = ["Cheeseburger", "French Fries", "Large Onion Rings", "Cola", "Fish Taco", "Chicken Wings", "Chicken Sandwich",
+             "Spicy Chicken Wings", "Pepperoni Pizza", "Margherita Pizza", "Onion Rings", "Milkshake"]
+# (utterance, expected item name, or None when it must not match anything)
+HARD_CASES = [
+    ("fries", "French Fries"),
+    ("chips", "French Fries"),
+    ("some chips please", "French Fries"),
+    ("two tacos", "Fish Taco"),
+    ("three cheeseburgers", "Cheeseburger"),
+    ("two cokes", "Cola"),
+    ("twelve onion rings", "Onion Rings"),
+    ("shakes", "Milkshake"),
+    ("chicken wings", "Chicken Wings"),
+    ("spicy wings", "Spicy Chicken Wings"),
+    ("chicken", None),
+    ("pizza", None),
+    ("wings", None),
+    ("large", None),
+    ("a small one", None),
+]
+
+
+def build_menu(count: int):
+    names = []
+    for size in SIZES:
+        for flavor in FLAVORS:
+            for base in BASES:
+                names.append(f"{size}{flavor} {base}".strip())
+    random.shuffle(names)
+    return [
+        {"_id": f"item{i}", "restaurant_id": "bench", "name": name.title(), "price": round(random.uniform(2, 25), 2), "available": True}
+        for i, name in enumerate(names[:count])
+    ]
+
+
+def pluralize(name: str) -> str:
+    if name.endswith(("s", "h")):
+        return name + "es"
+    if name.endswith("y"):
+        return name[:-1] + "ies"
+    return name + "s"
+
+
+def typo(name: str) -> str:
+    position = random.randrange(1, len(name) - 1)
+    if random.random() < 0.5:
+        return name[:position] + name[position + 1:]
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def spoken_variant(name: str) -> str:
+    name = name.lower()
+    kind = random.randrange(6)
+    if kind == 0:
+        return name
+    if kind == 1:
+        return pluralize(name)
+    if kind == 2:
+        return random.choice(["a ", "the ", "some ", "two "]) + name
+    if kind == 3:
+        for written, spoken in SPOKEN.items():
+            if written in name:
+                return name.replace(written, spoken)
+        return pluralize(name)
+    if kind == 4:
+        return typo(name)
+    return f"{random.choice(['one', 'a'])} {pluralize(name)} please"
+
+
+def main(items: int, utterances: int) -> None:
+    random.seed(7)
+    menu = build_menu(items)
+    corpus = []
+    for _ in range(utterances):
+        item = random.choice(menu)
+        corpus.append((spoken_variant(item["name"]), item["_id"]))
+
+    start = time.perf_counter()
+    index = MenuIndex(menu)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Old behaviour: exact lowercase dict rebuilt per order
+    exact = {item["name"].lower(): item for item in menu}
+    start = time.perf_counter()
+    exact_hits = sum(1 for text, expected in corpus if (exact.get(text) or {}).get("_id") == expected)
+    exact_us = (time.perf_counter() - start) / len(corpus) * 1e6
+
+    start = time.perf_counter()
+    results = [(index.match(text), expected) for text, expected in corpus]
+    index_us = (time.perf_counter() - start) / len(corpus) * 1e6
+    index_hits = sum(1 for match, expected in results if match and match[0]["_id"] == expected)
+    misses = sum(1 for match, _ in results if match is None)
+
+    print(f"menu_items={len(menu)} utterances={len(corpus)} index_build={build_ms:.1f}ms")
+    print(f"exact dict : match_rate={exact_hits / len(corpus):.1%} lookup={exact_us:.2f}us")
+    print(f"menu index : match_rate={index_hits / len(corpus):.1%} no_match={misses / len(corpus):.1%} lookup={index_us:.2f}us")
+
+    hard = MenuIndex([{"_id": str(i), "name": name, "price": 5.0} for i, name in enumerate(HARD_MENU)])
+    passed = 0
+    for text, expected in HARD_CASES:
+        match = hard.match(text)
+        got = match[0]["name"] if match else None
+        if got == expected:
+            passed += 1
+        else:
+            print(f"  hard case {text!r}: expected {expected}, got {got}")
+    print(f"hard cases : {passed}/{len(HARD_CASES)} correct")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--utterances", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.items, args.utterances)
@@ -0,0 +1,103 @@
+"""
+Webhook latency while a burst of logins is being verified.
+
+Fires --logins concurrent bcrypt verifications (a shift-change login burst)
+and, at the same time, a stream of simulated voice webhooks that each do
+--webhook-io-ms of awaited I/O. Reports webhook latency percentiles and login
+outcomes for bcrypt run inline on the event loop (the old handlers) versus
+through the bounded PasswordPool:
+
+    python -m benchmarks.bench_password_pool --logins 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from utils.password_pool import PasswordPool, PasswordPoolSaturated
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(mode: str, context: CryptContext, password_hash: str, args) -> dict:
+    pool = PasswordPool(context, workers=args.workers, max_queue=args.max_queue) if mode == "pool" else None
+    outcomes = {"ok": 0, "rejected": 0}
+    webhook_latencies = []
+    logins_done = asyncio.Event()
+
+    async def login():
+        # Yield first so logins interleave with webhooks as they would in a server
+        await asyncio.sleep(0)
+        try:
+            if pool is None:
+                context.verify(PASSWORD, password_hash)
+            else:
+                await pool.verify(PASSWORD, password_hash)
+            outcomes["ok"] += 1
+        except PasswordPoolSaturated:
+            outcomes["rejected"] += 1
+
+    async def webhook():
+        start = time.perf_counter()
+        await asyncio.sleep(args.webhook_io_ms / 1000)
+        webhook_latencies.append((time.perf_counter() - start) * 1000)
+
+    async def webhook_traffic():
+        pending = []
+        while not logins_done.is_set():
+            pending.append(asyncio.create_task(webhook()))
+            await asyncio.sleep(args.webhook_interval_ms / 1000)
+        await asyncio.gather(*pending)
+
+    traffic = asyncio.create_task(webhook_traffic())
+    await asyncio.sleep(args.webhook_interval_ms / 1000)
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    logins_done.set()
+    await traffic
+    if pool is not None:
+        pool.shutdown()
+
+    return {
+        "mode": mode,
+        "burst_s": elapsed,
+        "webhooks": len(webhook_latencies),
+        "p50": statistics.median(webhook_latencies),
+        "p95": percentile(webhook_latencies, 95),
+        "max": max(webhook_latencies),
+        **outcomes
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=200, help="set below --logins to see 429 backpressure")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor for the benchmark hash")
+    parser.add_argument("--webhook-io-ms", type=float, default=5)
+    parser.add_argument("--webhook-interval-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    password_hash = context.hash(PASSWORD)
+
+    print(f"{'mode':<8}{'burst s':>9}{'webhooks':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'ok':>6}{'429':>6}")
+    for mode in ("inline", "pool"):
+        r = asyncio.run(run(mode, context, password_hash, args))
+        print(
+            f"{r['mode']:<8}{r['burst_s']:>9.2f}{r['webhooks']:>10}{r['p50']:>9.1f}"
+            f"{r['p95']:>9.1f}{r['max']:>9.1f}{r['ok']:>6}{r['rejected']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Prompt size and simulated time-to-first-token: whole-menu prompts versus
+the token-budgeted PromptContextBuilder.
+
+For each menu size in --sizes, builds --utterances caller turns that
+mention one to three items. Each turn is prompted two ways: the old
+question prompt, which interpolated the whole menu, and the builder's
+cached prefix plus the relevant menu slice. Both go to a local fake LLM
+whose time to first token grows with prompt length (--base-ms plus
+--prefill-us per prompt token; it only sleeps that long with --realtime).
+Callers name items in full, by the end of a two-word dish name ("spicy
+wings" for "Spicy Chicken Wings", "fries" for "French Fries") or by a spoken synonym ("coke", "shake"). The
+benchmark reports how often each kind of mention made it into the slice,
+and the builder's own cost. Questions about a dietary tag or category
+("do you have vegan options?") name no item; for those it reports how
+many of the slice's items carry what was asked for, and how much of the
+slice those items fill:
+
+    python -m benchmarks.bench_prompt_context --sizes 20 200 2000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+
+from benchmarks.bench_menu_index import BASES, SPOKEN, build_menu
+from utils.menu_index import MenuIndex
+from utils.prompt_context import PromptContextBuilder, count_tokens
+from utils.restaurant_directory import RestaurantContext
+
+CATEGORIES = ["Burgers", "Sides", "Drinks", "Pizza", "Salads", "Desserts", "Sandwiches"]
+TEMPLATES = ["can I get {}", "I'd like {} please", "do you have {}", "how much is {}", "I want to order {}"]
+MENTIONS = ("full", "partial", "synonym")
+DIETARY = [("vegetarian", 5), ("vegan", 11), ("gluten-free", 7)]
+ATTRIBUTE_TEMPLATES = ["do you have {} options", "what {} dishes do you have", "which {} do you have"]
+
+
+def mention(name: str) -> tuple:
+    """
+    (kind, spoken form) for one way a caller might name an item
+    """
+    name = name.lower()
+    kind = random.choice(MENTIONS)
+    if kind == "partial":
+        # Callers drop the generic part of a name, not the flavor that tells items apart
+        for base in BASES:
+            if name.endswith(base) and " " in base:
+                return kind, name[:-len(base)] + base.split()[-1]
+    if kind == "synonym":
+        for written, spoken in SPOKEN.items():
+            if written in name:
+                return kind, name.replace(written, spoken)
+    return "full", name
+
+
+def legacy_prompt(restaurant: dict, menu: list, utterance: str) -> list:
+    prompt = f"""
+    Answer the following question about this restaurant:
+    Restaurant Info:
+    Name: {restaurant["name"]}
+    Hours: {restaurant["hours"]}
+    Menu: {menu}
+
+    Question: {utterance}
+    """
+    return [
+        {"role": "system", "content": "You are a helpful restaurant assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def fake_llm(messages: list, args) -> float:
+    """
+    Returns the simulated time to first token (ms) for a prompt
+    """
+    tokens = sum(count_tokens(message["content"]) for message in messages)
+    ttft = args.base_ms + tokens * args.prefill_us / 1000
+    if args.realtime:
+        await asyncio.sleep(ttft / 1000)
+    return ttft
+
+
+async def run_size(size: int, builder: PromptContextBuilder, args) -> None:
+    menu = build_menu(size)
+    for i, item in enumerate(menu):
+        item["category"] = CATEGORIES[i % len(CATEGORIES)]
+        item["description"] = f"House {item['name'].lower()} made fresh to order"
+        item["dietary"] = [tag for tag, every in DIETARY if i % every == 0]
+    index = MenuIndex(menu)
+    restaurant = {
+        "_id": f"bench-{size}", "name": "Bench Bistro",
+        "hours": {"mon-fri": "11-10", "sat-sun": "10am-11pm"}, "menu": menu
+    }
+    context = RestaurantContext(restaurant)
+
+    legacy_tokens, builder_tokens, legacy_ttft, builder_ttft, build_us = [], [], [], [], []
+    recalled, named = Counter(), Counter()
+    truncated = 0
+    for _ in range(args.utterances):
+        picks = random.sample(menu, random.randint(1, min(3, len(menu))))
+        mentions = [mention(item["name"]) for item in picks]
+        utterance = random.choice(TEMPLATES).format(" and ".join(f"a {spoken}" for _, spoken in mentions))
+
+        messages = legacy_prompt(restaurant, menu, utterance)
+        legacy_tokens.append(sum(count_tokens(m["content"]) for m in messages))
+        legacy_ttft.append(await fake_llm(messages, args))
+
+        start = time.perf_counter()
+        built = builder.build(context, index, "question", utterance)
+        build_us.append((time.perf_counter() - start) * 1e6)
+        builder_tokens.append(built.tokens)
+        builder_ttft.append(await fake_llm(built.messages, args))
+        truncated += built.truncated
+        slice_text = built.messages[1]["content"]
+        for item, (kind, _) in zip(picks, mentions):
+            named[kind] += 1
+            recalled[kind] += f"{item['name']} |" in slice_text
+
+    # Attribute questions: share of slice items that carry the tag or category asked about,
+    # and of the slice room (matching items, up to max_items) they fill
+    precise = filled = 0.0
+    for _ in range(args.utterances):
+        if random.random() < 0.5:
+            tag = random.choice(DIETARY)[0]
+            wanted = {item["name"] for item in menu if tag in item["dietary"]}
+        else:
+            tag = random.choice(CATEGORIES).lower()
+            wanted = {item["name"] for item in menu if item["category"].lower() == tag}
+        built = builder.build(context, index, "question", random.choice(ATTRIBUTE_TEMPLATES).format(tag))
+        shown = [line.split(" | ")[0] for line in built.messages[1]["content"].splitlines() if " | " in line]
+        hits = sum(1 for name in shown if name in wanted)
+        precise += hits / len(shown) if shown else 0.0
+        filled += hits / min(len(wanted), builder.max_items)
+
+    kept = ", ".join(f"{kind} {recalled[kind] / named[kind]:.0%}" for kind in MENTIONS if named[kind])
+    print(f"{size:>5} items | whole menu: {statistics.mean(legacy_tokens):8.0f} tokens, "
+          f"ttft {statistics.mean(legacy_ttft):7.1f}ms | builder: {statistics.mean(builder_tokens):5.0f} tokens, "
+          f"ttft {statistics.mean(builder_ttft):6.1f}ms, build {statistics.median(build_us):6.0f}us, "
+          f"named items kept {sum(recalled.values()) / sum(named.values()):.0%} ({kept}), "
+          f"over budget {truncated}/{args.utterances}")
+    print(f"{'':>5}       | attribute questions: {precise / args.utterances:.0%} of listed items match, "
+          f"{filled / args.utterances:.0%} of the room filled by matches")
+
+
+async def run(args) -> None:
+    builder = PromptContextBuilder(token_budget=args.budget)
+    print(f"token budget {builder.token_budget}, fake LLM ttft = {args.base_ms}ms + {args.prefill_us}us/token")
+    for size in args.sizes:
+        await run_size(size, builder, args)
+    print(f"prefix cache: {builder.snapshot()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--utterances", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=None)
+    parser.add_argument("--base-ms", type=float, default=150)
+    parser.add_argument("--prefill-us", type=float, default=50)
+    parser.add_argument("--realtime", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Receipt rendering throughput, in receipts per second per core.
+
+Renders --orders synthetic orders spread over --restaurants restaurants into
+a scratch directory, first inline on one core (render_to_files in this
+process) and then through ReceiptRenderer.render_batch with 1, 2, ... up to
+--workers processes. A second pass over the same orders shows the cost of a
+re-request, which only checks the content-addressed store. Ends with the
+time to build one day's zip archive:
+
+    python -m benchmarks.bench_receipts --orders 5000 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utils.receipts import ReceiptRenderer, receipt_template, render_to_files
+
+MENU = [("Margherita Pizza", 11.5), ("Pepperoni Pizza", 13.0), ("Caesar Salad", 8.25), ("Garlic Bread", 4.5),
+        ("Tiramisu", 6.75), ("Sparkling Water", 2.5), ("Spaghetti Carbonara", 14.0), ("Lemonade", 3.25)]
+
+
+def make_orders(args) -> dict:
+    by_restaurant = {}
+    for r in range(args.restaurants):
+        orders = []
+        for o in range(args.orders // args.restaurants):
+            items = [
+                {"item": name, "qty": random.randint(1, 3), "price": price}
+                for name, price in random.sample(MENU, random.randint(1, 5))
+            ]
+            orders.append({
+                "_id": f"bench-o{r}-{o}", "restaurant_id": f"bench-r{r}", "timestamp": "2024-06-01T12:30:00",
+                "items": items, "notes": "No onions" if o % 7 == 0 else "", "customer_name": f"Guest {o}"
+            })
+        restaurant = {"name": f"Bench Bistro {r}", "address": f"{r} Main Street", "phone": f"+1555000{r:04d}"}
+        by_restaurant[f"bench-r{r}"] = (restaurant, orders)
+    return by_restaurant
+
+
+async def pool_pass(renderer: ReceiptRenderer, by_restaurant: dict) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        renderer.render_batch(orders, restaurant) for restaurant, orders in by_restaurant.values()
+    ))
+    return time.perf_counter() - start
+
+
+async def run(args) -> None:
+    by_restaurant = make_orders(args)
+    total = sum(len(orders) for _, orders in by_restaurant.values())
+    print(f"{total} orders over {args.restaurants} restaurants, {os.cpu_count()} cores available")
+
+    directory = tempfile.mkdtemp(prefix="bench-receipts-")
+    try:
+        start = time.perf_counter()
+        for restaurant, orders in by_restaurant.values():
+            render_to_files(receipt_template(restaurant), orders, directory)
+        elapsed = time.perf_counter() - start
+        print(f"inline, 1 core:      {total / elapsed:8.0f} receipts/s  ({total / elapsed:.0f}/s per core)")
+
+        # 1, 2, 4, ... and always --workers itself, which gets the re-request and archive passes
+        counts = sorted({2 ** i for i in range(args.workers.bit_length()) if 2 ** i < args.workers} | {args.workers})
+        for workers in counts:
+            shutil.rmtree(directory)
+            renderer = ReceiptRenderer(workers=workers, directory=directory, batch_size=args.batch_size)
+            # Start every worker process outside the timed pass. Pools that
+            # spawn on demand (spawn and forkserver start methods) only add a
+            # process when a task arrives and none is idle, so submit one
+            # single-order batch per worker at once
+            await asyncio.gather(*(
+                renderer.render_batch([{"_id": f"warmup-{i}", "items": []}]) for i in range(workers)
+            ))
+            elapsed = await pool_pass(renderer, by_restaurant)
+            cores = min(workers, os.cpu_count() or 1)
+            print(f"pool, {workers} worker(s):  {total / elapsed:8.0f} receipts/s  ({total / elapsed / cores:.0f}/s per core)")
+            if workers == args.workers:
+                elapsed = await pool_pass(renderer, by_restaurant)
+                print(f"re-request (stored): {total / elapsed:8.0f} receipts/s")
+                restaurant, orders = next(iter(by_restaurant.values()))
+                start = time.perf_counter()
+                path = await renderer.archive(orders, restaurant, "bench-day")
+                print(f"day archive of {len(orders)} receipts: {(time.perf_counter() - start) * 1000:.0f}ms, "
+                      f"{os.path.getsize(path) / 1024:.0f}KiB")
+            renderer.shutdown()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--restaurants", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
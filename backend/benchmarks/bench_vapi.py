@@ -0,0 +1,131 @@
+"""
+Exercises VAPIClient against a local stub VAPI server that injects latency and errors.
+
+Runs three phases and reports latency and outcomes for each:
+
+  reuse   sequential calls over the shared keep-alive session vs. a new
+          session per call (the old client)
+  flaky   --error-rate of responses are 503s; end_call (idempotent) is
+          retried with jittered backoff, create_call is not
+  outage  every response is a 503; after VAPI_BREAKER_FAILURES failures
+          the circuit opens and calls fail fast
+
+Run from backend/:
+
+    python -m benchmarks.bench_vapi --calls 200 --error-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+from utils.circuit_breaker import CircuitOpenError
+from utils.vapi_client import VAPIClient, VAPIError
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8766
+
+
+def build_stub_app(config: dict) -> web.Application:
+    """
+    Stub of the VAPI call API. `config` is read per request, so phases can
+    change latency ("latency", seconds) and the share of 503s ("error_rate").
+    """
+    async def handle(request: web.Request) -> web.Response:
+        if request.can_read_body:
+            await request.json()
+        await asyncio.sleep(config["latency"])
+        if random.random() < config["error_rate"]:
+            return web.json_response({"error": "injected failure"}, status=503)
+        return web.json_response({"id": "call-123", "status": "queued"})
+
+    app = web.Application()
+    app.router.add_post("/call", handle)
+    app.router.add_post("/call/{call_id}/send-message", handle)
+    app.router.add_post("/call/{call_id}/end", handle)
+    return app
+
+
+def summarize(name: str, latencies: list, outcomes: dict) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    counts = " ".join(f"{key}={value}" for key, value in outcomes.items())
+    print(f"{name:<28} p50={p50:7.2f}ms p99={p99:7.2f}ms {counts}")
+
+
+async def timed(call) -> tuple:
+    start = time.perf_counter()
+    try:
+        await call()
+        outcome = "ok"
+    except CircuitOpenError:
+        outcome = "fast_fail"
+    except (VAPIError, aiohttp.ClientError, asyncio.TimeoutError):
+        outcome = "error"
+    return time.perf_counter() - start, outcome
+
+
+async def run_phase(name: str, calls: int, call) -> None:
+    latencies, outcomes = [], {}
+    for _ in range(calls):
+        elapsed, outcome = await timed(call)
+        latencies.append(elapsed)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    summarize(name, latencies, outcomes)
+
+
+async def run(args) -> None:
+    config = {"latency": args.latency, "error_rate": 0.0}
+    runner = web.AppRunner(build_stub_app(config))
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    base_url = f"http://{STUB_HOST}:{STUB_PORT}/call"
+
+    def new_client() -> VAPIClient:
+        client = VAPIClient(base_url=base_url)
+        client.retry_base_delay = args.retry_base_delay
+        return client
+
+    client = new_client()
+    try:
+        async def session_per_call():
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{base_url}/call-123/end") as response:
+                    await response.json()
+
+        await run_phase("reuse: session per call", args.calls, session_per_call)
+        await run_phase("reuse: shared session", args.calls, lambda: client.end_call("call-123"))
+
+        config["error_rate"] = args.error_rate
+        await client.close()
+        client = new_client()
+        await run_phase("flaky: end_call (retried)", args.calls, lambda: client.end_call("call-123"))
+        await run_phase("flaky: create_call", args.calls, lambda: client.create_call("+15550100", "r1"))
+
+        config["error_rate"] = 1.0
+        await client.close()
+        client = new_client()
+        await run_phase("outage: end_call", args.calls, lambda: client.end_call("call-123"))
+        print(f"breaker: {client.breaker.snapshot()}")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--retry-base-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
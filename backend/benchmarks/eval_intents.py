@@ -0,0 +1,164 @@
+"""
+Offline evaluation of the local intent classifier (utils.intent_classifier).
+
+Runs every labeled utterance through IntentEngine against a small menu and
+reports, for the utterances it answered locally, intent accuracy and slot
+accuracy (order items and quantities; booking date, time and party size),
+plus the fallback rate (utterances left to GPT) and classification latency.
+The built-in set is separate from the training examples; pass --data to
+evaluate exported transcripts instead, one JSON object per line:
+
+    {"text": "table for two at 8", "intent": "booking", "slots": {"party_size": 2, "time": "20:00"}}
+
+Utterances labeled "amend" (cancelling or changing an existing booking or
+order) must always be left to the LLM; any local answer counts as wrong.
+A booking whose day or time the rules cannot resolve ("next week", "12/24",
+"seven twenty") should be left to the LLM too; answered locally, it counts
+as bad slots. A slot expected as None has no valid value ("February 30th").
+
+Dates are resolved against Saturday 2024-06-01 15:00:
+
+    python -m benchmarks.eval_intents --verbose
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+from utils.intent_classifier import IntentEngine
+from utils.menu_index import MenuIndex
+
+NOW = datetime(2024, 6, 1, 15, 0)
+MENU = ["Cheeseburger", "French Fries", "Cola", "Pepperoni Pizza", "Margherita Pizza", "Caesar Salad",
+        "Chicken Wings", "Milkshake", "Iced Tea", "Veggie Wrap", "Hot Dog", "Onion Rings", "Lemonade", "Brownie"]
+
+EVAL_SET = [
+    ("can i get a cheeseburger and onion rings", "order", {"items": {"Cheeseburger": 1, "Onion Rings": 1}}),
+    ("I'd like two pepperoni pizzas please", "order", {"items": {"Pepperoni Pizza": 2}}),
+    ("let me get 3 hot dogs and a lemonade", "order", {"items": {"Hot Dog": 3, "Lemonade": 1}}),
+    ("could I get a margherita pizza with extra basil", "order", {"items": {"Margherita Pizza": 1}}),
+    ("I'll have the caesar salad and an iced tea", "order", {"items": {"Caesar Salad": 1, "Iced Tea": 1}}),
+    ("two milkshakes and a brownie", "order", {"items": {"Milkshake": 2, "Brownie": 1}}),
+    ("give me a dozen chicken wings to go", "order", {"items": {"Chicken Wings": 12}}),
+    ("i want a veg wrap and a coke", "order", {"items": {"Veggie Wrap": 1, "Cola": 1}}),
+    ("can we get four cheese burgers, two large cokes and a brownie", "order",
+     {"items": {"Cheeseburger": 4, "Cola": 2, "Brownie": 1}}),
+    ("hi yeah can I order a pepperoni pizza for pickup", "order", {"items": {"Pepperoni Pizza": 1}}),
+    ("I'd like the usual", "order", {}),
+    ("can I get whatever's good", "order", {}),
+    ("I'd like to book a table for four at 7", "booking", {"party_size": 4, "time": "19:00", "date": "2024-06-01"}),
+    ("table for two at 8pm tomorrow", "booking", {"party_size": 2, "time": "20:00", "date": "2024-06-02"}),
+    ("can I make a reservation for 6 people on friday at 7:30", "booking",
+     {"party_size": 6, "time": "19:30", "date": "2024-06-07"}),
+    ("we'd like to reserve a table for three tonight at half eight", "booking",
+     {"party_size": 3, "time": "20:30", "date": "2024-06-01"}),
+    ("book us in for sunday at noon, party of five", "booking", {"party_size": 5, "time": "12:00", "date": "2024-06-02"}),
+    ("is there room for two at 9 tonight", "booking", {"party_size": 2, "time": "21:00", "date": "2024-06-01"}),
+    ("reservation for 10 on june 14th at 6pm", "booking", {"party_size": 10, "time": "18:00", "date": "2024-06-14"}),
+    ("do you have a table for two this evening", "booking", {}),
+    ("book a table for 2 on the 5th of December at 7pm", "booking", {"party_size": 2, "time": "19:00", "date": "2024-12-05"}),
+    ("table for four on the 5th of june at 8", "booking", {"party_size": 4, "time": "20:00", "date": "2024-06-05"}),
+    ("table for two at seven thirty tonight", "booking", {"party_size": 2, "time": "19:30", "date": "2024-06-01"}),
+    # Days and times the rules cannot resolve must reach the LLM, not default to today or the hour
+    ("table for 2 next week at 7", "booking", {"party_size": 2, "time": "19:00", "date": None}),
+    ("can I book for 4 on 12/24 at 7", "booking", {"party_size": 4, "time": "19:00", "date": "2024-12-24"}),
+    ("reservation for 2 in two weeks at 8", "booking", {"party_size": 2, "time": "20:00", "date": "2024-06-15"}),
+    ("table for 6 on Christmas Eve at 6pm", "booking", {"party_size": 6, "time": "18:00", "date": "2024-12-24"}),
+    ("table for 2 on February 30th at 7", "booking", {"party_size": 2, "time": "19:00", "date": None}),
+    ("table for 3 at seven twenty tomorrow", "booking", {"party_size": 3, "time": "19:20", "date": "2024-06-02"}),
+    # Changes and cancellations are not new bookings or orders; they must go to the LLM
+    ("I need to change my booking", "amend", {}),
+    ("I need to cancel my reservation for 4 at 7pm", "amend", {}),
+    ("can I change my booking to 8pm for 4 people", "amend", {}),
+    ("could you move our table for two to friday at 8", "amend", {}),
+    ("I'd like to reschedule my reservation to tomorrow at 6", "amend", {}),
+    ("please cancel my order", "amend", {}),
+    ("can I change my order to two cheeseburgers", "amend", {}),
+    ("what time do you close", "question", {"topic": "hours"}),
+    ("are you open on sundays", "question", {"topic": "hours"}),
+    ("do you have vegan options", "question", {}),
+    ("where are you located", "question", {}),
+    ("how much is a cheeseburger", "question", {}),
+    ("is the kitchen still open", "question", {"topic": "hours"}),
+    ("do you deliver to downtown", "question", {}),
+    ("can I bring my dog", "question", {}),
+    ("what's in the caesar salad", "question", {}),
+    ("are the onion rings gluten free", "question", {}),
+    ("do you take apple pay", "question", {}),
+    ("when do you open tomorrow", "question", {"topic": "hours"}),
+    ("hello", "question", {}),
+    ("um I'm not sure yet", "question", {}),
+]
+
+
+def slots_match(expected: dict, data: dict) -> bool:
+    for slot, value in expected.items():
+        if slot == "items":
+            got = Counter()
+            for item in data.get("items", []):
+                got[item["item"]] += item["quantity"]
+            if dict(got) != value:
+                return False
+        elif data.get(slot) != value:
+            return False
+    return True
+
+
+def load(path: str) -> list:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], row["intent"], row.get("slots", {})) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="JSONL file of labeled utterances")
+    parser.add_argument("--min-confidence", type=float, default=None)
+    parser.add_argument("--verbose", action="store_true", help="print every fallback and mistake")
+    args = parser.parse_args()
+
+    examples = load(args.data) if args.data else EVAL_SET
+    menu = MenuIndex([{"_id": str(i), "name": name, "price": 5.0} for i, name in enumerate(MENU)])
+    engine = IntentEngine(min_confidence=args.min_confidence)
+
+    latencies = []
+    local = correct = slots_correct = 0
+    by_intent = Counter()
+    fallback_by_intent = Counter()
+    for text, intent, slots in examples:
+        by_intent[intent] += 1
+        start = time.perf_counter()
+        prediction = engine.classify(text, menu, NOW)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        if prediction is None:
+            fallback_by_intent[intent] += 1
+            if args.verbose:
+                print(f"  fallback   {intent:<8} {text}")
+            continue
+        local += 1
+        if prediction.data["intent"] == intent:
+            correct += 1
+            if slots_match(slots, prediction.data):
+                slots_correct += 1
+            elif args.verbose:
+                print(f"  bad slots  {intent:<8} {text} -> {prediction.data}")
+        elif args.verbose:
+            print(f"  wrong      {intent:<8} {text} -> {prediction.source}: {prediction.data}")
+
+    latencies.sort()
+    total = len(examples)
+    print(f"{total} utterances, {local} answered locally, {total - local} left to the LLM "
+          f"(fallback rate {(total - local) / total:.1%})")
+    if local:
+        print(f"local intent accuracy {correct / local:.1%}, intent + slots accuracy {slots_correct / local:.1%}")
+    if by_intent["amend"]:
+        print(f"amend requests answered locally (should be 0): {by_intent['amend'] - fallback_by_intent['amend']}")
+    for intent, count in sorted(by_intent.items()):
+        print(f"  {intent:<8} {count - fallback_by_intent[intent]}/{count} local")
+    print(f"by classifier: {dict(engine.stats)}")
+    print(f"latency p50 {latencies[len(latencies) // 2]:.0f}us, p99 {latencies[int(len(latencies) * 0.99)]:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Load test for the authenticated /api/v1/me endpoint.
+
+Keeps --concurrency requests in flight against a running server for
+--duration seconds and reports requests/second and latency percentiles.
+To compare before/after the auth caches, run the server once with
+AUTH_CACHE_TTL=0 AUTH_TRUST_CLAIMS=false (every request decodes the JWT and
+hits Mongo) and once with the defaults:
+
+    python -m benchmarks.load_me --base-url http://localhost:8000 --email a@b.c --password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+
+async def login(session: aiohttp.ClientSession, base_url: str, email: str, password: str) -> str:
+    async with session.post(f"{base_url}/api/v1/login", json={"email": email, "password": password}) as response:
+        response.raise_for_status()
+        return (await response.json())["access_token"]
+
+
+async def run(args) -> None:
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        token = args.token or await login(session, args.base_url, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                async with session.get(f"{args.base_url}/api/v1/me", headers=headers) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"requests={len(latencies)} errors={errors} concurrency={args.concurrency}")
+    print(f"throughput={len(latencies) / elapsed:.0f} req/s p50={statistics.median(latencies) * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--token", help="Use an existing bearer token instead of logging in")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Concurrency stress test for the booking availability engine.
+
+Fires --attempts booking attempts at once (default 500) at one restaurant.
+Each attempt is a random party of 1 to 6 at one of --times on tomorrow's
+date, going through AvailabilityEngine.reserve like the voice handler and
+the bookings API do. Afterwards it checks that:
+
+- no time slot holds more covers than --capacity;
+- every slot's counter in booking_slots equals the covers of the confirmed
+  bookings overlapping it, so failed attempts left no covers held behind.
+
+It prints outcomes (and how many full answers came with alternative
+times), latency and PASS/FAIL, and exits 1 on failure.
+--no-index-cache makes every attempt load the day from Mongo instead of
+the in-process DayIndex, so all of them race on the conditional updates.
+
+Needs a MongoDB reachable via MONGODB_URI; point DB_NAME at a scratch
+database. Rows use a "stress-" restaurant id and are removed afterwards:
+
+    DB_NAME=bench python -m benchmarks.stress_bookings --attempts 500 --capacity 40
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from utils.availability import AvailabilityEngine, format_hhmm
+from utils.db import db
+from utils.restaurant_directory import RestaurantContext
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+
+async def attempt(engine: AvailabilityEngine, restaurant: RestaurantContext, start: asyncio.Event, args) -> tuple:
+    party_size = random.randint(1, 6)
+    time_of_day = random.choice(args.times)
+    await start.wait()
+    began = time.perf_counter()
+    reservation = await engine.reserve(restaurant, DAY, time_of_day, party_size, {"customer_phone": f"+1555{random.randint(0, 9999999):07d}"})
+    return reservation, (time.perf_counter() - began) * 1000
+
+
+async def verify(restaurant: RestaurantContext, args) -> list:
+    problems = []
+    expected = defaultdict(int)
+    async for booking in db.bookings.find({"restaurant_id": restaurant.id, "date": DAY}):
+        for minute in booking["slots"]:
+            expected[minute] += booking["party_size"]
+    held = {slot["minute"]: slot["covers"] async for slot in db.booking_slots.find({"restaurant_id": restaurant.id, "date": DAY})}
+
+    for minute, covers in sorted(expected.items()):
+        if covers > args.capacity:
+            problems.append(f"slot {format_hhmm(minute)} double-booked: {covers} covers > {args.capacity}")
+    for minute in sorted(set(expected) | set(held)):
+        if held.get(minute, 0) != expected.get(minute, 0):
+            problems.append(f"slot {format_hhmm(minute)} counter {held.get(minute, 0)} != booked covers {expected.get(minute, 0)}")
+    return problems
+
+
+async def run(args) -> int:
+    restaurant = RestaurantContext({
+        "_id": f"stress-{uuid.uuid4().hex[:8]}",
+        "hours": {"daily": args.hours},
+        "booking_capacity": args.capacity
+    })
+    engine = AvailabilityEngine(index_ttl=0 if args.no_index_cache else None)
+    start = asyncio.Event()
+    tasks = [asyncio.ensure_future(attempt(engine, restaurant, start, args)) for _ in range(args.attempts)]
+    await asyncio.sleep(0)
+    began = time.perf_counter()
+    start.set()
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - began
+
+    try:
+        problems = await verify(restaurant, args)
+    finally:
+        if not args.keep:
+            await db.bookings.delete_many({"restaurant_id": restaurant.id})
+            await db.booking_slots.delete_many({"restaurant_id": restaurant.id})
+
+    outcomes = Counter(reservation.status for reservation, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    covers = sum(reservation.booking["party_size"] for reservation, _ in results if reservation.status == "confirmed")
+    with_alternatives = sum(1 for reservation, _ in results if reservation.status == "full" and reservation.alternatives)
+    print(f"{args.attempts} simultaneous attempts in {elapsed:.2f}s: {dict(outcomes)}, {covers} covers booked, "
+          f"{with_alternatives} full answers offered alternatives")
+    print(f"latency p50 {latencies[len(latencies) // 2]:.1f}ms, p99 {latencies[int(len(latencies) * 0.99)]:.1f}ms")
+    print(f"engine: {engine.snapshot()}")
+    for problem in problems:
+        print(f"  {problem}")
+    print("PASS" if not problems else "FAIL")
+    return 0 if not problems else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=40)
+    parser.add_argument("--hours", default="17-23")
+    parser.add_argument("--times", nargs="+", default=["18:00", "18:30", "19:00", "19:30", "20:00"])
+    parser.add_argument("--no-index-cache", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="leave the bookings in place for inspection")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
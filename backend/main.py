@@ -1,13 +1,27 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from routes.restaurants import router as restaurant_router
 from routes.orders import router as order_router
 from routes.transcripts import router as transcript_router
 from routes.voice import router as voice_router
 from routes.bookings import router as bookings_router
 from routes.dashboard import router as dashboard_router
-from routes.users import router as user_router
+from routes.users import router as user_router, password_pool
 from routes.menu_items import router as menu_items_router
 from routes.tenants import router as tenants_router
+from routes.campaigns import router as campaigns_router
+from routes.voice import elevenlabs_client, tts_cache, audio_store, PREWARM_PROMPTS
+from utils.db import mongo
+from utils.db_metrics import command_metrics, pool_metrics
+from utils.indexes import create_indexes
+from utils.vapi_client import vapi_client
+from utils.campaigns import campaign_runner
+from utils.jobs import job_runner
+from utils.receipts import receipt_renderer
+from utils.metrics import RequestMetricsMiddleware, render_prometheus
+from utils.logging_config import configure_logging
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import openai
 import os
@@ -16,11 +30,39 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 # Configure OpenAI
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mongo.connect()
+    # Declared indexes are created in the background; existing ones are a no-op
+    index_task = asyncio.create_task(create_indexes())
+    # Synthesize fixed voice prompts in the background so call pickup hits the cache
+    prewarm_task = asyncio.create_task(tts_cache.prewarm(PREWARM_PROMPTS))
+    # Expire per-turn reply audio once Twilio has had time to fetch it
+    sweeper_task = asyncio.create_task(audio_store.run_sweeper())
+    # Outbound call campaign workers; queued jobs resume from Mongo after a restart
+    campaign_runner.start()
+    # Post-call persistence workers; jobs left in the outbox are recovered on start
+    job_runner.start()
+    yield
+    await campaign_runner.stop()
+    await job_runner.drain()
+    index_task.cancel()
+    prewarm_task.cancel()
+    sweeper_task.cancel()
+    audio_store.clear()
+    password_pool.shutdown()
+    receipt_renderer.shutdown()
+    # Release pooled keep-alive connections to external services
+    await elevenlabs_client.close()
+    await vapi_client.close()
+    mongo.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS setup (allow all origins for dev; restrict in prod)
 app.add_middleware(
@@ -29,7 +71,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Cursor for the next page of list endpoints
 )
+# Per-route latency, status and in-flight counts, served on /metrics
+app.add_middleware(RequestMetricsMiddleware)
 
 # Include routers
 app.include_router(restaurant_router, prefix="/api/v1/restaurants", tags=["restaurants"])
@@ -41,6 +86,16 @@ app.include_router(dashboard_router, prefix="/api/v1", tags=["dashboard"])
 app.include_router(user_router, prefix="/api/v1", tags=["users"])
 app.include_router(menu_items_router, prefix="/api/v1/menu_items", tags=["menu_items"])
 app.include_router(tenants_router, prefix="/api/v1", tags=["tenants"])
+app.include_router(campaigns_router, prefix="/api/v1/campaigns", tags=["campaigns"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/db/stats", tags=["monitoring"])
+async def db_stats():
+    # Pool checkout waits and per-command latencies from the driver's listeners
+    return {"pool": pool_metrics.snapshot(), "commands": command_metrics.snapshot()}
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+class Campaign(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    user_id: Optional[str] = None
+    restaurant_id: str
+    kind: str = Field(..., pattern="^(booking_confirmation|order_ready)$", description="booking_confirmation or order_ready")
+    date: Optional[str] = Field(None, description="Bookings on this date (YYYY-MM-DD) for booking_confirmation; defaults to today")
+    order_status: str = Field("ready", description="Orders in this status are called for order_ready")
+    status: Optional[str] = None  # running, completed, cancelled
+    counts: Dict[str, int] = Field(default_factory=dict, description="Jobs per outcome: queued, done, failed, cancelled")
+    created_at: Optional[str] = None
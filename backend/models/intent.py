@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, List, Literal, Optional, Union
+
+class OrderLine(BaseModel):
+    item: str = Field(..., min_length=1, description="Menu item name exactly as listed")
+    quantity: int = Field(1, ge=1, le=100)
+
+class OrderIntent(BaseModel):
+    intent: Literal["order"] = "order"
+    items: List[OrderLine] = Field(..., min_length=1, description="Items the caller ordered")
+    special_instructions: str = Field("", description="Modifications, allergies or pickup notes")
+
+class BookingIntent(BaseModel):
+    intent: Literal["booking"] = "booking"
+    date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date of the booking (YYYY-MM-DD)")
+    time: Optional[str] = Field(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="Time of the booking (HH:MM, 24h)")
+    party_size: Optional[int] = Field(None, ge=1, le=100, description="Number of people")
+
+class QuestionIntent(BaseModel):
+    intent: Literal["question"] = "question"
+    question: str = Field("", description="The caller's question in their words")
+    topic: Optional[str] = Field(None, description="Short topic, e.g. hours, menu, location")
+
+Intent = Annotated[Union[OrderIntent, BookingIntent, QuestionIntent], Field(discriminator="intent")]
+
+# Validates a dict or raw JSON into the matching intent model in one pass
+IntentAdapter = TypeAdapter(Intent)
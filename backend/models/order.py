@@ -11,3 +11,5 @@ class Order(BaseModel):
     timestamp: Optional[str] = None
     notes: Optional[str] = None
     receipt_path: Optional[str] = None
+    status: Optional[str] = None  # pending, confirmed, preparing, ready, completed, cancelled
+    refunds: Optional[float] = None  # Amount refunded; counted against the day's net revenue
@@ -8,3 +8,4 @@ class Restaurant(BaseModel):
     hours: dict       # Example: {"mon": "9-5", "tue": "9-5"}
     phone: Optional[str]
     address: Optional[str]
+    booking_capacity: Optional[int] = Field(None, description="Covers that can be booked per time slot (defaults to BOOKING_CAPACITY)")
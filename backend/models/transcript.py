@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 class Transcript(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     restaurant_id: str
-    order_id: Optional[str]
+    order_id: Optional[str] = None
     user_id: Optional[str]  # Link transcript to individual user/customer
     call_text: str
     timestamp: Optional[str]
+    stage_timings: Optional[Dict[str, float]] = Field(None, description="Per-stage call latencies in milliseconds")
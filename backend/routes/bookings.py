@@ -1,23 +1,63 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from models.booking import Booking
 from utils.db import db
-from typing import List
+from typing import List, Optional
+from utils.pagination import Page, paginate, date_range, oldest_first
+from utils.availability import availability
+from utils.restaurant_directory import restaurant_directory
 
-from routes.users import get_current_user
+from routes.users import get_current_user, get_owned_restaurant_ids, require_restaurant_owner
 
 router = APIRouter()
 
 
+def booking_row(booking: dict) -> dict:
+    booking["id"] = str(booking.pop("_id"))
+    return booking
+
+
+BOOKING_ERRORS = {
+    "full": (409, "That time is fully booked"),
+    "closed": (422, "The restaurant does not take bookings at that time"),
+    "past": (422, "That time has already passed"),
+    "too_large": (422, "Party size exceeds the restaurant's booking capacity"),
+    "invalid": (422, "Date must be YYYY-MM-DD, time HH:MM and party size at least 1"),
+}
+
+
 @router.post("/bookings", response_model=Booking)
-async def create_booking(booking: Booking, current_user: dict = Depends(get_current_user)):
+async def create_booking(booking: Booking, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     # Verify restaurant belongs to user
-    restaurant = await db.restaurants.find_one({"_id": booking.restaurant_id, "user_id": str(current_user["_id"])})
-    if not restaurant:
+    if booking.restaurant_id not in owned:
         raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
-    booking.user_id = str(current_user["_id"])
-    result = await db.bookings.insert_one(booking.dict(exclude={"id"}))
-    booking.id = str(result.inserted_id)
-    return booking
+    restaurant = await restaurant_directory.by_id(booking.restaurant_id)
+    if not restaurant:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    # Capacity is checked and the slots taken atomically; a full slot is a 409 with alternatives
+    reservation = await availability.reserve(
+        restaurant, booking.date, booking.time, booking.party_size,
+        {"user_id": str(current_user["_id"]), "customer_phone": booking.customer_phone}
+    )
+    if reservation.status != "confirmed":
+        status_code, message = BOOKING_ERRORS[reservation.status]
+        raise HTTPException(status_code=status_code, detail={"message": message, "alternatives": reservation.alternatives})
+    return Booking(**booking_row(reservation.booking))
+
+
+@router.get("/bookings/availability")
+async def get_availability(
+    date: str = Query(..., description="Day to check (YYYY-MM-DD)"),
+    party_size: int = Query(2, ge=1),
+    restaurant_id: str = Depends(require_restaurant_owner)
+):
+    restaurant = await restaurant_directory.by_id(restaurant_id)
+    if not restaurant:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    try:
+        times = await availability.availability(restaurant, date, party_size)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Date must be YYYY-MM-DD")
+    return {"restaurant_id": restaurant_id, "date": date, "party_size": party_size, "times": times}
 
 
 @router.get("/bookings/{booking_id}", response_model=Booking)
@@ -30,17 +70,28 @@ async def get_booking(booking_id: str, restaurant_id: str, current_user: dict =
 
 
 @router.get("/bookings", response_model=List[Booking])
-async def list_bookings(restaurant_id: str, current_user: dict = Depends(get_current_user)):
-    bookings = []
-    async for booking in db.bookings.find({"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}):
-        booking["id"] = str(booking["_id"])
-        bookings.append(Booking(**booking))
-    return bookings
+async def list_bookings(
+    restaurant_id: str,
+    response: Response,
+    start: Optional[str] = Query(None, description="Earliest booking date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Latest booking date, inclusive"),
+    status: Optional[str] = Query(None, description="Only bookings with this status"),
+    page: Page = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
+    query = {"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}
+    if date_range(start, end):
+        query["date"] = date_range(start, end)
+    if status:
+        query["status"] = status
+    return await paginate(db.bookings, query, oldest_first("date", "time"), page, response, prepare=booking_row)
 
 
 @router.delete("/bookings/{booking_id}")
 async def delete_booking(booking_id: str, restaurant_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.bookings.delete_one({"_id": booking_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
-    if result.deleted_count == 0:
+    booking = await db.bookings.find_one_and_delete({"_id": booking_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
+    if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
+    # Frees the covers it held in its time slots
+    await availability.release(booking)
     return {"message": "Booking deleted"}
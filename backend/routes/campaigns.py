@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Depends, Response
+from models.campaign import Campaign
+from utils.db import db
+from utils.campaigns import enqueue_campaign, cancel_campaign, campaign_runner
+from utils.pagination import Page, paginate, newest_first
+from utils.restaurant_directory import restaurant_directory
+from bson import ObjectId
+from datetime import datetime
+from typing import List
+
+from routes.users import get_current_user, get_owned_restaurant_ids, require_restaurant_owner
+
+router = APIRouter()
+
+
+@router.post("/", response_model=Campaign)
+async def create_campaign(campaign: Campaign, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
+    if campaign.restaurant_id not in owned:
+        raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
+    restaurant = await restaurant_directory.by_id(campaign.restaurant_id)
+    campaign.id = str(ObjectId())
+    campaign.user_id = str(current_user["_id"])
+    campaign.status = "running"
+    campaign.counts = {}
+    campaign.created_at = datetime.utcnow().isoformat()
+    campaign.date = campaign.date or datetime.utcnow().date().isoformat()
+    document = campaign.dict(by_alias=True)
+    await db.campaigns.insert_one(document)
+    queued = await enqueue_campaign(document, restaurant.name if restaurant else "the restaurant")
+    if queued == 0:
+        await db.campaigns.update_one({"_id": campaign.id}, {"$set": {"status": "completed"}})
+        campaign.status = "completed"
+    campaign_runner.wake()
+    campaign.counts = {"queued": queued}
+    return campaign
+
+
+@router.get("/", response_model=List[Campaign])
+async def list_campaigns(
+    restaurant_id: str,
+    response: Response,
+    page: Page = Depends(),
+    current_user: dict = Depends(get_current_user),
+    _: str = Depends(require_restaurant_owner)
+):
+    query = {"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}
+    return await paginate(db.campaigns, query, newest_first("created_at"), page, response)
+
+
+@router.get("/{campaign_id}", response_model=Campaign)
+async def get_campaign(campaign_id: str, current_user: dict = Depends(get_current_user)):
+    campaign = await db.campaigns.find_one({"_id": campaign_id, "user_id": str(current_user["_id"])})
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@router.post("/{campaign_id}/cancel", response_model=Campaign)
+async def cancel(campaign_id: str, current_user: dict = Depends(get_current_user)):
+    campaign = await db.campaigns.find_one({"_id": campaign_id, "user_id": str(current_user["_id"])})
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if campaign["status"] == "running":
+        await cancel_campaign(campaign_id)
+        campaign = await db.campaigns.find_one({"_id": campaign_id})
+    return campaign
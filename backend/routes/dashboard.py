@@ -1,19 +1,30 @@
 from fastapi import APIRouter, Query, Depends, HTTPException
 from models.dashboard import DashboardStats, DailyTotal
-from models.order import Order
-from utils.db import db
+from utils.db import reporting_db
+from utils.rollups import load_daily_totals
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from routes.users import get_current_user
+from routes.users import get_current_user, require_restaurant_owner
 
 router = APIRouter()
 
+
+def calculate_growth(current: float, previous: float) -> float:
+    """
+    Percentage change from the previous period (same rule as the frontend's calculateGrowth)
+    """
+    if not previous:
+        return 100.0 if current > 0 else 0.0
+    return (current - previous) / previous * 100
+
+
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
     date_range: Optional[str] = Query('week', description="Date range: today, week, month"),
     restaurant_id: str = Query(..., description="ID of the restaurant for dashboard stats"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    _: str = Depends(require_restaurant_owner)
 ):
     # Set date range
     now = datetime.utcnow()
@@ -28,54 +39,48 @@ async def get_dashboard_stats(
         start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         days = 7
 
-    # Verify restaurant belongs to user
-    restaurant = await db.restaurants.find_one({"_id": restaurant_id, "user_id": str(current_user["_id"])})
-    if not restaurant:
-        raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
+    # Per-day totals for this period and the equally long period before it
+    previous_start = start_date - timedelta(days=days)
+    totals_by_day = await load_daily_totals(restaurant_id, previous_start.date(), now.date(), reporting_db)
 
-    # Fetch orders in range for this restaurant
-    orders_cursor = db.orders.find({
-        "timestamp": {"$gte": start_date.isoformat(), "$lte": now.isoformat()},
-        "restaurant_id": restaurant_id
-    })
-    orders = await orders_cursor.to_list(1000)
+    previous_orders = 0
+    previous_revenue = 0.0
+    for i in range(days):
+        previous = totals_by_day.get((previous_start + timedelta(days=i)).date().isoformat(), {})
+        previous_orders += int(previous.get("orders", 0))
+        previous_revenue += float(previous.get("gross", 0.0))
 
-    # Aggregate stats
-    revenue_by_day = [0.0 for _ in range(days)]
+    revenue_by_day = []
     daily_totals = []
-    total_revenue = 0.0
     total_orders = 0
     total_order_value = 0.0
-    order_counts_by_day = [0 for _ in range(days)]
-
-    for order in orders:
-        # Parse order date
-        order_date = datetime.fromisoformat(order.get("timestamp", now.isoformat())[:10])
-        day_index = (order_date.date() - start_date.date()).days
-        if 0 <= day_index < days:
-            gross = sum(item.get("price", 0) * item.get("qty", 1) for item in order.get("items", []))
-            revenue_by_day[day_index] += gross
-            order_counts_by_day[day_index] += 1
-            total_revenue += gross
-            total_orders += 1
-            total_order_value += gross
 
     for i in range(days):
-        date_str = (start_date + timedelta(days=i)).strftime('%b %d, %Y')
+        day = start_date + timedelta(days=i)
+        totals = totals_by_day.get(day.date().isoformat(), {})
+        orders = int(totals.get("orders", 0))
+        gross = float(totals.get("gross", 0.0))
+        refunds = float(totals.get("refunds", 0.0))
+        revenue_by_day.append(gross)
+        total_orders += orders
+        total_order_value += gross
         daily_totals.append(DailyTotal(
-            date=date_str,
-            orders=order_counts_by_day[i],
-            gross=revenue_by_day[i]
+            date=day.strftime('%b %d, %Y'),
+            orders=orders,
+            gross=gross,
+            refunds=refunds,
+            net=float(totals.get("net", gross - refunds))
         ))
 
     todaysRevenue = revenue_by_day[-1] if revenue_by_day else 0.0
-    ordersToday = order_counts_by_day[-1] if order_counts_by_day else 0
+    ordersToday = daily_totals[-1].orders if daily_totals else 0
     avgOrderValue = (total_order_value / total_orders) if total_orders > 0 else 0.0
 
-    # Dummy growth calculations (replace with real logic as needed)
-    revenueGrowth = 0.0
-    ordersGrowth = 0.0
-    avgOrderGrowth = 0.0
+    # Growth against the previous period of the same length
+    previousAvgOrderValue = (previous_revenue / previous_orders) if previous_orders > 0 else 0.0
+    revenueGrowth = calculate_growth(total_order_value, previous_revenue)
+    ordersGrowth = calculate_growth(total_orders, previous_orders)
+    avgOrderGrowth = calculate_growth(avgOrderValue, previousAvgOrderValue)
 
     return DashboardStats(
         user_id=str(current_user["_id"]),
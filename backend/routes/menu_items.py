@@ -1,61 +1,92 @@
-from fastapi import APIRouter, HTTPException, Depends
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from models.menu_item import MenuItem
 from utils.db import db
-from routes.users import get_current_user
-from typing import List
+from utils.menu_index import menu_indexes
+from utils.faq_cache import faq_cache
+from utils.prompt_context import prompt_contexts
+from utils.restaurant_directory import restaurant_directory
+from routes.users import get_current_user, get_owned_restaurant_ids
+from typing import List, Optional
+from utils.pagination import Page, paginate, oldest_first, stringify_id
 
 router = APIRouter()
 
+async def menu_changed(*restaurant_ids: str) -> None:
+    """
+    Bumps each restaurant's menu_version, which the FAQ cache fingerprints, so
+    other workers drop their menu answers once their directory entry expires;
+    this worker drops its cached restaurant, answers and prompts now
+    """
+    for restaurant_id in set(restaurant_ids):
+        candidates = [restaurant_id] + ([ObjectId(restaurant_id)] if ObjectId.is_valid(restaurant_id) else [])
+        await db.restaurants.update_one({"_id": {"$in": candidates}}, {"$inc": {"menu_version": 1}})
+        restaurant_directory.invalidate(restaurant_id)
+        faq_cache.invalidate(restaurant_id)
+        prompt_contexts.invalidate(restaurant_id)
+
 @router.get("/", response_model=List[MenuItem])
-async def get_menu_items(current_user: dict = Depends(get_current_user)):
-    items = await db.menu_items.find({
+async def get_menu_items(
+    response: Response,
+    restaurant_id: Optional[str] = Query(None, description="Only items of this restaurant"),
+    category: Optional[str] = Query(None),
+    available: Optional[bool] = Query(None),
+    page: Page = Depends(),
+    current_user: dict = Depends(get_current_user),
+    owned: frozenset = Depends(get_owned_restaurant_ids)
+):
+    if restaurant_id is not None and restaurant_id not in owned:
+        raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
+    query = {
         "user_id": str(current_user["_id"]),
-        "restaurant_id": {"$in": await get_user_restaurant_ids(current_user)}
-    }).to_list(100)
-    return items
+        "restaurant_id": restaurant_id if restaurant_id is not None else {"$in": list(owned)}
+    }
+    if category is not None:
+        query["category"] = category
+    if available is not None:
+        query["available"] = available
+    return await paginate(db.menu_items, query, oldest_first(), page, response, prepare=stringify_id)
 
 @router.post("/", response_model=MenuItem)
-async def create_menu_item(item: MenuItem, current_user: dict = Depends(get_current_user)):
+async def create_menu_item(item: MenuItem, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     # Only allow creation for user's restaurants
-    if not await user_owns_restaurant(item.restaurant_id, current_user):
+    if item.restaurant_id not in owned:
         raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
     item.user_id = str(current_user["_id"])
     result = await db.menu_items.insert_one(item.dict(exclude={"id"}, by_alias=True))
     item.id = str(result.inserted_id)
+    menu_indexes.upsert_item(item.dict())
+    await menu_changed(item.restaurant_id)
     return item
 
 @router.get("/{item_id}", response_model=MenuItem)
-async def get_menu_item(item_id: str, current_user: dict = Depends(get_current_user)):
+async def get_menu_item(item_id: str, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     item = await db.menu_items.find_one({"_id": item_id, "user_id": str(current_user["_id"])})
-    if not item or not await user_owns_restaurant(item["restaurant_id"], current_user):
+    if not item or item["restaurant_id"] not in owned:
         raise HTTPException(status_code=404, detail="Menu item not found")
     return MenuItem(**item)
 
 @router.put("/{item_id}", response_model=MenuItem)
-async def update_menu_item(item_id: str, item: MenuItem, current_user: dict = Depends(get_current_user)):
+async def update_menu_item(item_id: str, item: MenuItem, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     existing = await db.menu_items.find_one({"_id": item_id, "user_id": str(current_user["_id"])})
-    if not existing or not await user_owns_restaurant(existing["restaurant_id"], current_user):
+    if not existing or existing["restaurant_id"] not in owned:
         raise HTTPException(status_code=404, detail="Menu item not found")
     item.user_id = str(current_user["_id"])
     await db.menu_items.update_one({"_id": item_id}, {"$set": item.dict(by_alias=True)})
     item.id = item_id
+    menu_indexes.remove_item(existing["restaurant_id"], item_id)
+    menu_indexes.upsert_item(item.dict())
+    await menu_changed(existing["restaurant_id"], item.restaurant_id)
     return item
 
 @router.delete("/{item_id}")
-async def delete_menu_item(item_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_menu_item(item_id: str, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     item = await db.menu_items.find_one({"_id": item_id, "user_id": str(current_user["_id"])})
-    if not item or not await user_owns_restaurant(item["restaurant_id"], current_user):
+    if not item or item["restaurant_id"] not in owned:
         raise HTTPException(status_code=404, detail="Menu item not found")
     result = await db.menu_items.delete_one({"_id": item_id, "user_id": str(current_user["_id"])})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Menu item not found")
+    menu_indexes.remove_item(item["restaurant_id"], item_id)
+    await menu_changed(item["restaurant_id"])
     return {"message": "Deleted"}
-
-# Helper functions
-async def get_user_restaurant_ids(current_user):
-    cursor = db.restaurants.find({"user_id": str(current_user["_id"])})
-    return [str(r["_id"]) async for r in cursor]
-
-async def user_owns_restaurant(restaurant_id, current_user):
-    restaurant = await db.restaurants.find_one({"_id": restaurant_id, "user_id": str(current_user["_id"])})
-    return restaurant is not None
@@ -1,34 +1,84 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import FileResponse
 from models.order import Order
 from utils.db import db
-from typing import List
-from routes.users import get_current_user
+from utils.rollups import apply_order_change
+from utils.receipts import receipt_renderer
+from utils.restaurant_directory import restaurant_directory
+from datetime import date, datetime
+from typing import List, Optional
+from utils.pagination import Page, paginate, date_range, newest_first, stringify_id
+from routes.users import get_current_user, get_owned_restaurant_ids, require_restaurant_owner
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Order])
 async def get_orders(
+    response: Response,
     restaurant_id: str = Query(..., description="ID of the restaurant for orders"),
-    current_user: dict = Depends(get_current_user)
+    start: Optional[str] = Query(None, description="Earliest order timestamp or date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Latest order timestamp or date, inclusive"),
+    status: Optional[str] = Query(None, description="Only orders with this status"),
+    page: Page = Depends(),
+    current_user: dict = Depends(get_current_user),
+    _: str = Depends(require_restaurant_owner)
 ):
-    # Verify restaurant belongs to user
-    restaurant = await db.restaurants.find_one({"_id": restaurant_id, "user_id": str(current_user["_id"])})
-    if not restaurant:
-        raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
-    orders = await db.orders.find({"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}).to_list(100)
-    return orders
+    query = {"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}
+    if date_range(start, end):
+        query["timestamp"] = date_range(start, end)
+    if status:
+        query["status"] = status
+    return await paginate(db.orders, query, newest_first("timestamp"), page, response, prepare=stringify_id)
 
 @router.post("/", response_model=Order)
-async def create_order(order: Order, current_user: dict = Depends(get_current_user)):
+async def create_order(order: Order, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     # Verify restaurant belongs to user
-    restaurant = await db.restaurants.find_one({"_id": order.restaurant_id, "user_id": str(current_user["_id"])})
-    if not restaurant:
+    if order.restaurant_id not in owned:
         raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
     order.user_id = str(current_user["_id"])
+    # Orders need a timestamp to land in a daily rollup bucket
+    order.timestamp = order.timestamp or datetime.utcnow().isoformat()
     result = await db.orders.insert_one(order.dict(by_alias=True))
     order.id = str(result.inserted_id)
+    await apply_order_change(None, order.dict())
     return order
 
+@router.get("/receipts/archive")
+async def get_receipts_archive(
+    restaurant_id: str = Query(..., description="ID of the restaurant"),
+    day: str = Query(..., description="Day to archive (YYYY-MM-DD)"),
+    _: str = Depends(require_restaurant_owner)
+):
+    """
+    All receipts for one day's orders (including phone orders) as a zip
+    """
+    try:
+        valid = date.fromisoformat(day).isoformat() == day
+    except ValueError:
+        valid = False
+    if not valid:
+        # Anything else would make date_range compare timestamps with $lte
+        raise HTTPException(status_code=422, detail="Day must be YYYY-MM-DD")
+    query = {"restaurant_id": restaurant_id, "timestamp": date_range(day, day)}
+    orders = await db.orders.find(query).sort([("timestamp", 1), ("_id", 1)]).to_list(None)
+    if not orders:
+        raise HTTPException(status_code=404, detail="No orders on this day")
+    restaurant = await restaurant_directory.by_id(restaurant_id)
+    path = await receipt_renderer.archive(orders, restaurant.restaurant if restaurant else None, f"{restaurant_id}-{day}")
+    return FileResponse(path, media_type="application/zip", filename=f"receipts-{day}.zip")
+
+@router.get("/{order_id}/receipt")
+async def get_order_receipt(order_id: str, restaurant_id: str = Query(...), current_user: dict = Depends(get_current_user)):
+    order = await db.orders.find_one({"_id": order_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    restaurant = await restaurant_directory.by_id(restaurant_id)
+    # Served from the store unless the order (or restaurant) changed since the last render
+    path = await receipt_renderer.render(order, restaurant.restaurant if restaurant else None)
+    if order.get("receipt_path") != path:
+        await db.orders.update_one({"_id": order_id}, {"$set": {"receipt_path": path}})
+    return FileResponse(path, media_type="text/plain")
+
 @router.get("/{order_id}", response_model=Order)
 async def get_order(order_id: str, restaurant_id: str = Query(...), current_user: dict = Depends(get_current_user)):
     order = await db.orders.find_one({"_id": order_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
@@ -42,14 +92,20 @@ async def update_order(order_id: str, order: Order, restaurant_id: str = Query(.
     existing = await db.orders.find_one({"_id": order_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
     if not existing:
         raise HTTPException(status_code=404, detail="Order not found")
-    await db.orders.update_one({"_id": order_id}, {"$set": order.dict(by_alias=True)})
-    order.id = order_id
-    return order
+    # Only the fields the body sets; ownership and the placement time never move,
+    # or the order would leave its day's rollup without joining another
+    update = order.dict(exclude_unset=True, exclude={"id", "user_id", "restaurant_id", "timestamp"}, by_alias=True)
+    if update:
+        await db.orders.update_one({"_id": order_id}, {"$set": update})
+    updated = {**existing, **update}
+    await apply_order_change(existing, updated)
+    return Order(**{**updated, "_id": str(existing["_id"])})
 
 @router.delete("/{order_id}")
 async def delete_order(order_id: str, restaurant_id: str = Query(...), current_user: dict = Depends(get_current_user)):
     # Only allow delete if the order belongs to the user and restaurant
-    result = await db.orders.delete_one({"_id": order_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
-    if result.deleted_count == 0:
+    deleted = await db.orders.find_one_and_delete({"_id": order_id, "user_id": str(current_user["_id"]), "restaurant_id": restaurant_id})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Order not found")
+    await apply_order_change(deleted, None)
     return {"message": "Deleted"}
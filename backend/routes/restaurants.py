@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from models.restaurant import Restaurant
 from utils.db import db
+from utils.restaurant_directory import restaurant_directory, normalize_phone
+from utils.faq_cache import faq_cache
+from utils.prompt_context import prompt_contexts
+from utils.ownership import invalidate_owner
 from typing import List
+from utils.pagination import Page, paginate, oldest_first, stringify_id
 
 from routes.users import get_current_user
 
@@ -9,21 +14,21 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[Restaurant])
-async def get_restaurants(current_user: dict = Depends(get_current_user)):
-    restaurants = []
-    async for restaurant in db.restaurants.find({"user_id": str(current_user["_id"]) }):
-        restaurant["id"] = str(restaurant["_id"])
-        if restaurant.pop("_id", None):
-            pass
-        restaurants.append(Restaurant(**restaurant))
-    return restaurants
+async def get_restaurants(response: Response, page: Page = Depends(), current_user: dict = Depends(get_current_user)):
+    query = {"user_id": str(current_user["_id"])}
+    return await paginate(db.restaurants, query, oldest_first(), page, response, prepare=stringify_id)
 
 
 @router.post("/", response_model=Restaurant)
 async def create_restaurant(restaurant: Restaurant, current_user: dict = Depends(get_current_user)):
     restaurant.user_id = str(current_user["_id"])
-    result = await db.restaurants.insert_one(restaurant.dict(exclude={"id"}, by_alias=True))
+    document = restaurant.dict(exclude={"id"}, by_alias=True)
+    document["phone_e164"] = normalize_phone(restaurant.phone)
+    result = await db.restaurants.insert_one(document)
     restaurant.id = str(result.inserted_id)
+    # A new number may have been cached as unregistered
+    restaurant_directory.clear_negative()
+    invalidate_owner(restaurant.user_id)
     return restaurant
 
 
@@ -43,7 +48,13 @@ async def update_restaurant(restaurant_id: str, restaurant: Restaurant, current_
     existing = await db.restaurants.find_one({"_id": restaurant_id, "user_id": str(current_user["_id"])})
     if not existing:
         raise HTTPException(status_code=404, detail="Restaurant not found")
-    await db.restaurants.update_one({"_id": restaurant_id}, {"$set": restaurant.dict(by_alias=True)})
+    document = restaurant.dict(exclude={"id"}, by_alias=True)
+    document["phone_e164"] = normalize_phone(restaurant.phone)
+    await db.restaurants.update_one({"_id": restaurant_id}, {"$set": document})
+    restaurant_directory.invalidate(restaurant_id)
+    faq_cache.invalidate(restaurant_id)
+    prompt_contexts.invalidate(restaurant_id)
+    invalidate_owner(current_user["_id"])
     restaurant.id = restaurant_id
     return restaurant
 
@@ -53,4 +64,8 @@ async def delete_restaurant(restaurant_id: str, current_user: dict = Depends(get
     result = await db.restaurants.delete_one({"_id": restaurant_id, "user_id": str(current_user["_id"])})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Restaurant not found")
+    restaurant_directory.invalidate(restaurant_id)
+    faq_cache.invalidate(restaurant_id)
+    prompt_contexts.invalidate(restaurant_id)
+    invalidate_owner(current_user["_id"])
     return {"message": "Deleted"}
@@ -1,24 +1,33 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from models.transcript import Transcript
 from utils.db import db
-from typing import List
+from typing import List, Optional
+from utils.pagination import Page, paginate, date_range, newest_first, stringify_id
 
-from routes.users import get_current_user
+from routes.users import get_current_user, get_owned_restaurant_ids
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Transcript])
-async def get_transcripts(restaurant_id: str, current_user: dict = Depends(get_current_user)):
-    transcripts = await db.transcripts.find({"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id }).to_list(100)
-    return transcripts
+async def get_transcripts(
+    restaurant_id: str,
+    response: Response,
+    start: Optional[str] = Query(None, description="Earliest call timestamp or date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Latest call timestamp or date, inclusive"),
+    page: Page = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
+    query = {"user_id": str(current_user["_id"]), "restaurant_id": restaurant_id}
+    if date_range(start, end):
+        query["timestamp"] = date_range(start, end)
+    return await paginate(db.transcripts, query, newest_first("timestamp"), page, response, prepare=stringify_id)
 
 
 @router.post("/", response_model=Transcript)
-async def create_transcript(transcript: Transcript, current_user: dict = Depends(get_current_user)):
+async def create_transcript(transcript: Transcript, current_user: dict = Depends(get_current_user), owned: frozenset = Depends(get_owned_restaurant_ids)):
     # Verify restaurant belongs to user
-    restaurant = await db.restaurants.find_one({"_id": transcript.restaurant_id, "user_id": str(current_user["_id"])})
-    if not restaurant:
+    if transcript.restaurant_id not in owned:
         raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
     transcript.user_id = str(current_user["_id"])
     result = await db.transcripts.insert_one(transcript.dict(by_alias=True))
@@ -8,17 +8,42 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 from bson import ObjectId
+from utils.ttl_cache import TTLCache
+from utils.ownership import owned_restaurant_ids
+from utils.password_pool import PasswordPool, PasswordPoolSaturated
+from utils.metrics import Gauge
+import os
+import time
+import logging
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work runs here, off the event loop; a full pool answers 429
+password_pool = PasswordPool(pwd_context)
+Gauge("password_pool_in_flight", "Password hash/verify operations admitted to the pool",
+      function=lambda: password_pool.in_flight)
+Gauge("password_pool_queue_depth", "Password operations waiting for a worker",
+      function=lambda: max(0, password_pool.in_flight - password_pool.workers))
+Gauge("password_pool_rejected", "Password operations rejected with 429 since startup",
+      function=lambda: password_pool.stats["rejected"])
+
+logger = logging.getLogger(__name__)
 
 # JWT settings
 SECRET_KEY = "your_secret_key_here"  # Change to a secure value in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 720  
 
+# Auth caches: decoded token payloads and user documents, so an authenticated
+# request normally costs neither a signature check nor a Mongo round trip.
+# AUTH_CACHE_TTL=0 disables both.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_TRUST_CLAIMS = os.getenv("AUTH_TRUST_CLAIMS", "true").lower() == "true"
+token_cache = TTLCache(AUTH_CACHE_TTL, maxsize=10000)
+user_cache = TTLCache(AUTH_CACHE_TTL, maxsize=10000)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -28,41 +53,108 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def invalidate_user(user_id: str) -> None:
+    """
+    Drops a cached user document; call whenever a user record changes
+    """
+    user_cache.pop(str(user_id))
+
+
+def decode_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    payload = token_cache.get(token)
+    if payload is not None and payload.get("exp", float("inf")) > time.time():
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        print(user_id)
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    if payload.get("sub") is None:
+        raise credentials_exception
+    # Never cache a token past its own expiry
+    token_cache.set(token, payload, ttl=min(AUTH_CACHE_TTL, payload.get("exp", float("inf")) - time.time()))
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = decode_token(token)
+    user_id: str = payload["sub"]
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"password_hash": 0})
     if user is None:
-        raise credentials_exception     
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_cache.set(user_id, user)
     return user
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)):
+    """
+    Lightweight dependency for read-only endpoints: trusts the signed token
+    claims instead of loading the user. Falls back to get_current_user when
+    AUTH_TRUST_CLAIMS is off.
+    """
+    if not AUTH_TRUST_CLAIMS:
+        return await get_current_user(token)
+    payload = decode_token(token)
+    return {"_id": ObjectId(payload["sub"]), "email": payload.get("email")}
+async def get_owned_restaurant_ids(current_user: dict = Depends(get_current_user)):
+    """
+    The current user's restaurant ids, resolved once per request and cached per user
+    """
+    return await owned_restaurant_ids(current_user["_id"])
+
+async def require_restaurant_owner(restaurant_id: str, owned: frozenset = Depends(get_owned_restaurant_ids)) -> str:
+    """
+    Rejects the request with 403 unless the current user owns `restaurant_id`
+    (taken from the path or query string)
+    """
+    if restaurant_id not in owned:
+        raise HTTPException(status_code=403, detail="Not authorized for this restaurant")
+    return restaurant_id
+
+async def run_password_work(operation):
+    """
+    Awaits a password pool operation, turning saturation into a 429
+    """
+    try:
+        return await operation
+    except PasswordPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+@router.get("/auth/password-pool")
+async def password_pool_stats():
+    return password_pool.snapshot()
+
 # Example protected route
 @router.get("/me")
-async def read_users_me(current_user: dict = Depends(get_current_user)):
+async def read_users_me(current_user: dict = Depends(get_current_principal)):
     return {"user_id": str(current_user["_id"]), "email": current_user["email"]}
 
 @router.post("/signup")
 async def signup(user: User):
-    print("[DEBUG] Incoming signup data:", user)
+    logger.debug("Signup request", extra={"email": user.email})
     # Check if user already exists
     existing = await db.users.find_one({"email": user.email})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     # Hash password
-    user.password_hash = pwd_context.hash(user.password_hash)
+    user.password_hash = await run_password_work(password_pool.hash(user.password_hash))
     user.created_at = datetime.utcnow().isoformat()
     result = await db.users.insert_one(user.dict(exclude={"id"}, by_alias=True))
     user.id = str(result.inserted_id)
+    invalidate_user(user.id)
     # Create JWT token
     access_token = create_access_token(data={"sub": user.id, "email": user.email})
     return {"token": access_token, "tenant": user.dict(by_alias=True, exclude={"password_hash"})}
@@ -72,7 +164,7 @@ async def login(data: LoginRequest):
     user = await db.users.find_one({"email": data.email})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    pwd_valid = pwd_context.verify(data.password, user["password_hash"])
+    pwd_valid = await run_password_work(password_pool.verify(data.password, user["password_hash"]))
     if not pwd_valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     # Create JWT token
@@ -1,27 +1,175 @@
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from models.transcript import Transcript
 from models.order import Order
 from models.restaurant import Restaurant
+from models.intent import Intent, OrderIntent, BookingIntent, QuestionIntent
 from utils.db import db
 from utils.elevenlabs_client import ElevenLabsClient
+from utils.tts_cache import TTSCache
+from utils.audio_store import AudioStore
+from utils.call_stages import CallStages
+from utils.restaurant_directory import restaurant_directory, RestaurantContext
+from utils.menu_index import menu_indexes
+from utils.faq_cache import faq_cache
+from utils.prompt_context import prompt_contexts
+from utils.intent_classifier import intent_engine
+from utils.intent_parser import intent_parser, INTENT_FUNCTION, FUNCTION_NAME
+from utils.hours import local_now, format_minutes
+from utils.availability import availability, parse_minutes
+from utils.post_call import schedule_post_call
+from utils.metrics import span
+from utils.voice_pipeline import MediaStreamSession, WhisperSTT, OpenAIStreamingLLM, ElevenLabsStreamingTTS
 import openai
 import os
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any
+from bson import ObjectId
+from pydantic import ValidationError
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List
 import json
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse
 from twilio.twiml.voice_response import VoiceResponse, Play, Record
-import tempfile
 
 # Initialize ElevenLabs client
 elevenlabs_client = ElevenLabsClient()
+tts_cache = TTSCache(elevenlabs_client)
+audio_store = AudioStore(elevenlabs_client)
+
+# Providers for the real-time Media Streams pipeline
+stream_stt = WhisperSTT()
+stream_llm = OpenAIStreamingLLM()
+stream_tts = ElevenLabsStreamingTTS(elevenlabs_client)
 
 router = APIRouter()
 
 
 
 
+# Fixed prompts are served from the TTS cache and pre-warmed at startup
+GREETING_TEXT = "Hello! Welcome to our AI ordering system. Please tell me how I can help you today after the beep."
+RINGING_GREETING_TEXT = "Hello! Welcome to our AI ordering system. How may I help you today?"
+NOT_REGISTERED_TEXT = "Sorry, this restaurant is not registered in our system."
+FALLBACK_TEXT = "Sorry, I didn't catch that. Please tell me again after the beep."
+PREWARM_PROMPTS = [GREETING_TEXT, RINGING_GREETING_TEXT, NOT_REGISTERED_TEXT, FALLBACK_TEXT]
+BEEP_URL = "https://actions.google.com/sounds/v1/alarms/beep_short.ogg"
+AUDIO_WAIT_SECONDS = float(os.getenv("AUDIO_STORE_WAIT", "20"))
+
+
+def public_url(request: Request, path: str) -> str:
+    """
+    Builds an absolute URL Twilio can fetch. PUBLIC_BASE_URL overrides the
+    request host when the app sits behind a proxy or tunnel.
+    """
+    base_url = os.getenv("PUBLIC_BASE_URL") or str(request.base_url)
+    return base_url.rstrip("/") + path
+
+
+async def cached_prompt_url(request: Request, text: str) -> str:
+    """
+    Returns the public URL of the cached audio for a fixed prompt
+    """
+    key = await tts_cache.get_or_synthesize(text)
+    return public_url(request, f"/api/v1/voice/tts/{key}.mp3")
+
+
+def ranged_file_response(request: Request, path: str, media_type: str) -> Response:
+    """
+    Serves a file with HTTP Range support. Full requests go through FileResponse;
+    byte ranges get a 206 with only the requested slice.
+    """
+    file_size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if not range_header or not range_header.startswith("bytes="):
+        return FileResponse(path, media_type=media_type, headers={"Accept-Ranges": "bytes"})
+
+    try:
+        start_str, end_str = range_header[len("bytes="):].split(",")[0].strip().split("-")
+        if start_str:
+            start = int(start_str)
+            end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(file_size - int(end_str), 0)
+            end = file_size - 1
+    except ValueError:
+        start, end = file_size, file_size - 1
+    if start > end or start >= file_size:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    def iter_range(chunk_size: int = 64 * 1024):
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(
+        iter_range(),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{file_size}",
+            "Content-Length": str(end - start + 1)
+        }
+    )
+
+
+@router.get("/audio/{audio_id}.mp3")
+async def get_reply_audio(audio_id: str, request: Request):
+    """
+    Serves per-turn reply audio from the short-lived audio store, waiting for
+    synthesis to finish if Twilio asks before it is ready.
+    """
+    path = await audio_store.wait(audio_id, timeout=AUDIO_WAIT_SECONDS)
+    if path is None:
+        # The TwiML is already sent, so degrade to the beep rather than an error
+        return RedirectResponse(BEEP_URL)
+    return ranged_file_response(request, path, "audio/mpeg")
+
+
+@router.get("/tts/stats")
+async def get_tts_cache_stats():
+    return tts_cache.snapshot()
+
+
+@router.get("/faq/stats")
+async def get_faq_cache_stats():
+    return faq_cache.snapshot()
+
+
+@router.get("/prompt/stats")
+async def get_prompt_context_stats():
+    return prompt_contexts.snapshot()
+
+
+@router.get("/intent/stats")
+async def get_intent_stats():
+    return {**intent_engine.snapshot(), "llm_parsing": intent_parser.snapshot()}
+
+
+@router.get("/booking/stats")
+async def get_booking_stats():
+    return availability.snapshot()
+
+
+@router.get("/tts/{key}.mp3")
+async def get_cached_tts(key: str, request: Request):
+    """
+    Serves cached prompt audio, from memory when hot and from disk otherwise
+    """
+    audio = tts_cache.get_memory(key)
+    if audio is not None:
+        return Response(content=audio, media_type="audio/mpeg")
+    if tts_cache.has_disk(key):
+        return ranged_file_response(request, tts_cache.path_for(key), "audio/mpeg")
+    raise HTTPException(status_code=404, detail="Audio not found")
+
+
 # Enhanced Twilio webhook: greet caller and record their response
 @router.post("/twilio")
 async def twilio_greeting_and_record(request: Request):
@@ -29,17 +177,13 @@ async def twilio_greeting_and_record(request: Request):
     Greets the caller and records their response. The recording is sent to /api/v1/voice/webhook for further processing.
     """
     logging.info("Received Twilio call - greeting and recording")
-    greeting_text = "Hello! Welcome to our AI ordering system. Please tell me how I can help you today after the beep."
-    temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-    audio_path = temp_audio.name
-    temp_audio.close()
     try:
-        elevenlabs_client.synthesize(greeting_text, audio_path)
+        audio_url = await cached_prompt_url(request, GREETING_TEXT)
         twiml = f"""
         <Response>
-            <Play>{audio_path}</Play>
+            <Play>{audio_url}</Play>
             <Record maxLength='30' action='/api/v1/voice/webhook' method='POST' timeout='3' />
-            <Play>https://actions.google.com/sounds/v1/alarms/beep_short.ogg</Play>
+            <Play>{BEEP_URL}</Play>
         </Response>
         """
     except Exception as e:
@@ -47,18 +191,67 @@ async def twilio_greeting_and_record(request: Request):
         # Play a generic error audio or silence
         twiml = f"""
         <Response>
-            <Play>https://actions.google.com/sounds/v1/alarms/beep_short.ogg</Play>
+            <Play>{BEEP_URL}</Play>
         </Response>
         """
-    finally:
-        if os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-            except Exception as cleanup_err:
-                logging.warning(f"Failed to delete temp greeting audio: {cleanup_err}")
     return Response(content=twiml, media_type="application/xml")
 
 
+# Real-time alternative to /webhook: Twilio streams call audio over a WebSocket
+@router.post("/stream")
+async def twilio_media_stream_twiml(request: Request):
+    """
+    Connects the call to the /media-stream WebSocket instead of the record-and-reply loop.
+    """
+    form = await request.form()
+    restaurant_phone = form.get("To", "")
+    stream_url = public_url(request, "/api/v1/voice/media-stream").replace("http", "ws", 1)
+    twiml = f"""
+    <Response>
+        <Connect>
+            <Stream url="{stream_url}">
+                <Parameter name="restaurant_phone" value="{restaurant_phone}" />
+            </Stream>
+        </Connect>
+    </Response>
+    """
+    return Response(content=twiml, media_type="application/xml")
+
+
+async def stream_system_prompt(parameters: dict) -> str:
+    restaurant = await restaurant_directory.by_phone(parameters.get("restaurant_phone"))
+    prompt = "You are a friendly restaurant phone assistant taking orders, bookings and questions."
+    if restaurant:
+        prompt = (
+            f"You are the phone assistant for {restaurant.name}. "
+            f"Opening hours: {restaurant.get('hours')}. Help callers with orders, bookings and questions."
+        )
+    return prompt + " Reply in one or two short spoken sentences."
+
+
+@router.websocket("/media-stream")
+async def twilio_media_stream(websocket: WebSocket):
+    """
+    Twilio Media Streams endpoint: incremental STT, sentence-level TTS overlapped
+    with LLM token streaming, audio frames sent back as they are produced.
+    """
+    await websocket.accept()
+    session = MediaStreamSession(
+        stt=stream_stt,
+        llm=stream_llm,
+        tts=stream_tts,
+        send_text=websocket.send_text,
+        system_prompt_for=stream_system_prompt
+    )
+    try:
+        await session.run(websocket.receive_text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        logging.info(f"Media stream {session.stream_sid} ended; turn timings: {session.turns}")
+
+
 # Existing full-featured webhook for production/advanced use
 @router.post("/webhook")
 async def twilio_webhook(request: Request):
@@ -79,15 +272,11 @@ async def twilio_webhook(request: Request):
 
         # Initial call greeting
         if call_status == "ringing":
-            greeting_text = "Hello! Welcome to our AI ordering system. How may I help you today?"
-            temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            audio_path = temp_audio.name
-            temp_audio.close()
             try:
-                elevenlabs_client.synthesize(greeting_text, audio_path)
+                audio_url = await cached_prompt_url(request, RINGING_GREETING_TEXT)
                 twiml = f"""
                 <Response>
-                    <Play>{audio_path}</Play>
+                    <Play>{audio_url}</Play>
                     <Record maxLength='30' action='/voice/webhook' timeout='3' />
                 </Response>
                 """
@@ -95,38 +284,32 @@ async def twilio_webhook(request: Request):
                 logging.error(f"ElevenLabs synthesis failed for greeting: {e}")
                 twiml = f"""
                 <Response>
-                    <Play>https://actions.google.com/sounds/v1/alarms/beep_short.ogg</Play>
+                    <Play>{BEEP_URL}</Play>
                 </Response>
                 """
-            finally:
-                # Clean up temp file if it exists
-                if os.path.exists(audio_path):
-                    try:
-                        os.remove(audio_path)
-                    except Exception as cleanup_err:
-                        logging.warning(f"Failed to delete temp greeting audio: {cleanup_err}")
             return Response(content=twiml, media_type="application/xml")
 
         # Handle recorded audio
         if recording_url:
-            # 1. Transcribe audio using Whisper API
-            transcript_text = await transcribe_audio(recording_url)
+            # The restaurant lookup does not depend on the recording, so it runs
+            # alongside transcription and rejects unknown numbers before any AI call
+            stages = CallStages()
+            lookup = stages.start("restaurant_lookup", restaurant_directory.by_phone(restaurant_phone))
+            transcription = stages.start("transcription", transcribe_audio(recording_url))
 
-            # 2. Process with GPT for intent detection
-            intent_response = await process_with_gpt(transcript_text)
-
-            # 3. Create transcript record
-            restaurant = await db.restaurants.find_one({"phone": restaurant_phone})
+            try:
+                restaurant = await lookup
+            except BaseException:
+                # Failed or cancelled lookup: don't leave transcription running unawaited
+                await stages.cancel(transcription)
+                raise
             if not restaurant:
-                error_text = "Sorry, this restaurant is not registered in our system."
-                temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-                audio_path = temp_audio.name
-                temp_audio.close()
+                await stages.cancel(transcription)
                 try:
-                    elevenlabs_client.synthesize(error_text, audio_path)
+                    audio_url = await cached_prompt_url(request, NOT_REGISTERED_TEXT)
                     twiml = f"""
                     <Response>
-                        <Play>{audio_path}</Play>
+                        <Play>{audio_url}</Play>
                         <Hangup/>
                     </Response>
                     """
@@ -134,62 +317,53 @@ async def twilio_webhook(request: Request):
                     logging.error(f"ElevenLabs synthesis failed for error message: {e}")
                     twiml = f"""
                     <Response>
-                        <Play>https://actions.google.com/sounds/v1/alarms/beep_short.ogg</Play>
+                        <Play>{BEEP_URL}</Play>
                         <Hangup/>
                     </Response>
                     """
-                finally:
-                    if os.path.exists(audio_path):
-                        try:
-                            os.remove(audio_path)
-                        except Exception as cleanup_err:
-                            logging.warning(f"Failed to delete temp error audio: {cleanup_err}")
                 return Response(content=twiml, media_type="application/xml")
 
+            # 1. Transcribe audio using Whisper API, 2. detect the intent locally or with GPT
+            transcript_text = await transcription
+            intent_response = await stages.run("intent", detect_intent(transcript_text, restaurant))
+
+            # 3. Handle the intent (order, booking, or question)
+            reply = await stages.run("handle_intent", handle_intent(intent_response, restaurant, caller_id))
+            order = reply.pop("order", None)
+
+            # 4. Persisting the transcript and order, rollups and the receipt
+            # run as background jobs once the outbox write has landed
             transcript = Transcript(
-                restaurant_id=restaurant["_id"],
+                _id=str(ObjectId()),
+                restaurant_id=restaurant.id,
+                order_id=order["_id"] if order else None,
                 user_id=caller_id,
                 call_text=transcript_text,
                 timestamp=datetime.utcnow().isoformat()
             )
-            result = await db.transcripts.insert_one(transcript.dict(by_alias=True))
-            transcript.id = str(result.inserted_id)
-
-            # 4. Handle the intent (order, booking, or question)
-            reply = await handle_intent(intent_response, restaurant["_id"], caller_id, transcript.id)
+            transcript.stage_timings = stages.finish()
+            await schedule_post_call(transcript.dict(by_alias=True), order)
             reply_text = reply.get("message", "Thank you. Your request has been processed.")
-            temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            audio_path = temp_audio.name
-            temp_audio.close()
-            try:
-                elevenlabs_client.synthesize(reply_text, audio_path)
-                twiml = f"""
-                <Response>
-                    <Play>{audio_path}</Play>
-                    <Hangup/>
-                </Response>
-                """
-            except Exception as e:
-                logging.error(f"ElevenLabs synthesis failed for reply: {e}")
-                twiml = f"""
-                <Response>
-                    <Play>https://actions.google.com/sounds/v1/alarms/beep_short.ogg</Play>
-                    <Hangup/>
-                </Response>
-                """
-            finally:
-                if os.path.exists(audio_path):
-                    try:
-                        os.remove(audio_path)
-                    except Exception as cleanup_err:
-                        logging.warning(f"Failed to delete temp reply audio: {cleanup_err}")
+            # Synthesis runs while Twilio receives the TwiML and requests the audio URL
+            audio_id = audio_store.submit(reply_text)
+            audio_url = public_url(request, f"/api/v1/voice/audio/{audio_id}.mp3")
+            twiml = f"""
+            <Response>
+                <Play>{audio_url}</Play>
+                <Hangup/>
+            </Response>
+            """
             return Response(content=twiml, media_type="application/xml")
 
         # Fallback for missing audio
-        error_audio_url = "https://actions.google.com/sounds/v1/alarms/beep_short.ogg"
+        try:
+            audio_url = await cached_prompt_url(request, FALLBACK_TEXT)
+        except Exception as e:
+            logging.error(f"ElevenLabs synthesis failed for fallback prompt: {e}")
+            audio_url = BEEP_URL
         twiml = f"""
         <Response>
-            <Play>{error_audio_url}</Play>
+            <Play>{audio_url}</Play>
             <Record maxLength='30' action='/voice/webhook' timeout='3' />
         </Response>
         """
@@ -206,81 +380,83 @@ async def transcribe_audio(audio_url: str) -> str:
         # Download audio file from URL
         # Convert to format accepted by Whisper
         # Send to Whisper API
-        response = await openai.Audio.transcribe("whisper-1", audio_url)
+        async with span("whisper"):
+            response = await openai.Audio.transcribe("whisper-1", audio_url)
         return response.text
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
 
-async def process_with_gpt(transcript: str) -> dict:
+async def detect_intent(transcript: str, restaurant: RestaurantContext) -> Intent:
+    """
+    Detects intent with the local classifier, falling back to GPT when it is not confident
+    """
+    menu_index = await menu_indexes.get(restaurant.id)
+    prediction = intent_engine.classify(transcript, menu_index, local_now(restaurant.get("timezone")))
+    if prediction is not None:
+        try:
+            return intent_parser.parse_data(prediction.data)
+        except ValidationError as e:
+            logging.error(f"Local intent failed validation, using GPT: {e}")
+    return await process_with_gpt(transcript, restaurant)
+
+async def process_with_gpt(transcript: str, restaurant: RestaurantContext) -> Intent:
     """
-    Processes transcript with GPT to detect intent and extract structured data
+    Processes transcript with GPT to detect intent and extract structured data.
+    The reply is a forced record_intent call validated straight into an intent
+    model; one invalid reply gets a single repair round trip, and if that fails
+    too the utterance is treated as a question.
     """
     try:
-        # Construct prompt for GPT
-        prompt = f"""
-        Analyze this customer conversation and extract the following:
-        1. Intent (order, booking, or question)
-        2. Relevant details based on intent:
-           - For orders: items, quantities, special instructions
-           - For bookings: date, time, party size
-           - For questions: specific topic, context needed
-        
-        Conversation: {transcript}
-        
-        Return as JSON format.
-        """
-
-        response = await openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a restaurant AI assistant analyzing customer conversations."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        return response.choices[0].message.content
+        # Compact prompt: cached per-restaurant prefix plus only the menu items the caller mentioned
+        menu_index = await menu_indexes.get(restaurant.id)
+        context = prompt_contexts.build(restaurant, menu_index, "intent", transcript)
+
+        async def complete(messages: List[dict]) -> dict:
+            async with span("gpt"):
+                response = await openai.ChatCompletion.acreate(
+                    model="gpt-4",
+                    messages=messages,
+                    functions=[INTENT_FUNCTION],
+                    function_call={"name": FUNCTION_NAME},
+                    temperature=0
+                )
+            return response.choices[0].message
+
+        intent, result = await intent_parser.run(context.messages, complete, QuestionIntent(question=transcript))
+        if result == "failed":
+            logging.error(f"GPT intent reply could not be validated; answering as a question: {transcript!r}")
+        return intent
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GPT processing error: {str(e)}")
 
-async def handle_intent(intent_data: dict, restaurant_id: str, user_id: str, transcript_id: str) -> dict:
+async def handle_intent(intent: Intent, restaurant: RestaurantContext, user_id: str) -> dict:
     """
     Handles the detected intent and takes appropriate action
     """
     try:
-        if intent_data["intent"] == "order":
+        intent_data = intent.model_dump()
+        if isinstance(intent, OrderIntent):
             # Create new order
-            order_response = await create_order_from_intent(intent_data, restaurant_id, user_id)
-            # Link order to transcript
-            await db.transcripts.update_one(
-                {"_id": transcript_id},
-                {"$set": {"order_id": order_response["id"]}}
-            )
-            return order_response
+            return await create_order_from_intent(intent_data, restaurant, user_id)
 
-        elif intent_data["intent"] == "booking":
-            # Handle booking logic
-            return {"message": "Booking created", "details": intent_data}
+        elif isinstance(intent, BookingIntent):
+            return await handle_booking_intent(intent_data, restaurant, user_id)
 
         else:  # question
-            # Handle FAQ/question logic
-            return {"message": "Question processed", "details": intent_data}
+            return await handle_question_intent(intent_data, restaurant)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Intent handling error: {str(e)}")
 
-async def create_order_from_intent(intent_data: dict, restaurant_id: str, user_id: str) -> dict:
+async def create_order_from_intent(intent_data: dict, restaurant: RestaurantContext, user_id: str) -> dict:
     """
-    Creates an order in the database from the intent data
+    Builds an order from the intent data. The document is returned under
+    "order" for the caller to persist; it is not written here.
     """
     try:
-        # Get restaurant menu for validation
-        restaurant = await db.restaurants.find_one({"_id": restaurant_id})
-        if not restaurant:
-            raise HTTPException(status_code=404, detail="Restaurant not found")
-
-        # Extract order items and validate against menu
-        menu_items = {item["item"].lower(): item for item in restaurant["menu"]}
+        # Extract order items and match them against the restaurant's menu index
+        menu_index = await menu_indexes.get(restaurant.id)
         order_items = []
         total = 0.0
 
@@ -292,15 +468,16 @@ async def create_order_from_intent(intent_data: dict, restaurant_id: str, user_i
             if not isinstance(item, dict) or "item" not in item or not isinstance(item["item"], str):
                 skipped_items += 1
                 continue
-            menu_item = menu_items.get(item["item"].lower())
-            if not menu_item:
+            match = menu_index.match(item["item"])
+            if not match:
                 skipped_items += 1
                 continue
+            menu_item, _ = match
 
             quantity = item.get("quantity", 1)
             price = menu_item["price"] * quantity
             order_items.append({
-                "item": menu_item["item"],
+                "item": menu_item["name"],
                 "qty": quantity,
                 "price": menu_item["price"],
                 "total": price
@@ -315,7 +492,7 @@ async def create_order_from_intent(intent_data: dict, restaurant_id: str, user_i
 
         # Create new order
         order = Order(
-            restaurant_id=restaurant_id,
+            restaurant_id=restaurant.id,
             items=order_items,
             customer_phone=user_id,
             timestamp=datetime.utcnow().isoformat(),
@@ -323,21 +500,14 @@ async def create_order_from_intent(intent_data: dict, restaurant_id: str, user_i
             total_amount=total
         )
 
-        result = await db.orders.insert_one(order.dict(by_alias=True))
-        order.id = str(result.inserted_id)
-
-        # Generate receipt (you can implement this later)
-        # receipt_path = await generate_receipt(order)
-        # await db.orders.update_one(
-        #     {"_id": order.id},
-        #     {"$set": {"receipt_path": receipt_path}}
-        # )
+        order.id = str(ObjectId())
 
         return {
             "id": order.id,
             "status": "created",
             "total": total,
-            "items": order_items
+            "items": order_items,
+            "order": order.dict(by_alias=True)
         }
 
     except Exception as e:
@@ -345,53 +515,75 @@ async def create_order_from_intent(intent_data: dict, restaurant_id: str, user_i
 
 
 
-async def handle_booking_intent(intent_data: dict, restaurant_id: str) -> dict:
+def spoken_day(day: str, now: datetime) -> str:
+    parsed = date.fromisoformat(day)
+    if parsed == now.date():
+        return "today"
+    if parsed == now.date() + timedelta(days=1):
+        return "tomorrow"
+    return f"on {parsed.strftime('%A, %B')} {parsed.day}"
+
+def spoken_alternatives(alternatives: list) -> str:
+    if not alternatives:
+        return " We have no other tables free that day."
+    times = [format_minutes(parse_minutes(time)) for time in alternatives]
+    return f" I could do {', '.join(times[:-1])} or {times[-1]} instead." if len(times) > 1 else f" I could do {times[0]} instead."
+
+async def handle_booking_intent(intent_data: dict, restaurant: RestaurantContext, user_id: str) -> dict:
     """
-    Handles booking requests
+    Reserves a table through the availability engine, offering the nearest
+    open times when the requested one cannot be booked
     """
-    # Implement booking logic here
-    booking = {
-        "restaurant_id": restaurant_id,
-        "date": intent_data.get("date"),
-        "time": intent_data.get("time"),
-        "party_size": intent_data.get("party_size"),
-        "status": "confirmed"
-    }
-    
-    result = await db.bookings.insert_one(booking)
-    booking["id"] = str(result.inserted_id)
-    
-    return booking
-
-async def handle_question_intent(intent_data: dict, restaurant_id: str) -> dict:
-    """
-    Handles general questions about the restaurant
-    """
-    restaurant = await db.restaurants.find_one({"_id": restaurant_id})
-    
-    # Use GPT to generate response based on restaurant info
-    prompt = f"""
-    Answer the following question about this restaurant:
-    Restaurant Info:
-    Name: {restaurant["name"]}
-    Hours: {restaurant["hours"]}
-    Menu: {restaurant["menu"]}
-    
-    Question: {intent_data["question"]}
-    """
-    
-    response = await openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are a helpful restaurant assistant."},
-            {"role": "user", "content": prompt}
-        ]
+    if not intent_data.get("time") or not intent_data.get("party_size"):
+        return {"message": "I can book a table for you. What time would you like, and for how many people?"}
+    now = local_now(restaurant.get("timezone"))
+    day = intent_data.get("date") or now.date().isoformat()
+    reservation = await availability.reserve(
+        restaurant, day, intent_data["time"], intent_data["party_size"],
+        {"user_id": restaurant.get("user_id"), "customer_phone": user_id}
     )
-    
+    if reservation.status == "invalid":
+        return {"message": "Sorry, I didn't catch when you'd like to come in. Could you tell me the day and time again?"}
+    if reservation.status == "too_large":
+        return {"message": "Sorry, we can't take a party that size over the phone. Please contact the restaurant directly."}
+
+    when = f"{spoken_day(day, now)} at {format_minutes(parse_minutes(intent_data['time']))}"
+    if reservation.status == "confirmed":
+        booking = reservation.booking
+        return {
+            "message": f"You're booked for {booking['party_size']} {when}. See you then!",
+            "booking": {"id": booking["_id"], "date": booking["date"], "time": booking["time"], "party_size": booking["party_size"]}
+        }
+    reasons = {"full": "we're fully booked", "closed": "we don't take bookings", "past": "it's too late to book"}
+    offer = spoken_alternatives(reservation.alternatives) if reservation.alternatives or reservation.status == "full" else ""
+    return {
+        "message": f"Sorry, {reasons[reservation.status]} {when}.{offer}",
+        "alternatives": reservation.alternatives
+    }
+
+async def handle_question_intent(intent_data: dict, restaurant: RestaurantContext) -> dict:
+    """
+    Handles general questions about the restaurant. Hours questions and
+    questions asked before (or paraphrased) are answered from the FAQ cache;
+    only new questions go to GPT.
+    """
+    question = intent_data.get("question") or intent_data.get("topic") or ""
+
+    async def ask_gpt() -> str:
+        # Restaurant facts and only the menu items the question touches, within the token budget
+        menu_index = await menu_indexes.get(restaurant.id)
+        context = prompt_contexts.build(restaurant, menu_index, "question", question)
+        async with span("gpt"):
+            response = await openai.ChatCompletion.acreate(model="gpt-4", messages=context.messages)
+        return response.choices[0].message.content
+
+    answer, source = await faq_cache.answer(restaurant, question, ask_gpt)
     return {
-        "answer": response.choices[0].message.content,
+        "message": answer,
+        "answer": answer,
         "context": {
-            "restaurant": restaurant["name"],
-            "topic": intent_data.get("topic")
+            "restaurant": restaurant.name,
+            "topic": intent_data.get("topic"),
+            "source": source
         }
     }
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+import time
+import asyncio
+import logging
+import secrets
+import tempfile
+from typing import Dict, Optional
+
+from utils.elevenlabs_client import ElevenLabsClient
+
+
+class AudioEntry:
+    def __init__(self, path: str, expires_at: float, task: asyncio.Task):
+        self.path = path
+        self.expires_at = expires_at
+        self.task = task
+
+
+class AudioStore:
+    """
+    Short-lived store for per-turn reply audio.
+
+    submit() starts synthesis in the background and immediately returns an id,
+    so TwiML can reference the audio URL while ElevenLabs is still streaming.
+    Files live for `ttl_seconds` (long enough for Twilio to fetch them) and are
+    removed by a periodic sweep.
+    """
+
+    def __init__(
+        self,
+        client: ElevenLabsClient,
+        store_dir: Optional[str] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.client = client
+        self.store_dir = store_dir or os.getenv("AUDIO_STORE_DIR") or os.path.join(tempfile.gettempdir(), "voice_audio")
+        self.ttl_seconds = ttl_seconds or float(os.getenv("AUDIO_STORE_TTL", "300"))
+        self._entries: Dict[str, AudioEntry] = {}
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def submit(self, text: str) -> str:
+        """
+        Schedules synthesis of `text` and returns the audio id
+        """
+        audio_id = secrets.token_urlsafe(16)
+        path = os.path.join(self.store_dir, f"{audio_id}.mp3")
+        task = asyncio.create_task(self.client.synthesize_async(text, path))
+        self._entries[audio_id] = AudioEntry(path, time.monotonic() + self.ttl_seconds, task)
+        return audio_id
+
+    async def wait(self, audio_id: str, timeout: float) -> Optional[str]:
+        """
+        Waits for the audio to finish synthesizing and returns its path,
+        or None if it is unknown, expired or failed.
+        """
+        entry = self._entries.get(audio_id)
+        if entry is None or entry.expires_at < time.monotonic():
+            return None
+        try:
+            await asyncio.wait_for(asyncio.shield(entry.task), timeout)
+        except Exception as e:
+            logging.error(f"Reply audio {audio_id} unavailable: {e}")
+            return None
+        return entry.path
+
+    def _remove(self, audio_id: str) -> None:
+        entry = self._entries.pop(audio_id)
+        if not entry.task.done():
+            entry.task.cancel()
+        elif not entry.task.cancelled():
+            # Mark a failed synthesis as retrieved so asyncio does not warn about it
+            entry.task.exception()
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Failed to delete reply audio {audio_id}: {e}")
+
+    def sweep(self) -> int:
+        """
+        Removes expired entries and returns how many were dropped
+        """
+        now = time.monotonic()
+        expired = [audio_id for audio_id, entry in self._entries.items() if entry.expires_at < now]
+        for audio_id in expired:
+            self._remove(audio_id)
+        return len(expired)
+
+    async def run_sweeper(self, interval: float = 30.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def clear(self) -> None:
+        for audio_id in list(self._entries):
+            self._remove(audio_id)
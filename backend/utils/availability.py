@@ -0,0 +1,342 @@
+"""
+Booking availability: capacity per time slot, derived from Restaurant.hours.
+
+A restaurant's day is divided into BOOKING_SLOT_MINUTES slots. A booking
+holds its party's covers in every slot its seating overlaps
+(BOOKING_DURATION_MINUTES from the booked time), and no slot may hold
+more than the restaurant's booking_capacity (BOOKING_CAPACITY by default).
+A booking must start and finish within one opening interval.
+
+Reservation is atomic per slot in Mongo. booking_slots has one document
+per (restaurant, date, slot), and a conditional $inc only succeeds while
+the slot still has room for the party. A booking takes its slots in
+order. If any slot is full, the slots already taken are given back, so
+concurrent callers can never double-book a slot.
+
+Availability checks and alternative times are answered from a DayIndex.
+It is built from one booking_slots query per restaurant and day, cached
+for BOOKING_INDEX_TTL seconds and updated with this process's own
+reservations and releases. Other processes' changes only show up when the
+entry expires, so a stale index can be wrong both ways. It may list a time
+that is already taken, and the conditional update then refuses it. It may
+also miss covers another process gave back. For that reason, reserve()
+reloads the day from Mongo before it answers full.
+
+Bookings made before slot accounting hold no slots. Give them their
+slots and rebuild the counters from the confirmed bookings with:
+
+    python -m utils.availability backfill [--restaurant-id ID]
+"""
+import argparse
+import asyncio
+import os
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from utils.db import db
+from utils.hours import MINUTES_PER_DAY, WeeklyHours, local_now
+from utils.restaurant_directory import RestaurantContext
+from utils.ttl_cache import TTLCache
+
+
+def parse_minutes(value: str) -> Optional[int]:
+    """
+    "19:30" -> 1170, or None when it is not HH:MM
+    """
+    try:
+        hour, minute = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+
+def format_hhmm(minutes: int) -> str:
+    hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+    return f"{hour:02d}:{minute:02d}"
+
+
+class DayIndex:
+    """
+    Covers held per slot start for one restaurant and day, sorted by start
+    """
+
+    def __init__(self, slots: Dict[int, int]):
+        self.starts = sorted(slots)
+        self.covers = [slots[start] for start in self.starts]
+
+    def load(self, start: int, end: int) -> int:
+        """
+        Most covers held in any slot starting in [start, end)
+        """
+        first, last = bisect_left(self.starts, start), bisect_left(self.starts, end)
+        return max(self.covers[first:last], default=0)
+
+    def add(self, slots: List[int], covers: int) -> None:
+        for start in slots:
+            position = bisect_left(self.starts, start)
+            if position < len(self.starts) and self.starts[position] == start:
+                self.covers[position] += covers
+            else:
+                self.starts.insert(position, start)
+                self.covers.insert(position, covers)
+
+
+class Reservation:
+    """
+    Outcome of a booking attempt: status is confirmed, full, closed, past,
+    too_large or invalid. alternatives are nearby open times (HH:MM).
+    """
+
+    def __init__(self, status: str, booking: Optional[dict] = None, alternatives: Optional[List[str]] = None):
+        self.status = status
+        self.booking = booking
+        self.alternatives = alternatives or []
+
+
+class AvailabilityEngine:
+    def __init__(self, slot_minutes: Optional[int] = None, duration_minutes: Optional[int] = None,
+                 default_capacity: Optional[int] = None, index_ttl: Optional[float] = None):
+        self.slot_minutes = slot_minutes or int(os.getenv("BOOKING_SLOT_MINUTES", "30"))
+        self.duration_minutes = duration_minutes or int(os.getenv("BOOKING_DURATION_MINUTES", "90"))
+        self.default_capacity = default_capacity or int(os.getenv("BOOKING_CAPACITY", "40"))
+        self.alternatives = int(os.getenv("BOOKING_ALTERNATIVES", "3"))
+        ttl = index_ttl if index_ttl is not None else float(os.getenv("BOOKING_INDEX_TTL", "5"))
+        self._days = TTLCache(ttl=ttl, maxsize=4096)
+        self.stats = Counter()
+
+    def capacity(self, restaurant: RestaurantContext) -> int:
+        return int(restaurant.get("booking_capacity") or self.default_capacity)
+
+    def seating_slots(self, start: int) -> List[int]:
+        """
+        Slot starts a seating at `start` overlaps
+        """
+        first = start - start % self.slot_minutes
+        return list(range(first, start + self.duration_minutes, self.slot_minutes))
+
+    def bookable(self, hours: WeeklyHours, day: date, start: int) -> bool:
+        if not hours.known():
+            # Hours not set or not parseable: any seating that ends by midnight
+            return start + self.duration_minutes <= MINUTES_PER_DAY
+        return any(opens <= start and start + self.duration_minutes <= closes
+                   for opens, closes in hours.intervals(day.weekday()))
+
+    def slot_starts(self, hours: WeeklyHours, day: date) -> List[int]:
+        """
+        Every bookable start time on the slot grid for a day
+        """
+        if not hours.known():
+            return list(range(0, MINUTES_PER_DAY - self.duration_minutes + 1, self.slot_minutes))
+        starts = set()
+        for opens, closes in hours.intervals(day.weekday()):
+            first = -(-opens // self.slot_minutes) * self.slot_minutes
+            starts.update(range(first, closes - self.duration_minutes + 1, self.slot_minutes))
+        return sorted(starts)
+
+    async def day_index(self, restaurant_id: str, day: str, refresh: bool = False) -> DayIndex:
+        key = (restaurant_id, day)
+        index = None if refresh else self._days.get(key)
+        if index is None:
+            self.stats["index_loads"] += 1
+            cursor = db.booking_slots.find({"restaurant_id": restaurant_id, "date": day}, {"minute": 1, "covers": 1})
+            index = DayIndex({slot["minute"]: slot["covers"] async for slot in cursor})
+            self._days.set(key, index)
+        return index
+
+    def fits(self, index: DayIndex, start: int, party_size: int, capacity: int) -> bool:
+        slots = self.seating_slots(start)
+        return index.load(slots[0], slots[-1] + 1) + party_size <= capacity
+
+    def open_times(self, index: DayIndex, hours: WeeklyHours, day: date, party_size: int,
+                   capacity: int, now: Optional[datetime] = None) -> List[int]:
+        if now is not None and now.date() > day:
+            return []
+        starts = self.slot_starts(hours, day)
+        if now is not None and now.date() == day:
+            starts = [start for start in starts if start > now.hour * 60 + now.minute]
+        return [start for start in starts if self.fits(index, start, party_size, capacity)]
+
+    def nearest(self, open_times: List[int], start: int) -> List[str]:
+        closest = sorted(open_times, key=lambda candidate: (abs(candidate - start), candidate))[:self.alternatives]
+        return [format_hhmm(candidate) for candidate in sorted(closest)]
+
+    async def availability(self, restaurant: RestaurantContext, day: str, party_size: int) -> List[str]:
+        """
+        Open start times (HH:MM) for a party on a day
+        """
+        parsed = date.fromisoformat(day)
+        index = await self.day_index(restaurant.id, day)
+        hours = WeeklyHours.parse(restaurant.get("hours"))
+        now = local_now(restaurant.get("timezone"))
+        return [format_hhmm(start) for start in self.open_times(index, hours, parsed, party_size, self.capacity(restaurant), now)]
+
+    async def _hold(self, restaurant_id: str, day: str, minute: int, party_size: int, capacity: int) -> bool:
+        slot = {"_id": f"{restaurant_id}:{day}:{minute}", "covers": {"$lte": capacity - party_size}}
+        try:
+            await db.booking_slots.update_one(
+                slot,
+                {"$inc": {"covers": party_size}, "$setOnInsert": {"restaurant_id": restaurant_id, "date": day, "minute": minute}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The slot exists but is too full, or another caller created it
+            # first; without upsert the condition alone decides
+            result = await db.booking_slots.update_one(slot, {"$inc": {"covers": party_size}})
+            return result.modified_count == 1
+
+    async def _release_slots(self, restaurant_id: str, day: str, slots: List[int], party_size: int) -> None:
+        for minute in slots:
+            await db.booking_slots.update_one({"_id": f"{restaurant_id}:{day}:{minute}"}, {"$inc": {"covers": -party_size}})
+        index = self._days.get((restaurant_id, day))
+        if index is not None:
+            index.add(slots, -party_size)
+
+    async def reserve(self, restaurant: RestaurantContext, day: str, time: str, party_size: Optional[int],
+                      booking: Optional[dict] = None) -> Reservation:
+        """
+        Books a party if every slot its seating overlaps has room, and inserts
+        the booking document. Otherwise returns the reason and the nearest
+        open times that day.
+        """
+        restaurant_id = restaurant.id
+        start = parse_minutes(time)
+        try:
+            parsed = date.fromisoformat(day)
+        except (TypeError, ValueError):
+            parsed = None
+        if start is None or parsed is None or not party_size or party_size < 1:
+            self.stats["invalid"] += 1
+            return Reservation("invalid")
+        capacity = self.capacity(restaurant)
+        if party_size > capacity:
+            self.stats["too_large"] += 1
+            return Reservation("too_large")
+
+        hours = WeeklyHours.parse(restaurant.get("hours"))
+        now = local_now(restaurant.get("timezone"))
+        if now.date() > parsed or (now.date() == parsed and start <= now.hour * 60 + now.minute):
+            status = "past"
+        elif not self.bookable(hours, parsed, start):
+            status = "closed"
+        else:
+            status = None
+        index = await self.day_index(restaurant_id, day)
+        if status is None and not self.fits(index, start, party_size, capacity):
+            # The cached index may predate another process's release; only a
+            # fresh read may turn the caller away without trying the writes
+            index = await self.day_index(restaurant_id, day, refresh=True)
+            if not self.fits(index, start, party_size, capacity):
+                status = "full"
+        if status is not None:
+            self.stats[status] += 1
+            return Reservation(status, alternatives=self.nearest(self.open_times(index, hours, parsed, party_size, capacity, now), start))
+
+        slots = self.seating_slots(start)
+
+        held = []
+        for minute in slots:
+            if not await self._hold(restaurant_id, day, minute, party_size, capacity):
+                break
+            held.append(minute)
+        if len(held) < len(slots):
+            await self._release_slots(restaurant_id, day, held, party_size)
+            self.stats["full"] += 1
+            self.stats["conflicts"] += 1
+            index = await self.day_index(restaurant_id, day, refresh=True)
+            return Reservation("full", alternatives=self.nearest(self.open_times(index, hours, parsed, party_size, capacity, now), start))
+
+        document = {
+            **(booking or {}),
+            "_id": str(ObjectId()),
+            "restaurant_id": restaurant_id,
+            "date": day,
+            "time": format_hhmm(start),
+            "party_size": party_size,
+            "status": "confirmed",
+            "slots": slots
+        }
+        try:
+            await db.bookings.insert_one(document)
+        except PyMongoError:
+            await self._release_slots(restaurant_id, day, slots, party_size)
+            raise
+        index = self._days.get((restaurant_id, day))
+        if index is not None:
+            index.add(slots, party_size)
+        self.stats["confirmed"] += 1
+        return Reservation("confirmed", booking=document)
+
+    async def release(self, booking: dict) -> None:
+        """
+        Gives back the covers a deleted or cancelled booking held
+        """
+        if booking.get("slots") and booking.get("status") == "confirmed":
+            await self._release_slots(booking["restaurant_id"], booking["date"], booking["slots"], booking["party_size"])
+
+    async def backfill(self, restaurant_id: Optional[str] = None) -> int:
+        """
+        Gives confirmed bookings without slots their slots and rebuilds
+        booking_slots from every confirmed booking; returns the number of slot
+        documents written. Run while bookings are paused, or reservations made
+        during the rebuild may be lost.
+        """
+        query = {"restaurant_id": restaurant_id} if restaurant_id else {}
+        covers: Dict[tuple, int] = defaultdict(int)
+        updates = []
+        cursor = db.bookings.find({**query, "status": "confirmed"}, {"restaurant_id": 1, "date": 1, "time": 1, "party_size": 1, "slots": 1})
+        async for booking in cursor:
+            slots = booking.get("slots")
+            if not slots:
+                start = parse_minutes(booking.get("time"))
+                if start is None or not booking.get("date") or not booking.get("party_size"):
+                    self.stats["backfill_skipped"] += 1
+                    continue
+                slots = self.seating_slots(start)
+                updates.append(UpdateOne({"_id": booking["_id"]}, {"$set": {"slots": slots}}))
+            for minute in slots:
+                covers[(str(booking["restaurant_id"]), booking["date"], minute)] += booking["party_size"]
+
+        for i in range(0, len(updates), 1000):
+            await db.bookings.bulk_write(updates[i:i + 1000], ordered=False)
+        await db.booking_slots.delete_many(query)
+        operations = [
+            ReplaceOne(
+                {"_id": f"{rid}:{day}:{minute}"},
+                {"restaurant_id": rid, "date": day, "minute": minute, "covers": count},
+                upsert=True
+            )
+            for (rid, day, minute), count in covers.items()
+        ]
+        for i in range(0, len(operations), 1000):
+            await db.booking_slots.bulk_write(operations[i:i + 1000], ordered=False)
+        self._days.clear()
+        return len(operations)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "cached_days": len(self._days),
+            "slot_minutes": self.slot_minutes,
+            "duration_minutes": self.duration_minutes
+        }
+
+
+availability = AvailabilityEngine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Booking slot maintenance")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--restaurant-id", default=None)
+    args = parser.parse_args()
+    written = asyncio.run(availability.backfill(args.restaurant_id))
+    print(f"Rebuilt {written} booking slot documents")
@@ -0,0 +1,40 @@
+import time
+import asyncio
+from typing import Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class CallStages:
+    """
+    Runs the named stages of one call and records each stage's latency (ms).
+
+    start() schedules a stage as a task so independent stages overlap;
+    run() awaits a stage inline when it depends on earlier results.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def start(self, name: str, awaitable: Awaitable[T]) -> "asyncio.Task[T]":
+        return asyncio.create_task(self.run(name, awaitable))
+
+    async def cancel(self, *tasks: asyncio.Task) -> None:
+        """
+        Cancels stages whose result is no longer needed (e.g. after a short-circuit)
+        """
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def finish(self) -> Dict[str, float]:
+        self.timings["total"] = round((time.perf_counter() - self._started) * 1000, 2)
+        return self.timings
@@ -0,0 +1,300 @@
+"""
+Outbound call campaigns: reservation confirmations and order-ready callbacks.
+
+Creating a campaign snapshots its targets into `campaign_jobs`, one job per
+normalized phone number (the job _id is "<campaign_id>:<phone>", so the same
+customer is never queued twice in a campaign). CampaignRunner workers claim
+jobs atomically with a lease, respect a global and a per-restaurant calls
+per second limit, and place calls through VAPIClient.
+
+All progress lives in Mongo, so after a restart the workers simply carry
+on: queued jobs are claimed as usual and jobs whose lease expired mid-call
+are claimed again (a call that was placed just before a crash may repeat).
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from utils.db import db
+from utils.circuit_breaker import CircuitOpenError
+from utils.metrics import Counter
+from utils.rate_limit import TokenBucket
+from utils.restaurant_directory import normalize_phone
+from utils.vapi_client import VAPIClient, VAPIError, vapi_client
+
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+CAMPAIGN_CALLS = Counter("campaign_calls_total", "Campaign call attempts by outcome", ("outcome",))
+
+
+def booking_message(restaurant_name: str, booking: dict) -> str:
+    return (
+        f"Hi, this is {restaurant_name} calling to confirm your reservation for "
+        f"{booking.get('party_size')} on {booking.get('date')} at {booking.get('time')}. We look forward to seeing you!"
+    )
+
+
+def order_message(restaurant_name: str, order: dict) -> str:
+    name = order.get("customer_name")
+    greeting = f"Hi {name}" if name else "Hi"
+    return f"{greeting}, this is {restaurant_name}. Your order is ready for pickup."
+
+
+async def collect_targets(campaign: dict, restaurant_name: str) -> Dict[str, dict]:
+    """
+    Returns phone (E.164) -> {"message", "source_ids"} for the campaign's
+    bookings or orders. Several rows with the same number become one call.
+    """
+    has_phone = {"$nin": [None, ""]}
+    if campaign["kind"] == "booking_confirmation":
+        cursor = db.bookings.find({
+            "restaurant_id": campaign["restaurant_id"],
+            "date": campaign["date"],
+            "status": "confirmed",
+            "customer_phone": has_phone
+        })
+        render = booking_message
+    else:
+        cursor = db.orders.find({
+            "restaurant_id": campaign["restaurant_id"],
+            "status": campaign["order_status"],
+            "customer_phone": has_phone
+        })
+        render = order_message
+
+    targets: Dict[str, dict] = {}
+    async for row in cursor:
+        phone = normalize_phone(row["customer_phone"])
+        if phone is None:
+            continue
+        target = targets.setdefault(phone, {"message": render(restaurant_name, row), "source_ids": []})
+        target["source_ids"].append(str(row["_id"]))
+    return targets
+
+
+async def enqueue_campaign(campaign: dict, restaurant_name: str) -> int:
+    """
+    Writes one job per target phone; returns the number of jobs queued.
+    Safe to call again for the same campaign: existing jobs are left alone.
+    """
+    targets = await collect_targets(campaign, restaurant_name)
+    now = datetime.utcnow()
+    jobs = [
+        {
+            "_id": f"{campaign['_id']}:{phone}",
+            "campaign_id": campaign["_id"],
+            "restaurant_id": campaign["restaurant_id"],
+            "phone": phone,
+            "message": target["message"],
+            "source_ids": target["source_ids"],
+            "status": QUEUED,
+            "attempts": 0,
+            "not_before": now,
+            "created_at": now
+        }
+        for phone, target in targets.items()
+    ]
+    queued = 0
+    for i in range(0, len(jobs), 1000):
+        try:
+            result = await db.campaign_jobs.insert_many(jobs[i:i + 1000], ordered=False)
+            queued += len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicate ids are jobs queued by an earlier attempt
+            queued += e.details.get("nInserted", 0)
+    await db.campaigns.update_one({"_id": campaign["_id"]}, {"$inc": {"counts.queued": queued}})
+    return queued
+
+
+async def cancel_campaign(campaign_id: str) -> int:
+    """
+    Cancels every job not yet claimed; calls already in progress finish
+    """
+    result = await db.campaign_jobs.update_many(
+        {"campaign_id": campaign_id, "status": QUEUED},
+        {"$set": {"status": CANCELLED}}
+    )
+    await db.campaigns.update_one(
+        {"_id": campaign_id},
+        {
+            "$set": {"status": CANCELLED},
+            "$inc": {"counts.queued": -result.modified_count, "counts.cancelled": result.modified_count}
+        }
+    )
+    return result.modified_count
+
+
+class CampaignRunner:
+    """
+    Pool of asyncio workers draining `campaign_jobs`.
+
+    Each worker claims the next due job with find_one_and_update (skipping
+    restaurants that are at their rate limit), takes a per-restaurant token
+    and then waits for a global token before calling VAPI. Transient
+    failures are retried with backoff up to `max_attempts`; while the VAPI
+    circuit breaker is open, jobs are put back without using an attempt.
+    """
+
+    def __init__(
+        self,
+        vapi: VAPIClient,
+        workers: Optional[int] = None,
+        global_rate: Optional[float] = None,
+        restaurant_rate: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval: float = 1.0
+    ):
+        self.vapi = vapi
+        self.workers = workers if workers is not None else int(os.getenv("CAMPAIGN_WORKERS", "10"))
+        self.global_rate = global_rate or float(os.getenv("CAMPAIGN_GLOBAL_RATE", "5"))
+        self.restaurant_rate = restaurant_rate or float(os.getenv("CAMPAIGN_RESTAURANT_RATE", "1"))
+        self.max_attempts = max_attempts or int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "3"))
+        self.lease = timedelta(seconds=lease_seconds or float(os.getenv("CAMPAIGN_LEASE_SECONDS", "120")))
+        self.poll_interval = poll_interval
+        self._global = TokenBucket(self.global_rate)
+        self._restaurants: Dict[str, TokenBucket] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """
+        Lets idle workers pick up newly queued jobs without waiting for the next poll
+        """
+        self._wake.set()
+
+    def _bucket(self, restaurant_id: str) -> TokenBucket:
+        bucket = self._restaurants.get(restaurant_id)
+        if bucket is None:
+            # No burst: a restaurant's calls are spread evenly over each second
+            bucket = self._restaurants[restaurant_id] = TokenBucket(self.restaurant_rate, burst=1)
+        return bucket
+
+    async def claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        throttled = [rid for rid, bucket in self._restaurants.items() if not bucket.available()]
+        return await db.campaign_jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED, "not_before": {"$lte": now}},
+                    {"status": IN_PROGRESS, "lease_until": {"$lt": now}}
+                ],
+                "restaurant_id": {"$nin": throttled}
+            },
+            {"$set": {"status": IN_PROGRESS, "lease_until": now + self.lease}, "$inc": {"attempts": 1}},
+            sort=[("not_before", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _release(self, job: dict, delay: float = 0) -> None:
+        """
+        Puts a claimed job back in the queue without counting the attempt
+        """
+        await db.campaign_jobs.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {"status": QUEUED, "not_before": datetime.utcnow() + timedelta(seconds=delay)},
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    async def _finish(self, job: dict, status: str, **fields) -> None:
+        await db.campaign_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": status, "finished_at": datetime.utcnow(), **fields}}
+        )
+        await db.campaigns.update_one(
+            {"_id": job["campaign_id"]},
+            {"$inc": {"counts.queued": -1, f"counts.{status}": 1}}
+        )
+        remaining = await db.campaign_jobs.find_one(
+            {"campaign_id": job["campaign_id"], "status": {"$in": [QUEUED, IN_PROGRESS]}},
+            {"_id": 1}
+        )
+        if remaining is None:
+            await db.campaigns.update_one(
+                {"_id": job["campaign_id"], "status": "running"},
+                {"$set": {"status": "completed", "completed_at": datetime.utcnow().isoformat()}}
+            )
+
+    async def process(self, job: dict) -> None:
+        try:
+            response = await self.vapi.create_call(
+                job["phone"],
+                job["restaurant_id"],
+                first_message=job["message"],
+                metadata={"campaign_id": job["campaign_id"], "campaign_job_id": job["_id"]}
+            )
+        except CircuitOpenError:
+            CAMPAIGN_CALLS.inc(outcome="deferred")
+            await self._release(job, delay=self.vapi.breaker.reset_timeout)
+        except VAPIError as e:
+            if 400 <= e.status < 500 and e.status != 429:
+                CAMPAIGN_CALLS.inc(outcome="failed")
+                await self._finish(job, FAILED, error=str(e))
+            else:
+                await self._retry_or_fail(job, e)
+        except Exception as e:
+            await self._retry_or_fail(job, e)
+        else:
+            CAMPAIGN_CALLS.inc(outcome="done")
+            await self._finish(job, DONE, call_id=response.get("id"))
+
+    async def _retry_or_fail(self, job: dict, error: Exception) -> None:
+        if job["attempts"] >= self.max_attempts:
+            CAMPAIGN_CALLS.inc(outcome="failed")
+            await self._finish(job, FAILED, error=str(error))
+            return
+        CAMPAIGN_CALLS.inc(outcome="retried")
+        await db.campaign_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "status": QUEUED,
+                "error": str(error),
+                "not_before": datetime.utcnow() + timedelta(seconds=30 * 2 ** (job["attempts"] - 1))
+            }}
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self.claim()
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+                    continue
+                if not self._bucket(job["restaurant_id"]).try_acquire():
+                    # Another worker took this restaurant's last token first
+                    await self._release(job)
+                    continue
+                await self._global.acquire()
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Campaign worker error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+
+campaign_runner = CampaignRunner(vapi_client)
@@ -1,11 +1,93 @@
 import os
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from dotenv import load_dotenv
 
+from utils.db_metrics import command_metrics, pool_metrics
+
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-client = AsyncIOMotorClient(MONGODB_URI)
-db = client[DB_NAME]
+# Pool and transport settings, tunable per deployment
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# How long a request waits for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+# zlib ships with Python; zstd and snappy need the zstandard / python-snappy packages
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# Used by reporting-only reads (the dashboard), which tolerate replication lag
+MONGO_REPORTING_READ_PREFERENCE = os.getenv("MONGO_REPORTING_READ_PREFERENCE", "secondaryPreferred")
+
+
+class Mongo:
+    """
+    Owns the Motor client. The app lifespan calls connect() on startup and
+    close() on shutdown; scripts that never run the lifespan get a client
+    on first use.
+    """
+
+    def __init__(self):
+        self.client: Optional[AsyncIOMotorClient] = None
+        self._databases = {}
+
+    def connect(self) -> AsyncIOMotorClient:
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                MONGODB_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                compressors=MONGO_COMPRESSORS,
+                readPreference=MONGO_READ_PREFERENCE,
+                event_listeners=[command_metrics, pool_metrics]
+            )
+        return self.client
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self._databases.clear()
+
+    def database(self, read_preference: Optional[str] = None):
+        database = self._databases.get(read_preference)
+        if database is None:
+            client = self.connect()
+            if read_preference is None:
+                database = client[DB_NAME]
+            else:
+                mode = make_read_preference(read_pref_mode_from_name(read_preference), None)
+                database = client.get_database(DB_NAME, read_preference=mode)
+            self._databases[read_preference] = database
+        return database
+
+
+class DatabaseProxy:
+    """
+    Module-level stand-in for the database, so `from utils.db import db`
+    keeps working while the client itself is created and closed by the
+    lifespan. Attribute and item access resolve against the live client.
+    """
+
+    def __init__(self, read_preference: Optional[str] = None):
+        self._read_preference = read_preference
+
+    def __getattr__(self, name):
+        return getattr(mongo.database(self._read_preference), name)
+
+    def __getitem__(self, name):
+        return mongo.database(self._read_preference)[name]
+
+
+mongo = Mongo()
+db = DatabaseProxy()
+reporting_db = DatabaseProxy(MONGO_REPORTING_READ_PREFERENCE)
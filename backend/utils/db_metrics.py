@@ -0,0 +1,149 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+from pymongo import monitoring
+
+from utils.metrics import Counter, Gauge, Histogram
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency as reported by the driver",
+    ("command", "status")
+)
+MONGO_CHECKOUT_WAIT_SECONDS = Histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0)
+)
+MONGO_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total",
+    "Connection checkouts that failed, by reason",
+    ("reason",)
+)
+
+
+class LatencyStats:
+    """
+    Count, failures and latency percentiles over the most recent samples
+    """
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, ms: float, failed: bool = False) -> None:
+        self.count += 1
+        self.failures += failed
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self._recent.append(ms)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._recent)
+
+        def percentile(pct: float) -> float:
+            return round(recent[min(len(recent) - 1, int(len(recent) * pct))], 3) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Per-command latency (find, aggregate, insert, ...) as reported by the driver
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self.commands[event.command_name].record(event.duration_micros / 1000)
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, status="ok")
+
+    def failed(self, event) -> None:
+        self.commands[event.command_name].record(event.duration_micros / 1000, failed=True)
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, status="error")
+
+    def snapshot(self) -> dict:
+        return {name: stats.snapshot() for name, stats in self.commands.items()}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool occupancy and how long operations wait to check out a
+    connection. Rising checkout wait or timeouts mean maxPoolSize is too small
+    for the load.
+    """
+
+    def __init__(self):
+        self.checkout_wait = LatencyStats()
+        self.checked_out = 0
+        self.open_connections = 0
+        self.checkout_failures: Dict[str, int] = defaultdict(int)
+        self.pool_clears = 0
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self.pool_clears += 1
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self.open_connections += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self.open_connections -= 1
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        self.checkout_failures[str(event.reason)] += 1
+        self.checkout_wait.record(event.duration * 1000, failed=True)
+        MONGO_CHECKOUT_FAILURES.inc(reason=event.reason)
+
+    def connection_checked_out(self, event) -> None:
+        self.checked_out += 1
+        self.checkout_wait.record(event.duration * 1000)
+        MONGO_CHECKOUT_WAIT_SECONDS.observe(event.duration)
+
+    def connection_checked_in(self, event) -> None:
+        self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "checked_out": self.checked_out,
+            "open_connections": self.open_connections,
+            "checkout_wait": self.checkout_wait.snapshot(),
+            "checkout_failures": dict(self.checkout_failures),
+            "pool_clears": self.pool_clears
+        }
+
+
+command_metrics = CommandMetrics()
+pool_metrics = PoolMetrics()
+
+Gauge("mongodb_pool_checked_out_connections", "Connections currently checked out of the pool",
+      function=lambda: pool_metrics.checked_out)
+Gauge("mongodb_pool_open_connections", "Open pooled connections", function=lambda: pool_metrics.open_connections)
@@ -1,36 +1,136 @@
 import os
-import requests
+import asyncio
+import aiohttp
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
 
+from utils.metrics import span
+
 # Load environment variables from .env if present
 load_dotenv()
 
+DEFAULT_BASE_URL = "https://api.elevenlabs.io/v1/text-to-speech"
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 class ElevenLabsClient:
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, base_url: Optional[str] = None):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.voice_id = os.getenv("ELEVENLABS_VOICE_ID")
-        self.base_url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
+        root_url = (base_url or os.getenv("ELEVENLABS_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.base_url = f"{root_url}/{self.voice_id}"
         self.headers = {
             "xi-api-key": self.api_key,
             "Content-Type": "application/json"
         }
+        self.voice_settings = {
+            "stability": 0.5,
+            "similarity_boost": 0.75
+        }
+        self.max_concurrency = max_concurrency or int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "8"))
+        self.timeout = aiohttp.ClientTimeout(total=float(os.getenv("ELEVENLABS_TIMEOUT", "30")))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _payload(self, text: str) -> dict:
+        return {
+            "text": text,
+            "voice_settings": self.voice_settings
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared keep-alive session, creating it (and the concurrency
+        semaphore) on first use inside the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={k: v for k, v in self.headers.items() if v is not None},
+                timeout=self.timeout
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session. Called from the app lifespan on shutdown.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+
+    async def stream(self, text: str, chunk_size: int = 4096, output_format: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Streams synthesized audio chunks as they arrive from ElevenLabs.
+        output_format selects the encoding, e.g. "ulaw_8000" for Twilio Media Streams.
+        """
+        session = self._get_session()
+        params = {"output_format": output_format} if output_format else None
+        async with self._semaphore:
+            # Timed to response headers; the body is paced by the consumer
+            async with span("elevenlabs_stream"):
+                response = await session.post(f"{self.base_url}/stream", json=self._payload(text), params=params)
+            async with response:
+                if response.status != 200:
+                    body = await response.text()
+                    raise Exception(f"ElevenLabs synthesis failed: {body}")
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    yield chunk
+
+    async def synthesize_bytes(self, text: str) -> bytes:
+        """
+        Synthesizes speech from text and returns the mp3 bytes
+        """
+        session = self._get_session()
+        async with self._semaphore, span("elevenlabs"):
+            async with session.post(self.base_url, json=self._payload(text)) as response:
+                if response.status != 200:
+                    body = await response.text()
+                    raise Exception(f"ElevenLabs synthesis failed: {body}")
+                return await response.read()
+
+    async def synthesize_async(self, text: str, output_path: str) -> str:
+        """
+        Streams synthesized speech from text into output_path (mp3)
+        Returns the path to the saved audio file
+
+        output_path only appears once the whole stream has arrived, so a
+        failed stream never leaves a truncated file behind.
+        """
+        chunks = [chunk async for chunk in self.stream(text)]
+        await asyncio.to_thread(_write_atomic, output_path, b"".join(chunks))
+        return output_path
 
     def synthesize(self, text: str, output_path: str) -> str:
         """
         Synthesizes speech from text and saves to output_path (mp3)
         Returns the path to the saved audio file
+
+        Blocking wrapper around synthesize_async for scripts; async code should
+        await synthesize_async directly.
         """
-        payload = {
-            "text": text,
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.75
-            }
-        }
-        response = requests.post(self.base_url, headers=self.headers, json=payload)
-        if response.status_code == 200:
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            return output_path
-        else:
-            raise Exception(f"ElevenLabs synthesis failed: {response.text}")
+        async def _run():
+            try:
+                return await self.synthesize_async(text, output_path)
+            finally:
+                await self.close()
+        return asyncio.run(_run())
@@ -0,0 +1,243 @@
+"""
+Per-restaurant cache of answers to caller questions.
+
+Lookups go through three tiers before an LLM call:
+
+1. Opening-hours questions are answered from Restaurant.hours (utils.hours),
+   which is always current and needs no cache.
+2. An exact hit on the normalized question text ("Are you open on Sunday?"
+   and "are you open sunday" share a key).
+3. With NumPy installed, a cosine-similarity search for rewordings: questions
+   are embedded locally as hashed word and character-trigram vectors, and one
+   matrix-vector product scores every cached question of the restaurant.
+   The vectors are lexical, so this catches small rewordings ("vegan pizza"
+   / "vegan pizzas") but not synonyms; the threshold is kept high so that
+   "vegan options" never answers "gluten free options". Numbers and
+   negations barely move the score ("12 inch" / "16 inch", "party of 10" /
+   "party of 20"), so a similar question only matches when those words
+   are exactly the same.
+
+A restaurant's entries are tied to a fingerprint of its hours, its
+menu_version (bumped by every menu item write, so other workers see menu
+edits once their restaurant directory entry expires) and its local date:
+when any of them changes (or the routes call invalidate()), the old answers
+are dropped instead of being served. The LLM is told the date and time, so
+an answer may depend on them: keying by date keeps yesterday's answers out,
+and questions about the moment ("can I still get lunch?") are not cached.
+"""
+import os
+import re
+import time
+import zlib
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.hours import WeeklyHours, answer_hours_question, local_now
+from utils.metrics import Counter
+from utils.restaurant_directory import RestaurantContext
+
+# Words that do not change what is being asked
+FILLER = {
+    "hi", "hello", "hey", "um", "uh", "please", "so", "just", "well", "ok", "okay",
+    "could", "can", "you", "tell", "me", "i", "wanted", "want", "to", "know", "wondering", "if",
+    "the", "a", "an", "on", "do", "does", "is", "are", "there", "any", "guys", "your", "y", "got",
+    "my", "our", "we", "us"
+}
+# Words that change the answer while barely changing the question's vector
+NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven",
+    "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "twenty", "thirty", "forty", "fifty",
+    "hundred", "dozen", "half", "couple", "single", "double"
+}
+NEGATIONS = {"not", "no", "without", "never", "none", "non", "dont", "doesnt", "isnt", "arent", "cant", "wont", "nothing"}
+HOURS_PATTERN = re.compile(r"\b(open|opening|close|closing|closed|hours)\b")
+# Questions whose answer depends on the time of day they are asked
+MOMENT_PATTERN = re.compile(r"\b(now|still|currently|yet|later|anymore|right away|in time)\b")
+
+EMBEDDING_DIM = 512
+
+FAQ_ANSWERS = Counter("faq_answers_total", "Question answers by source", ("source",))
+
+
+def normalize_question(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.lower().replace("'", ""))
+    return " ".join(word for word in text.split() if word not in FILLER)
+
+
+def guard_terms(normalized: str) -> frozenset:
+    """
+    Numbers and negation words, which must match for a similar question to count
+    """
+    return frozenset(word for word in normalized.split()
+                     if word in NEGATIONS or word in NUMBER_WORDS or any(char.isdigit() for char in word))
+
+
+def embed(normalized: str) -> "np.ndarray":
+    """
+    Unit-length hashed bag of words and character trigrams
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    features = normalized.split()
+    compact = f" {normalized} "
+    features += [compact[i:i + 3] for i in range(len(compact) - 2)]
+    for feature in features:
+        vector[zlib.crc32(feature.encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def restaurant_fingerprint(restaurant: RestaurantContext, day: str) -> str:
+    material = repr((restaurant.get("hours"), restaurant.get("menu"), restaurant.get("menu_version"), day))
+    return hashlib.sha1(material.encode()).hexdigest()
+
+
+class RestaurantAnswers:
+    """
+    One restaurant's cached answers: an LRU dict of normalized question ->
+    (expires_at, answer), plus a lazily rebuilt matrix of their embeddings
+    """
+
+    def __init__(self, fingerprint: str, semantic: bool):
+        self.fingerprint = fingerprint
+        self.semantic = semantic
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._vectors: Dict[str, "np.ndarray"] = {}
+        self._guards: Dict[str, frozenset] = {}
+        self._matrix = None
+        self._keys: List[str] = []
+
+    def exact(self, question: str) -> Optional[str]:
+        entry = self.entries.get(question)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self.discard(question)
+            return None
+        self.entries.move_to_end(question)
+        return entry[1]
+
+    def similar(self, question: str, vector: "np.ndarray", threshold: float) -> Optional[Tuple[str, float]]:
+        if self._matrix is None:
+            if not self._vectors:
+                return None
+            self._keys = list(self._vectors)
+            self._matrix = np.stack([self._vectors[key] for key in self._keys])
+        scores = self._matrix @ vector
+        guards = guard_terms(question)
+        # Best scoring first, skipping questions about a different number or a negation
+        for best in np.flatnonzero(scores >= threshold)[np.argsort(-scores[scores >= threshold])]:
+            key = self._keys[int(best)]
+            if self._guards.get(key) != guards:
+                continue
+            answer = self.exact(key)
+            if answer is not None:
+                return answer, float(scores[best])
+        return None
+
+    def put(self, question: str, answer: str, ttl: float, maxsize: int) -> None:
+        self.entries[question] = (time.monotonic() + ttl, answer)
+        self.entries.move_to_end(question)
+        if self.semantic:
+            self._vectors[question] = embed(question)
+            self._guards[question] = guard_terms(question)
+            self._matrix = None
+        while len(self.entries) > maxsize:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, question: str) -> None:
+        self.entries.pop(question, None)
+        self._guards.pop(question, None)
+        if self._vectors.pop(question, None) is not None:
+            self._matrix = None
+
+
+class FAQCache:
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        similarity_threshold: Optional[float] = None
+    ):
+        self.ttl = ttl or float(os.getenv("FAQ_CACHE_TTL", str(24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "256"))
+        self.similarity_threshold = similarity_threshold or float(os.getenv("FAQ_SIMILARITY_THRESHOLD", "0.8"))
+        self.semantic = np is not None and os.getenv("FAQ_SEMANTIC_CACHE", "true").lower() != "false"
+        self._restaurants: Dict[str, RestaurantAnswers] = {}
+        self.stats = {"hours": 0, "exact": 0, "similar": 0, "llm": 0, "invalidations": 0}
+
+    def _answers_for(self, restaurant: RestaurantContext, now: datetime) -> RestaurantAnswers:
+        fingerprint = restaurant_fingerprint(restaurant, now.date().isoformat())
+        answers = self._restaurants.get(restaurant.id)
+        if answers is None or answers.fingerprint != fingerprint:
+            if answers is not None:
+                self.stats["invalidations"] += 1
+            answers = self._restaurants[restaurant.id] = RestaurantAnswers(fingerprint, self.semantic)
+        return answers
+
+    def lookup(self, restaurant: RestaurantContext, question: str, now: Optional[datetime] = None) -> Optional[Tuple[str, str]]:
+        """
+        Returns (answer, source) without calling the LLM, or None on a miss
+        """
+        normalized = normalize_question(question)
+        now = now or local_now(restaurant.get("timezone"))
+        if HOURS_PATTERN.search(normalized):
+            answer = answer_hours_question(normalized, WeeklyHours.parse(restaurant.get("hours")), now)
+            if answer is not None:
+                return answer, "hours"
+        answers = self._answers_for(restaurant, now)
+        answer = answers.exact(normalized) if normalized else None
+        if answer is not None:
+            return answer, "exact"
+        if self.semantic and normalized:
+            match = answers.similar(normalized, embed(normalized), self.similarity_threshold)
+            if match is not None:
+                return match[0], "similar"
+        return None
+
+    async def answer(
+        self,
+        restaurant: RestaurantContext,
+        question: str,
+        generate: Callable[[], Awaitable[str]],
+        now: Optional[datetime] = None
+    ) -> Tuple[str, str]:
+        """
+        Returns (answer, source), calling `generate` only when no tier has an answer
+        """
+        now = now or local_now(restaurant.get("timezone"))
+        hit = self.lookup(restaurant, question, now)
+        if hit is None:
+            answer = await generate()
+            normalized = normalize_question(question)
+            if normalized and not MOMENT_PATTERN.search(normalized):
+                self._answers_for(restaurant, now).put(normalized, answer, self.ttl, self.max_entries)
+            hit = (answer, "llm")
+        self.stats[hit[1]] += 1
+        FAQ_ANSWERS.inc(source=hit[1])
+        return hit
+
+    def invalidate(self, restaurant_id: str) -> None:
+        if self._restaurants.pop(str(restaurant_id), None) is not None:
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        answered = self.stats["hours"] + self.stats["exact"] + self.stats["similar"]
+        total = answered + self.stats["llm"]
+        return {
+            **self.stats,
+            "llm_calls_avoided": answered,
+            "hit_rate": round(answered / total, 3) if total else 0.0,
+            "semantic_tier": self.semantic,
+            "restaurants": len(self._restaurants),
+            "entries": sum(len(answers.entries) for answers in self._restaurants.values())
+        }
+
+
+faq_cache = FAQCache()
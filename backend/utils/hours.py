@@ -0,0 +1,230 @@
+"""
+Parses Restaurant.hours into weekly opening intervals and answers spoken
+questions about them without an LLM.
+
+Hours are stored as free-form strings per day, e.g.
+
+    {"mon": "9-5", "tue": "11:30am-2:30pm, 5pm-10pm", "sat-sun": "10-23", "wed": "closed"}
+
+Keys may be day names or abbreviations, day ranges ("mon-fri"), or
+"weekdays", "weekends" and "daily". A range without am/pm whose end is not
+after its start is read as running into the afternoon ("9-5" is 9:00-17:00)
+and, failing that, past midnight ("18-2").
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+DAY_ALIASES = {name[:3]: i for i, name in enumerate(DAY_NAMES)}
+DAY_ALIASES.update({name: i for i, name in enumerate(DAY_NAMES)})
+DAY_ALIASES.update({"tues": 1, "wed": 2, "weds": 2, "thu": 3, "thur": 3, "thurs": 3})
+DAY_GROUPS = {
+    "daily": range(7), "everyday": range(7), "all": range(7),
+    "weekdays": range(5), "weekday": range(5),
+    "weekends": range(5, 7), "weekend": range(5, 7)
+}
+
+TIME_PATTERN = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a|p)?\b")
+ALWAYS_OPEN = re.compile(r"24\s*(h|hr|hrs|hours)|24/7|open all day")
+CLOSED = re.compile(r"closed|none|^\s*-?\s*$")
+
+MINUTES_PER_DAY = 24 * 60
+
+Interval = Tuple[int, int]
+
+
+def parse_time(match: re.Match) -> Tuple[int, bool]:
+    """
+    Returns (minutes after midnight, whether am/pm was given)
+    """
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+    return hour * 60 + minute, bool(meridiem)
+
+
+def parse_ranges(text: str) -> List[Interval]:
+    """
+    "11:30am-2:30pm, 5-10" -> [(690, 870), (1020, 1320)]; minutes may run past 1440
+    """
+    text = text.lower()
+    if ALWAYS_OPEN.search(text):
+        return [(0, MINUTES_PER_DAY)]
+    if CLOSED.search(text):
+        return []
+    intervals = []
+    for part in re.split(r",|;|&|\band\b", text):
+        times = list(TIME_PATTERN.finditer(part))
+        if len(times) < 2:
+            continue
+        (start, start_explicit), (end, end_explicit) = parse_time(times[0]), parse_time(times[1])
+        if end <= start and not (start_explicit or end_explicit) and end + 12 * 60 > start:
+            end += 12 * 60
+        if end <= start:
+            end += MINUTES_PER_DAY
+        intervals.append((start, end))
+    return sorted(intervals)
+
+
+def parse_days(key: str) -> List[int]:
+    key = key.lower().strip().rstrip(".")
+    if key in DAY_GROUPS:
+        return list(DAY_GROUPS[key])
+    if key in DAY_ALIASES:
+        return [DAY_ALIASES[key]]
+    parts = re.split(r"\s*(?:-|to|through)\s*", key)
+    if len(parts) == 2 and parts[0] in DAY_ALIASES and parts[1] in DAY_ALIASES:
+        first, last = DAY_ALIASES[parts[0]], DAY_ALIASES[parts[1]]
+        return [(first + offset) % 7 for offset in range((last - first) % 7 + 1)]
+    return []
+
+
+def local_now(timezone: Optional[str] = None) -> datetime:
+    """
+    Naive wall-clock time in the restaurant's timezone (IANA name), or the server's
+    """
+    if timezone:
+        try:
+            return datetime.now(ZoneInfo(timezone)).replace(tzinfo=None)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return datetime.now()
+
+
+def format_minutes(minutes: int) -> str:
+    minutes %= MINUTES_PER_DAY
+    if minutes == 0:
+        return "midnight"
+    if minutes == 12 * 60:
+        return "noon"
+    hour, minute = divmod(minutes, 60)
+    suffix = "AM" if hour < 12 else "PM"
+    hour = hour % 12 or 12
+    return f"{hour}:{minute:02d} {suffix}" if minute else f"{hour} {suffix}"
+
+
+class WeeklyHours:
+    """
+    Opening intervals per weekday (0 = Monday), in minutes after midnight
+    """
+
+    def __init__(self, days: Dict[int, List[Interval]]):
+        self.days = days
+
+    @classmethod
+    def parse(cls, hours: Optional[dict]) -> "WeeklyHours":
+        days: Dict[int, List[Interval]] = {}
+        for key, value in (hours or {}).items():
+            if not isinstance(value, str):
+                continue
+            for day in parse_days(str(key)):
+                # A specific day listed after a group ("daily" then "sun") wins
+                days[day] = parse_ranges(value)
+        return cls(days)
+
+    def known(self) -> bool:
+        return bool(self.days)
+
+    def intervals(self, weekday: int) -> List[Interval]:
+        return self.days.get(weekday, [])
+
+    def open_interval(self, moment: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """
+        The opening interval containing `moment`, including one that started
+        the previous evening and runs past midnight
+        """
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for days_back in (0, 1):
+            day_start = midnight - timedelta(days=days_back)
+            for start, end in self.intervals(day_start.weekday()):
+                opens, closes = day_start + timedelta(minutes=start), day_start + timedelta(minutes=end)
+                if opens <= moment < closes:
+                    return opens, closes
+        return None
+
+    def next_opening(self, moment: datetime) -> Optional[datetime]:
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for days_ahead in range(8):
+            day_start = midnight + timedelta(days=days_ahead)
+            for start, _ in self.intervals(day_start.weekday()):
+                opens = day_start + timedelta(minutes=start)
+                if opens > moment:
+                    return opens
+        return None
+
+    def describe(self, weekday: int) -> str:
+        intervals = self.intervals(weekday)
+        if not intervals:
+            return "closed"
+        if intervals == [(0, MINUTES_PER_DAY)]:
+            return "open 24 hours"
+        return " and ".join(f"{format_minutes(start)} to {format_minutes(end)}" for start, end in intervals)
+
+    def summary(self) -> str:
+        """
+        "Monday to Friday 9 AM to 5 PM, Saturday 10 AM to 2 PM, Sunday closed"
+        """
+        groups: List[Tuple[int, int, str]] = []
+        for day in range(7):
+            description = self.describe(day)
+            if groups and groups[-1][2] == description:
+                groups[-1] = (groups[-1][0], day, description)
+            else:
+                groups.append((day, day, description))
+        parts = []
+        for first, last, description in groups:
+            days = DAY_NAMES[first].title() if first == last else f"{DAY_NAMES[first].title()} to {DAY_NAMES[last].title()}"
+            parts.append(f"{days} {description}")
+        return ", ".join(parts)
+
+
+def asked_days(question: str, now: datetime) -> List[int]:
+    """
+    Weekdays a normalized question asks about ("sunday", "tomorrow", "weekend"...)
+    """
+    days = []
+    for word in question.split():
+        if word in ("today", "tonight"):
+            days.append(now.weekday())
+        elif word == "tomorrow":
+            days.append((now.weekday() + 1) % 7)
+        elif word in ("weekend", "weekends"):
+            days += [5, 6]
+        elif word.rstrip("s") in DAY_NAMES:
+            days.append(DAY_NAMES.index(word.rstrip("s")))
+    return list(dict.fromkeys(days))
+
+
+def answer_hours_question(question: str, hours: WeeklyHours, now: datetime) -> Optional[str]:
+    """
+    Answers an opening-hours question (normalized text) from the parsed
+    hours, or returns None when the hours are unknown
+    """
+    if not hours.known():
+        return None
+    words = set(question.split())
+    if words & {"now", "currently", "still", "right"}:
+        interval = hours.open_interval(now)
+        if interval is not None:
+            closes = interval[1]
+            return f"Yes, we're open right now until {format_minutes(closes.hour * 60 + closes.minute)}."
+        opening = hours.next_opening(now)
+        if opening is None:
+            return "Sorry, we're closed right now."
+        day = "today" if opening.date() == now.date() else DAY_NAMES[opening.weekday()].title()
+        return f"Sorry, we're closed right now. We open {day} at {format_minutes(opening.hour * 60 + opening.minute)}."
+
+    days = asked_days(question, now)
+    if not days:
+        return f"Our hours are {hours.summary()}."
+    answers = []
+    for day in days:
+        name = "today" if day == now.weekday() and words & {"today", "tonight"} else DAY_NAMES[day].title()
+        description = hours.describe(day)
+        if description == "closed":
+            answers.append(f"We're closed {name}.")
+        else:
+            answers.append(f"{name[0].upper() + name[1:]} we're {description if description.startswith('open') else 'open ' + description}.")
+    return " ".join(answers)
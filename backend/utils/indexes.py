@@ -0,0 +1,180 @@
+"""
+Index registry: the indexes each route's queries rely on, declared in one place.
+
+create_indexes() runs on app startup and is idempotent (creating an index
+that already exists with the same spec is a no-op). QUERY_SHAPES lists a
+representative filter/sort for every query the routes issue; `check` runs
+explain() on each and fails if any winning plan is a collection scan:
+
+    python -m utils.indexes create
+    python -m utils.indexes check
+
+When adding a query to a route, add its shape here (and an index if
+`check` starts failing).
+"""
+import asyncio
+import argparse
+import logging
+import sys
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from utils.db import db
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "restaurants": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("phone_e164", ASCENDING)], name="phone_e164"),
+        IndexModel([("phone", ASCENDING)], name="phone"),
+    ],
+    "orders": [
+        # Order list: per owner and restaurant, newest first, keyset on _id
+        IndexModel(
+            [("user_id", ASCENDING), ("restaurant_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="owner_restaurant_timestamp"
+        ),
+        # Dashboard aggregation and rollup backfill
+        IndexModel([("restaurant_id", ASCENDING), ("timestamp", ASCENDING)], name="restaurant_timestamp"),
+    ],
+    "transcripts": [
+        IndexModel(
+            [("user_id", ASCENDING), ("restaurant_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="owner_restaurant_timestamp"
+        ),
+    ],
+    "bookings": [
+        IndexModel(
+            [("user_id", ASCENDING), ("restaurant_id", ASCENDING), ("date", ASCENDING), ("time", ASCENDING), ("_id", ASCENDING)],
+            name="owner_restaurant_date"
+        ),
+        # Campaign targets and other per-restaurant day lookups that carry no user_id
+        IndexModel([("restaurant_id", ASCENDING), ("date", ASCENDING), ("status", ASCENDING)], name="restaurant_date_status"),
+    ],
+    "booking_slots": [
+        # Day load for the availability index; reservations update by _id
+        IndexModel([("restaurant_id", ASCENDING), ("date", ASCENDING), ("minute", ASCENDING)], name="restaurant_date_minute"),
+    ],
+    "menu_items": [
+        IndexModel([("user_id", ASCENDING), ("restaurant_id", ASCENDING), ("_id", ASCENDING)], name="owner_restaurant"),
+        # Menu index build for voice orders
+        IndexModel([("restaurant_id", ASCENDING), ("available", ASCENDING)], name="restaurant_available"),
+    ],
+    "campaigns": [
+        IndexModel([("user_id", ASCENDING), ("restaurant_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="owner_restaurant_created"),
+    ],
+    "campaign_jobs": [
+        # Worker claim: due queued jobs and expired leases
+        IndexModel([("status", ASCENDING), ("not_before", ASCENDING)], name="status_not_before"),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease_until"),
+        IndexModel([("campaign_id", ASCENDING), ("status", ASCENDING)], name="campaign_status"),
+    ],
+    "job_outbox": [
+        # Recovery sweep: due pending jobs and expired leases
+        IndexModel([("status", ASCENDING), ("not_before", ASCENDING)], name="status_not_before"),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease_until"),
+    ],
+    "daily_rollups": [
+        IndexModel([("restaurant_id", ASCENDING), ("date", ASCENDING)], name="restaurant_date"),
+    ],
+}
+
+# (name, collection, filter, sort) for every query shape the routes issue.
+# Values are placeholders; only the shape matters to the planner.
+QUERY_SHAPES: List[Tuple[str, str, dict, list]] = [
+    ("users.login", "users", {"email": "a@example.com"}, []),
+    ("restaurants.list", "restaurants", {"user_id": "u"}, [("_id", ASCENDING)]),
+    ("restaurants.by_phone", "restaurants", {"$or": [{"phone_e164": "+15550100"}, {"phone": {"$in": ["5550100", "+15550100"]}}]}, []),
+    ("restaurants.tenant", "restaurants", {"user_id": "u"}, []),
+    ("orders.list", "orders", {"user_id": "u", "restaurant_id": "r", "status": "pending",
+                               "timestamp": {"$gte": "2024-01-01", "$lt": "2024-02-01"}},
+     [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("orders.dashboard", "orders", {"restaurant_id": "r", "timestamp": {"$gte": "2024-01-01", "$lt": "2024-02-01"}}, []),
+    ("orders.receipt_archive", "orders", {"restaurant_id": "r", "timestamp": {"$gte": "2024-01-01", "$lt": "2024-01-02"}},
+     [("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ("orders.get", "orders", {"_id": "o", "user_id": "u", "restaurant_id": "r"}, []),
+    ("transcripts.list", "transcripts", {"user_id": "u", "restaurant_id": "r"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("bookings.list", "bookings", {"user_id": "u", "restaurant_id": "r", "date": {"$gte": "2024-01-01"}},
+     [("date", ASCENDING), ("time", ASCENDING), ("_id", ASCENDING)]),
+    ("booking_slots.day", "booking_slots", {"restaurant_id": "r", "date": "2024-01-01"}, []),
+    ("menu_items.list", "menu_items", {"user_id": "u", "restaurant_id": {"$in": ["r1", "r2"]}}, [("_id", ASCENDING)]),
+    ("menu_items.voice_index", "menu_items", {"restaurant_id": "r", "available": True}, []),
+    ("campaigns.list", "campaigns", {"user_id": "u", "restaurant_id": "r"}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("campaign_jobs.claim", "campaign_jobs", {"$or": [{"status": "queued", "not_before": {"$lte": "2024-01-01"}},
+                                                      {"status": "in_progress", "lease_until": {"$lt": "2024-01-01"}}],
+                                              "restaurant_id": {"$nin": ["r"]}}, [("not_before", ASCENDING)]),
+    ("campaign_jobs.remaining", "campaign_jobs", {"campaign_id": "c", "status": {"$in": ["queued", "in_progress"]}}, []),
+    ("bookings.campaign_targets", "bookings", {"restaurant_id": "r", "date": "2024-01-01", "status": "confirmed",
+                                               "customer_phone": {"$nin": [None, ""]}}, []),
+    ("orders.campaign_targets", "orders", {"restaurant_id": "r", "status": "ready", "customer_phone": {"$nin": [None, ""]}}, []),
+    ("job_outbox.recover", "job_outbox", {"$or": [{"status": "pending", "not_before": {"$lte": "2024-01-01"}},
+                                                  {"status": "running", "lease_until": {"$lt": "2024-01-01"}}]}, []),
+    ("daily_rollups.range", "daily_rollups", {"restaurant_id": "r", "date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}}, []),
+]
+
+
+async def create_indexes() -> None:
+    """
+    Creates every declared index. A collection whose indexes cannot be built
+    (e.g. duplicate emails blocking the unique index) is logged and skipped.
+    """
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except PyMongoError as e:
+            logging.error(f"Failed to create indexes on {collection}: {e}")
+
+
+def plan_stages(plan) -> List[str]:
+    """
+    Returns every stage name in an explain() plan tree
+    """
+    if isinstance(plan, list):
+        return [stage for child in plan for stage in plan_stages(child)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for value in plan.values():
+        if isinstance(value, (dict, list)):
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def find_collection_scans() -> List[str]:
+    """
+    Explains every query shape; returns the names of those whose winning plan scans a collection
+    """
+    offenders = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        if "COLLSCAN" in plan_stages(explain["queryPlanner"]["winningPlan"]):
+            offenders.append(name)
+    return offenders
+
+
+async def check() -> int:
+    # The collections may not exist yet; creating the indexes creates them
+    await create_indexes()
+    offenders = await find_collection_scans()
+    for name in offenders:
+        print(f"COLLSCAN: {name}")
+    print(f"{len(QUERY_SHAPES) - len(offenders)}/{len(QUERY_SHAPES)} query shapes use an index")
+    return 1 if offenders else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index maintenance")
+    parser.add_argument("command", choices=["create", "check"])
+    args = parser.parse_args()
+    if args.command == "create":
+        asyncio.run(create_indexes())
+    else:
+        sys.exit(asyncio.run(check()))
@@ -0,0 +1,364 @@
+"""
+Local intent classification in front of GPT.
+
+IntentEngine asks a list of classifiers in turn and returns the first
+prediction whose confidence clears INTENT_MIN_CONFIDENCE; when none does,
+the caller falls back to the LLM. Predictions carry the same JSON shape
+process_with_gpt asks GPT for, so handle_intent cannot tell them apart:
+
+    {"intent": "order", "items": [{"item": "Cheeseburger", "quantity": 2}], "special_instructions": ""}
+    {"intent": "booking", "date": "2024-06-01", "time": "19:00", "party_size": 4}
+    {"intent": "question", "question": "what time do you close", "topic": "hours"}
+
+The default chain is RuleIntentClassifier (phrase patterns plus slot
+extraction against the restaurant's MenuIndex) and then
+ModelIntentClassifier (a multinomial Naive Bayes over words and word pairs,
+trained at import on utils.intent_examples). Either only answers when the
+slots its intent needs were extracted too; an order whose items do not all
+match the menu, or a booking without a party size, a time and a day it can
+resolve ("next friday", "christmas eve" are not), goes to GPT.
+So does anything that cancels or changes an existing booking or order
+("can I move my reservation to 8"), which the extractors would otherwise
+read as a new one.
+Any object with the same classify() signature can be added to the chain.
+"""
+import os
+import re
+import math
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.faq_cache import HOURS_PATTERN
+from utils.hours import DAY_NAMES
+from utils.intent_examples import TRAINING_EXAMPLES
+from utils.menu_index import MenuIndex
+from utils.metrics import Counter as MetricCounter
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "couple": 2, "dozen": 12
+}
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august",
+          "september", "october", "november", "december"]
+MONTH = "|".join(MONTHS)
+# Words that say "a particular day" without extract_date understanding it;
+# a booking that mentions one and has no parsed date goes to GPT rather than today
+DATE_WORDS = re.compile(
+    rf"\b({MONTH}|\d{{1,2}}(st|nd|rd|th)|\d{{1,2}}/\d{{1,2}}|first|second|third|fourth|fifth|sixth|seventh|"
+    r"eighth|ninth|tenth|eleventh|twelfth|\w+teenth|twentieth|thirtieth|next|week|weeks|weekend|month|"
+    r"days|day after|christmas|eve|easter|thanksgiving|new years|valentines|halloween|holiday|"
+    r"mothers day|fathers day|birthday)\b"
+)
+# Relative dates extract_date does not resolve; they must not fall through to a weekday
+RELATIVE_DATE = re.compile(r"\b(next|week|weeks|weekend|month|days|day after|in \w+ (days|weeks|months))\b")
+# Spoken minutes after an hour ("seven thirty"); other number words there are not understood
+MINUTE_WORDS = {"oclock": 0, "fifteen": 15, "thirty": 30, "forty five": 45}
+
+ORDER_PATTERN = re.compile(
+    r"^(?:hi |hey |hello |yes |yeah |um |uh |so )*"
+    r"(?:can i (?:get|have|order)|could i (?:get|have|order)|can we (?:get|have)|could we (?:get|have)|"
+    r"id like|i would like|we would like|wed like|i want|we want|ill have|well have|ill take|"
+    r"let me get|let me have|give me|get me|order me|i need|id love)\b"
+)
+BOOKING_PATTERN = re.compile(r"\b(book|booking|reserve|reservation|table|party of|room for)\b")
+# Changes to an existing booking or order; none of the local extractors model these
+AMEND_PATTERN = re.compile(
+    r"\b(cancel|cancell?ing|cancell?ed|change|changing|modify|modifying|move|moving|"
+    r"reschedule|rescheduling|postpone|push back|bring forward|update)\b"
+)
+QUESTION_PATTERN = re.compile(r"^(what|whats|when|where|how|is|are|do|does|which|who|why|can i bring|can you tell)\b")
+INSTRUCTION_PATTERN = re.compile(r"\b(with|without|no|extra|hold the|light on|on the side)\b.*")
+SIZE_WORDS = {"small", "medium", "regular", "large", "big"}
+SEGMENT_SPLIT = re.compile(r",| and | plus | also | & ")
+FILLER_TAIL = re.compile(r"\b(please|thanks|thank you|for pickup|for pick up|to go|for takeout|for delivery)\b")
+
+# MenuIndex.match score a segment needs to count as that menu item
+MIN_ITEM_SCORE = 0.75
+
+INTENT_PREDICTIONS = MetricCounter("intent_predictions_total", "Intent predictions by classifier (llm = fallback)", ("source",))
+
+
+def normalize_utterance(text: str) -> str:
+    text = text.lower().replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^a-z0-9:&/ ,]+", " ", text).split())
+
+
+def parse_number(word: str) -> Optional[int]:
+    if word.isdigit():
+        return int(word)
+    return NUMBER_WORDS.get(word)
+
+
+class IntentPrediction:
+    def __init__(self, data: dict, confidence: float, source: str):
+        self.data = data
+        self.confidence = confidence
+        self.source = source
+
+
+def extract_order(text: str, menu_index: MenuIndex) -> Optional[Tuple[List[dict], str]]:
+    """
+    Splits an order into "[quantity] item [instructions]" segments and matches
+    each against the menu. Returns (items, special_instructions), or None
+    if any segment names something that is not on the menu.
+    """
+    body = ORDER_PATTERN.sub("", text).strip()
+    body = FILLER_TAIL.sub("", body)
+    items: List[dict] = []
+    instructions: List[str] = []
+    for segment in SEGMENT_SPLIT.split(body):
+        segment = segment.strip(" ,")
+        instruction = INSTRUCTION_PATTERN.search(segment)
+        if instruction:
+            instructions.append(instruction.group(0).strip())
+            segment = segment[:instruction.start()].strip()
+        words = segment.split()
+        quantity = 1
+        if words and parse_number(words[0]) is not None:
+            quantity = parse_number(words.pop(0))
+        if words and words[0] in ("of", "order", "orders"):
+            words = [word for word in words if word not in ("of", "order", "orders")]
+        name = " ".join(words)
+        if not name or name in ("the", "some", "a", "an"):
+            continue
+        match = menu_index.match(name)
+        if (match is None or match[1] < MIN_ITEM_SCORE) and words[0] in SIZE_WORDS and len(words) > 1:
+            # "large coke" on a menu that only lists "Cola": the size becomes an instruction
+            match = menu_index.match(" ".join(words[1:]))
+            if match is not None and match[1] >= MIN_ITEM_SCORE:
+                instructions.append(f"{words[0]} {match[0]['name']}")
+        if match is None or match[1] < MIN_ITEM_SCORE:
+            return None
+        items.append({"item": match[0]["name"], "quantity": quantity})
+    if not items:
+        return None
+    return items, "; ".join(instructions)
+
+
+def extract_party_size(text: str) -> Optional[int]:
+    for match in re.finditer(r"\b(?:for|party of|table of)\s+(?:a party of\s+)?(\w+)", text):
+        size = parse_number(match.group(1))
+        if size is not None and match.group(1) not in ("a", "an"):
+            return size
+    match = re.search(r"\b(\w+)\s+(?:people|persons|guests|adults|of us)\b", text)
+    return parse_number(match.group(1)) if match else None
+
+
+def extract_time(text: str) -> Optional[str]:
+    if re.search(r"\bnoon\b", text):
+        return "12:00"
+    hour = minute = None
+    match = re.search(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", text)
+    if match:
+        hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+        if match.group(3) == "pm":
+            hour += 12
+        return f"{hour:02d}:{minute:02d}"
+    match = re.search(r"\b(?:at|around)\s+(half\s+)?(\w+)(?::(\d{2}))?(?:\s+(o clock|forty five|\w+))?\b", text)
+    if match and parse_number(match.group(2)) and match.group(2) not in ("a", "an"):
+        hour, minute = parse_number(match.group(2)), int(match.group(3) or 0)
+        spoken = (match.group(4) or "").replace("o clock", "oclock")
+        if match.group(1):
+            # "half seven" is 7:30
+            minute = 30
+        elif spoken in MINUTE_WORDS:
+            # "seven thirty"
+            minute = MINUTE_WORDS[spoken]
+        elif match.group(3) is None and (re.fullmatch(r"\d{2}", spoken) or spoken in ("oh", "five", "ten", "twenty", "forty", "fifty")):
+            # "seven twenty five", "7 45": minutes this parser does not read
+            return None
+    else:
+        match = re.search(r"\b(\d{1,2}):(\d{2})\b", text)
+        if match:
+            hour, minute = int(match.group(1)), int(match.group(2))
+    if hour is None or hour > 23 or minute > 59:
+        return None
+    # Without am/pm, 1-10 means the evening (restaurants book dinners, not 7 AM)
+    if 1 <= hour <= 10:
+        hour += 12
+    return f"{hour:02d}:{minute:02d}"
+
+
+def extract_date(text: str, today: date) -> Optional[str]:
+    if RELATIVE_DATE.search(text):
+        # "next friday", "in two weeks": left to GPT
+        return None
+    if re.search(r"\b(today|tonight|this evening|this afternoon)\b", text):
+        return today.isoformat()
+    if re.search(r"\btomorrow\b", text):
+        return (today + timedelta(days=1)).isoformat()
+    for i, name in enumerate(DAY_NAMES):
+        if re.search(rf"\b{name}s?\b", text):
+            return (today + timedelta(days=(i - today.weekday()) % 7)).isoformat()
+    try:
+        match = re.search(rf"\b({MONTH})\s+(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?\b", text)
+        if match:
+            month, day = match.group(1), match.group(2)
+        else:
+            # "the 5th of december", "5th december"
+            match = re.search(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTH})\b", text)
+            month, day = (match.group(2), match.group(1)) if match else (None, None)
+        if match:
+            candidate = date(today.year, MONTHS.index(month) + 1, int(day))
+            # A date that already passed this year means next year
+            return (candidate if candidate >= today else candidate.replace(year=today.year + 1)).isoformat()
+        match = re.search(r"\bthe\s+(\d{1,2})(?:st|nd|rd|th)\b", text)
+        if match:
+            candidate = today.replace(day=int(match.group(1)))
+            if candidate < today:
+                next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+                candidate = next_month.replace(day=int(match.group(1)))
+            return candidate.isoformat()
+    except ValueError:
+        # "february 30th" and the like
+        return None
+    return None
+
+
+def extract_booking(text: str, now: datetime) -> dict:
+    """
+    Booking slots; date is today only when the caller named no day at all,
+    and None when they named one extract_date could not resolve
+    """
+    day = extract_date(text, now.date())
+    if day is None and not DATE_WORDS.search(text):
+        day = now.date().isoformat()
+    return {
+        "intent": "booking",
+        "date": day,
+        "time": extract_time(text),
+        "party_size": extract_party_size(text)
+    }
+
+
+def question_data(text: str) -> dict:
+    return {"intent": "question", "question": text, "topic": "hours" if HOURS_PATTERN.search(text) else None}
+
+
+class RuleIntentClassifier:
+    name = "rules"
+
+    def classify(self, text: str, menu_index: MenuIndex, now: datetime) -> Optional[IntentPrediction]:
+        if BOOKING_PATTERN.search(text):
+            data = extract_booking(text, now)
+            complete = all(data[slot] is not None for slot in ("date", "time", "party_size"))
+            return IntentPrediction(data, 0.95 if complete else 0.5, self.name)
+        if ORDER_PATTERN.search(text):
+            order = extract_order(text, menu_index)
+            if order is None:
+                return IntentPrediction({"intent": "order"}, 0.5, self.name)
+            return IntentPrediction({"intent": "order", "items": order[0], "special_instructions": order[1]}, 0.95, self.name)
+        if QUESTION_PATTERN.search(text):
+            return IntentPrediction(question_data(text), 0.9, self.name)
+        order = extract_order(text, menu_index)
+        if order is not None:
+            # Nothing but menu items ("two coffees and a muffin")
+            return IntentPrediction({"intent": "order", "items": order[0], "special_instructions": order[1]}, 0.9, self.name)
+        return None
+
+
+def features(text: str) -> List[str]:
+    words = text.split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """
+    Multinomial Naive Bayes with Laplace smoothing; small enough to train at import
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.priors: Dict[str, float] = {}
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        self.totals: Dict[str, int] = {}
+        self.vocabulary: set = set()
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "NaiveBayesIntentModel":
+        labels = Counter()
+        for label, text in examples:
+            labels[label] += 1
+            tokens = features(normalize_utterance(text))
+            self.counts[label].update(tokens)
+            self.vocabulary.update(tokens)
+        total = sum(labels.values())
+        self.priors = {label: math.log(count / total) for label, count in labels.items()}
+        self.totals = {label: sum(self.counts[label].values()) for label in labels}
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = [token for token in features(text) if token in self.vocabulary]
+        vocabulary_size = len(self.vocabulary)
+        scores = {}
+        for label, prior in self.priors.items():
+            denominator = self.totals[label] + self.alpha * vocabulary_size
+            scores[label] = prior + sum(math.log((self.counts[label][token] + self.alpha) / denominator) for token in tokens)
+        top = max(scores.values())
+        exp = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exp.values())
+        return {label: value / total for label, value in exp.items()}
+
+
+class ModelIntentClassifier:
+    name = "model"
+
+    def __init__(self, model: Optional[NaiveBayesIntentModel] = None):
+        self.model = model or NaiveBayesIntentModel().fit(TRAINING_EXAMPLES)
+
+    def classify(self, text: str, menu_index: MenuIndex, now: datetime) -> Optional[IntentPrediction]:
+        probabilities = self.model.predict_proba(text)
+        intent = max(probabilities, key=probabilities.get)
+        confidence = probabilities[intent]
+        if intent == "order":
+            order = extract_order(text, menu_index)
+            if order is None:
+                return None
+            return IntentPrediction({"intent": "order", "items": order[0], "special_instructions": order[1]}, confidence, self.name)
+        if intent == "booking":
+            data = extract_booking(text, now)
+            if data["date"] is None or data["party_size"] is None or data["time"] is None:
+                return None
+            return IntentPrediction(data, confidence, self.name)
+        return IntentPrediction(question_data(text), confidence, self.name)
+
+
+class IntentEngine:
+    def __init__(self, classifiers: Optional[list] = None, min_confidence: Optional[float] = None):
+        self.classifiers = classifiers if classifiers is not None else [RuleIntentClassifier(), ModelIntentClassifier()]
+        self.min_confidence = min_confidence or float(os.getenv("INTENT_MIN_CONFIDENCE", "0.85"))
+        self.enabled = os.getenv("LOCAL_INTENT_CLASSIFIER", "true").lower() != "false"
+        self.stats = Counter()
+
+    def classify(self, utterance: str, menu_index: MenuIndex, now: Optional[datetime] = None) -> Optional[IntentPrediction]:
+        """
+        Returns a confident local prediction, or None to fall back to the LLM
+        """
+        if not self.enabled:
+            return None
+        text = normalize_utterance(utterance)
+        # Cancelling or changing a booking must not be read as a new one
+        if text and not AMEND_PATTERN.search(text):
+            for classifier in self.classifiers:
+                prediction = classifier.classify(text, menu_index, now or datetime.now())
+                if prediction is not None and prediction.confidence >= self.min_confidence:
+                    if prediction.data["intent"] == "question":
+                        # Keep the caller's wording for the answer
+                        prediction.data["question"] = utterance
+                    self.stats[prediction.source] += 1
+                    INTENT_PREDICTIONS.inc(source=prediction.source)
+                    return prediction
+        self.stats["llm"] += 1
+        INTENT_PREDICTIONS.inc(source="llm")
+        return None
+
+    def snapshot(self) -> dict:
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "fallback_rate": round(self.stats["llm"] / total, 3) if total else 0.0,
+            "min_confidence": self.min_confidence
+        }
+
+
+intent_engine = IntentEngine()
@@ -0,0 +1,79 @@
+"""
+Labeled utterances the local intent model is trained on at import.
+
+Menu item names vary per restaurant, so order examples use generic food
+words; the model only has to learn how orders, bookings and questions are
+phrased. Keep the evaluation set in benchmarks/eval_intents.py separate.
+"""
+
+TRAINING_EXAMPLES = [
+    # order
+    ("order", "can i get a cheeseburger and fries"),
+    ("order", "i'd like two pizzas please"),
+    ("order", "i want to order a large coke"),
+    ("order", "let me get the chicken sandwich"),
+    ("order", "i'll have a salad and a lemonade"),
+    ("order", "give me three tacos"),
+    ("order", "could i order some wings for pickup"),
+    ("order", "we want two burgers one without onions"),
+    ("order", "put in an order for a pepperoni pizza"),
+    ("order", "i'd like to place an order"),
+    ("order", "one milkshake and a hot dog please"),
+    ("order", "add a side of onion rings"),
+    ("order", "i'll take the pasta with extra cheese"),
+    ("order", "can we get a dozen wings to go"),
+    ("order", "two coffees and a muffin"),
+    ("order", "i need a veggie wrap for takeout"),
+    ("order", "order me a caesar salad"),
+    ("order", "can i have the fish tacos no sauce"),
+    ("order", "get me a small fries and a shake"),
+    ("order", "i'd like to pick up a pizza"),
+    ("order", "a large pepperoni and garlic bread"),
+    ("order", "i would like the burger meal"),
+    ("order", "could you make me a sandwich to go"),
+    ("order", "i want the nachos and two sodas"),
+    # booking
+    ("booking", "i'd like to book a table for four at seven"),
+    ("booking", "can i make a reservation for tonight"),
+    ("booking", "table for two at 8 pm"),
+    ("booking", "i want to reserve a table for saturday"),
+    ("booking", "do you have a table for six tomorrow at noon"),
+    ("booking", "book us in for dinner friday at 7"),
+    ("booking", "reservation for 3 people at 6:30"),
+    ("booking", "can we get a table for a party of eight"),
+    ("booking", "i'd like to reserve for two tomorrow night"),
+    ("booking", "we need a table for five this evening"),
+    ("booking", "can i book for sunday lunch for four"),
+    ("booking", "is there room for two at 9 tonight"),
+    ("booking", "i want to make a booking for ten people"),
+    ("booking", "could you fit in a table of four at half seven"),
+    ("booking", "reserve a spot for two on friday"),
+    ("booking", "i'd like a table for my family tonight at 6"),
+    ("booking", "book a table for two please"),
+    ("booking", "can i change my reservation to 8"),
+    # question
+    ("question", "what time do you close"),
+    ("question", "are you open on sunday"),
+    ("question", "do you have vegan options"),
+    ("question", "where are you located"),
+    ("question", "is there parking nearby"),
+    ("question", "do you deliver"),
+    ("question", "how much is the cheeseburger"),
+    ("question", "what are your hours"),
+    ("question", "is the kitchen still open"),
+    ("question", "do you have gluten free pizza"),
+    ("question", "can i bring my dog"),
+    ("question", "what's in the caesar salad"),
+    ("question", "do you take credit cards"),
+    ("question", "are you open right now"),
+    ("question", "is the patio open"),
+    ("question", "what's your address"),
+    ("question", "do you have wifi"),
+    ("question", "how long is the wait"),
+    ("question", "what kind of beer do you have"),
+    ("question", "are your fries cooked in peanut oil"),
+    ("question", "do you do catering"),
+    ("question", "what's the special today"),
+    ("question", "do you have a kids menu"),
+    ("question", "when do you open tomorrow"),
+]
@@ -0,0 +1,185 @@
+"""
+Structured intent output from the LLM, validated in a single pass.
+
+The intent call forces the record_intent function, whose JSON schema is
+generated from the intent models in models/intent.py, so the reply
+arrives as function arguments instead of free text. The arguments go
+straight through IntentAdapter.validate_json, which parses and validates
+them into OrderIntent, BookingIntent or QuestionIntent in one step. No
+other parsing or coercion is attempted.
+
+When validation fails, the validation errors are sent back to the model
+and it is asked to correct its arguments, at most INTENT_MAX_REPAIRS
+times (default 1). If it still fails, the caller's fallback intent is
+used rather than asking the caller to repeat themselves. Parse failures
+and the extra round trips they cost are counted in the snapshot and in
+/metrics.
+"""
+import os
+import time
+from collections import Counter
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from models.intent import BookingIntent, IntentAdapter, OrderIntent, QuestionIntent
+from utils.metrics import Counter as MetricCounter
+
+FUNCTION_NAME = "record_intent"
+INTENT_MODELS = (OrderIntent, BookingIntent, QuestionIntent)
+
+INTENT_PARSES = MetricCounter(
+    "intent_parse_total", "LLM intent replies by outcome (ok, repaired, failed)", ("result",)
+)
+INTENT_ROUND_TRIPS = MetricCounter(
+    "intent_llm_round_trips_total", "LLM calls made for intent detection (first or repair)", ("kind",)
+)
+
+
+def _inline_refs(schema, defs: dict):
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].split("/")[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items() if key != "title"}
+    if isinstance(schema, list):
+        return [_inline_refs(value, defs) for value in schema]
+    return schema
+
+
+def intent_function() -> dict:
+    """
+    One flat function schema covering every intent model, with refs inlined
+    """
+    properties = {}
+    for model in INTENT_MODELS:
+        schema = model.model_json_schema()
+        for name, field in schema["properties"].items():
+            if name != "intent":
+                properties.setdefault(name, _inline_refs(field, schema.get("$defs", {})))
+    intents = [model.model_fields["intent"].default for model in INTENT_MODELS]
+    properties = {"intent": {"type": "string", "enum": intents}, **properties}
+    return {
+        "name": FUNCTION_NAME,
+        "description": "Record what the caller wants. Only fill the fields for that intent.",
+        "parameters": {"type": "object", "properties": properties, "required": ["intent"]}
+    }
+
+
+INTENT_FUNCTION = intent_function()
+
+
+def reply_arguments(message: dict) -> Optional[str]:
+    """
+    The raw JSON the model produced: function arguments, or JSON-mode content
+    """
+    call = message.get("function_call")
+    if call:
+        return call.get("arguments")
+    return message.get("content")
+
+
+def error_summary(error: Exception, limit: int = 300) -> str:
+    if isinstance(error, ValidationError):
+        parts = []
+        for detail in error.errors():
+            # The first location entry is the union tag when the intent itself was valid
+            location = ".".join(str(part) for part in detail["loc"][1:] or detail["loc"])
+            parts.append(f"{location}: {detail['msg']}" if location else detail["msg"])
+        text = "; ".join(parts)
+    else:
+        text = str(error)
+    return text[:limit]
+
+
+def failure_kind(error: Exception) -> str:
+    if not isinstance(error, ValidationError):
+        return "no_arguments"
+    if any(detail["type"] == "json_invalid" for detail in error.errors()):
+        return "invalid_json"
+    return "invalid_fields"
+
+
+class IntentParser:
+    def __init__(self, max_repairs: Optional[int] = None):
+        self.max_repairs = max_repairs if max_repairs is not None else int(os.getenv("INTENT_MAX_REPAIRS", "1"))
+        self.stats = Counter()
+        self.repair_seconds = 0.0
+
+    def parse(self, message: dict) -> BaseModel:
+        """
+        Validates a model reply into an intent; raises ValueError or ValidationError
+        """
+        raw = reply_arguments(message)
+        if not raw:
+            raise ValueError(f"No {FUNCTION_NAME} call or JSON content in the reply")
+        return IntentAdapter.validate_json(raw)
+
+    def parse_data(self, data: dict) -> BaseModel:
+        """
+        Validates an intent dict from another source (e.g. the local classifier)
+        """
+        return IntentAdapter.validate_python(data)
+
+    async def run(self, messages: List[dict], complete: Callable[[List[dict]], Awaitable[dict]],
+                  fallback: BaseModel) -> Tuple[BaseModel, str]:
+        """
+        Calls complete(messages) and validates the reply, repairing it at most
+        max_repairs times. Returns (intent, result) where result is ok,
+        repaired or failed; failed returns the fallback intent.
+        """
+        message = await complete(messages)
+        self._round_trip("first")
+        repair_started = None
+        for attempt in range(self.max_repairs + 1):
+            try:
+                intent = self.parse(message)
+            except (ValueError, ValidationError) as e:
+                self.stats[failure_kind(e)] += 1
+                if attempt == self.max_repairs:
+                    break
+                repair_started = repair_started or time.perf_counter()
+                messages = messages + self.repair_messages(message, e)
+                message = await complete(messages)
+                self._round_trip("repair")
+                continue
+            result = "repaired" if attempt else "ok"
+            self._finish(result, repair_started)
+            return intent, result
+        self._finish("failed", repair_started)
+        return fallback, "failed"
+
+    def repair_messages(self, message: dict, error: Exception) -> List[dict]:
+        correction = f"Those arguments were invalid ({error_summary(error)}). Call {FUNCTION_NAME} again with corrected arguments."
+        call = message.get("function_call")
+        if call:
+            return [
+                {"role": "assistant", "content": None, "function_call": {"name": call.get("name"), "arguments": call.get("arguments") or ""}},
+                {"role": "function", "name": FUNCTION_NAME, "content": correction}
+            ]
+        return [
+            {"role": "assistant", "content": message.get("content") or ""},
+            {"role": "user", "content": correction}
+        ]
+
+    def _round_trip(self, kind: str) -> None:
+        self.stats[f"{kind}_calls"] += 1
+        INTENT_ROUND_TRIPS.inc(kind=kind)
+
+    def _finish(self, result: str, repair_started: Optional[float]) -> None:
+        self.stats[result] += 1
+        INTENT_PARSES.inc(result=result)
+        if repair_started is not None:
+            self.repair_seconds += time.perf_counter() - repair_started
+
+    def snapshot(self) -> dict:
+        replies = self.stats["ok"] + self.stats["repaired"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "failed_parse_rate": round((self.stats["repaired"] + self.stats["failed"]) / replies, 3) if replies else 0.0,
+            "wasted_round_trips": self.stats["repair_calls"],
+            "repair_ms_total": round(self.repair_seconds * 1000, 1),
+            "max_repairs": self.max_repairs
+        }
+
+
+intent_parser = IntentParser()
@@ -0,0 +1,218 @@
+"""
+In-process background jobs with a durable Mongo outbox.
+
+enqueue() writes jobs to `job_outbox` before handing them to the in-memory
+queue, so work acknowledged to a caller survives a crash: on startup (and
+every sweep interval) pending jobs and jobs whose lease expired are loaded
+back from the outbox. Workers claim a job atomically before running it, so a
+job that ends up queued twice still runs once.
+
+Failed jobs are retried with exponential backoff; after `max_attempts` they
+move to `job_dead_letters` with the last error. drain() on shutdown waits
+for queued work to finish; anything left stays in the outbox for the next
+start.
+
+Handlers are registered by name and receive the job payload:
+
+    @job_runner.handler("transcript.persist")
+    async def persist_transcript(payload: dict) -> None: ...
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from utils.db import db
+from utils.metrics import Counter, Gauge
+
+PENDING = "pending"
+RUNNING = "running"
+DUPLICATE_KEY = 11000
+
+Handler = Callable[[dict], Awaitable[None]]
+
+JOBS_PROCESSED = Counter("background_jobs_total", "Background jobs by name and outcome", ("name", "outcome"))
+
+
+class JobRunner:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        sweep_interval: Optional[float] = None
+    ):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+        self.lease = timedelta(seconds=lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "60")))
+        self.sweep_interval = sweep_interval or float(os.getenv("JOB_SWEEP_INTERVAL", "30"))
+        self.retry_base_delay = float(os.getenv("JOB_RETRY_BASE_DELAY", "1"))
+        self._handlers: Dict[str, Handler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Delayed requeues, held so they are not garbage-collected mid-sleep
+        self._retries: Set[asyncio.Task] = set()
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self._handlers[name] = func
+            return func
+        return register
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def job(self, name: str, payload: dict, job_id: Optional[str] = None) -> dict:
+        """
+        Builds an outbox document; pass a deterministic job_id to make enqueueing idempotent
+        """
+        if name not in self._handlers:
+            raise ValueError(f"No handler registered for job {name!r}")
+        now = datetime.utcnow()
+        return {
+            "_id": job_id or str(ObjectId()),
+            "name": name,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "not_before": now,
+            "created_at": now
+        }
+
+    async def enqueue(self, *jobs: dict) -> None:
+        """
+        Persists the jobs (one round trip) and queues them for the workers
+        """
+        if not jobs:
+            return
+        try:
+            await db.job_outbox.insert_many(list(jobs), ordered=False)
+        except BulkWriteError as e:
+            # Jobs with deterministic ids may already be queued; anything else is real
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        if self._queue is not None:
+            for job in jobs:
+                self._queue.put_nowait(job["_id"])
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """
+        Waits up to `timeout` for queued jobs to finish, then stops the workers.
+        Unfinished jobs stay in the outbox and are recovered on the next start.
+        """
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Shutting down with {self._queue.qsize()} background jobs still queued")
+        # Jobs waiting on a retry delay stay pending in the outbox for the next start
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+        self._queue = None
+
+    async def recover(self) -> int:
+        """
+        Queues outbox jobs that are due or whose worker died; returns how many
+        """
+        now = datetime.utcnow()
+        cursor = db.job_outbox.find(
+            {"$or": [
+                {"status": PENDING, "not_before": {"$lte": now}},
+                {"status": RUNNING, "lease_until": {"$lt": now}}
+            ]},
+            {"_id": 1}
+        )
+        recovered = 0
+        async for job in cursor:
+            self._queue.put_nowait(job["_id"])
+            recovered += 1
+        return recovered
+
+    async def _sweeper(self) -> None:
+        while True:
+            try:
+                recovered = await self.recover()
+                if recovered:
+                    logging.info(f"Recovered {recovered} background jobs from the outbox")
+            except Exception as e:
+                logging.error(f"Background job sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await db.job_outbox.find_one_and_update(
+            {
+                "_id": job_id,
+                "$or": [
+                    {"status": PENDING, "not_before": {"$lte": now}},
+                    {"status": RUNNING, "lease_until": {"$lt": now}}
+                ]
+            },
+            {"$set": {"status": RUNNING, "lease_until": now + self.lease}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _requeue_later(self, job_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    async def run(self, job: dict) -> None:
+        name = job["name"]
+        try:
+            await self._handlers[name](job["payload"])
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                JOBS_PROCESSED.inc(name=name, outcome="dead_letter")
+                logging.error(f"Background job {name} {job['_id']} dead-lettered after {job['attempts']} attempts: {e}")
+                await db.job_dead_letters.insert_one({**job, "error": str(e), "failed_at": datetime.utcnow()})
+                await db.job_outbox.delete_one({"_id": job["_id"]})
+                return
+            JOBS_PROCESSED.inc(name=name, outcome="retried")
+            delay = self.retry_base_delay * 2 ** (job["attempts"] - 1)
+            await db.job_outbox.update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": PENDING,
+                    "error": str(e),
+                    "not_before": datetime.utcnow() + timedelta(seconds=delay)
+                }}
+            )
+            retry = asyncio.create_task(self._requeue_later(job["_id"], delay))
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+        else:
+            JOBS_PROCESSED.inc(name=name, outcome="done")
+            await db.job_outbox.delete_one({"_id": job["_id"]})
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self._claim(job_id)
+                # None: already done, claimed elsewhere, or not due yet
+                if job is not None:
+                    await self.run(job)
+            except Exception as e:
+                logging.error(f"Background job {job_id} could not be processed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+job_runner = JobRunner()
+Gauge("background_jobs_queued", "Background jobs waiting in the in-memory queue", function=lambda: job_runner.queue_depth)
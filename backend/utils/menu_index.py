@@ -0,0 +1,335 @@
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.db import db
+from utils.ttl_cache import TTLCache
+
+# Filler words callers put around item names
+STOPWORDS = {
+    "a", "an", "the", "some", "of", "please", "and", "with", "order", "get",
+    "me", "i", "id", "like", "want", "can", "have", "could", "would", "one"
+}
+
+# Spoken quantities, dropped like digits. "dozen" and "couple" stay, so a
+# name that still carries one does not match exactly with the wrong count.
+NUMBER_WORDS = {"two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve"}
+
+# Spoken variants mapped to the word menus usually use
+SYNONYMS = {
+    "coke": "cola",
+    "pop": "soda",
+    "chips": "fries",
+    "hotdog": "hot dog",
+    "hamburger": "burger",
+    "shake": "milkshake",
+    "ice": "iced",
+    "veggie": "vegetable",
+    "veg": "vegetable",
+    "lg": "large",
+    "sm": "small",
+    "med": "medium",
+}
+
+# Size words (normalized) that do not name an item on their own
+SIZE_WORDS = {"small", "medium", "regular", "large", "big", "double", "kid"}
+
+MIN_SCORE = 0.55
+# Candidates within this Dice margin of the best are re-ranked by edit distance
+RERANK_MARGIN = 0.1
+# Re-ranked candidates closer than this are a near-tie and match nothing
+TIE_MARGIN = 0.02
+MAX_CANDIDATES = 5
+# relevant(): share of an item's trigrams, or of its words, an utterance must contain, and how many items to return
+MIN_COVERAGE = 0.6
+MIN_WORD_COVERAGE = 0.5
+MENTION_SPLIT = re.compile(r",| and | plus | & ")
+MAX_RELEVANT = 40
+
+
+def singularize(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "ses", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercases, strips punctuation, filler words and quantities, maps
+    synonyms and singularizes, so "2 Cheeseburgers, please", "two
+    cheeseburgers" and "cheeseburger" compare equal.
+    """
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.lower().replace("'", ""))
+    tokens = []
+    for word in text.split():
+        if word in STOPWORDS or word in NUMBER_WORDS or word.isdigit():
+            continue
+        # Synonyms are keyed by the spoken word, plural ("chips") or singular ("cokes")
+        word = SYNONYMS.get(word) or SYNONYMS.get(singularize(word)) or word
+        tokens.extend(singularize(part) for part in word.split())
+    return " ".join(tokens)
+
+
+def item_attributes(item: dict) -> Set[str]:
+    phrases = {normalize(tag) for tag in item.get("dietary") or []}
+    if item.get("category"):
+        phrases.add(normalize(item["category"]))
+    return {phrase for phrase in phrases if phrase}
+
+
+def trigrams(normalized: str) -> Set[str]:
+    # Spaces are dropped so "cheese burger" and "cheeseburger" share trigrams
+    compact = f"${normalized.replace(' ', '')}$"
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class MenuIndex:
+    """
+    Precomputed lookup structure over one restaurant's menu items.
+
+    Exact matches on the normalized name are a dict hit. Words that are all
+    part of one item's name ("fries" for "French Fries") match that item,
+    and match nothing when several items contain them ("chicken"). Everything
+    else goes through a trigram inverted index, and the best few candidates
+    by Dice similarity are re-ranked by edit distance; a near-tie matches
+    nothing.
+    """
+
+    def __init__(self, items: Iterable[dict] = ()):
+        self.items: Dict[str, dict] = {}
+        self._normalized: Dict[str, str] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._exact: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._words: Dict[str, Set[str]] = defaultdict(set)
+        # Normalized dietary tags and category ("gluten free", "dessert") -> item ids
+        self._attributes: Dict[str, Set[str]] = defaultdict(set)
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: dict) -> None:
+        item_id = str(item.get("_id") or item.get("id"))
+        if item_id in self.items:
+            self.remove(item_id)
+        if not item.get("available", True):
+            return
+        normalized = normalize(item["name"])
+        grams = trigrams(normalized)
+        self.items[item_id] = item
+        self._normalized[item_id] = normalized
+        self._trigrams[item_id] = grams
+        self._exact[normalized] = item_id
+        for gram in grams:
+            self._postings[gram].add(item_id)
+        for word in normalized.split():
+            self._words[word].add(item_id)
+        for phrase in item_attributes(item):
+            self._attributes[phrase].add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        item_id = str(item_id)
+        if item_id not in self.items:
+            return
+        item = self.items.pop(item_id)
+        for phrase in item_attributes(item):
+            postings = self._attributes[phrase]
+            postings.discard(item_id)
+            if not postings:
+                del self._attributes[phrase]
+        normalized = self._normalized.pop(item_id)
+        if self._exact.get(normalized) == item_id:
+            del self._exact[normalized]
+        for gram in self._trigrams.pop(item_id):
+            postings = self._postings[gram]
+            postings.discard(item_id)
+            if not postings:
+                del self._postings[gram]
+        for word in set(normalized.split()):
+            postings = self._words[word]
+            postings.discard(item_id)
+            if not postings:
+                del self._words[word]
+
+    def containing(self, words: List[str]) -> Set[str]:
+        """
+        Ids of the items whose names contain every word
+        """
+        found: Optional[Set[str]] = None
+        for word in set(words):
+            postings = self._words.get(word)
+            if not postings:
+                return set()
+            found = set(postings) if found is None else found & postings
+        return found or set()
+
+    def match(self, text: str) -> Optional[Tuple[dict, float]]:
+        """
+        Returns (menu item, score in 0..1) for the closest item, or None
+        """
+        normalized = normalize(text)
+        if not normalized:
+            return None
+        item_id = self._exact.get(normalized)
+        if item_id is not None:
+            return self.items[item_id], 1.0
+
+        words = normalized.split()
+        if all(word in SIZE_WORDS for word in words):
+            # "large" alone names no item, even though "Large Fries" contains it
+            return None
+        containing = self.containing(words)
+        if len(containing) > 1:
+            return None
+        if containing:
+            item_id = containing.pop()
+            size = len(self._normalized[item_id].split())
+            return self.items[item_id], round(2 * len(set(words)) / (len(set(words)) + size), 3)
+
+        query = trigrams(normalized)
+        shared: Counter = Counter()
+        for gram in query:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        if not shared:
+            return None
+
+        scored: List[Tuple[float, str]] = []
+        for candidate, count in shared.items():
+            dice = 2 * count / (len(query) + len(self._trigrams[candidate]))
+            if dice >= MIN_SCORE:
+                scored.append((dice, candidate))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        top_dice = scored[0][0]
+        close = [entry for entry in scored[:MAX_CANDIDATES] if top_dice - entry[0] <= RERANK_MARGIN]
+        if len(close) == 1:
+            return self.items[close[0][1]], round(top_dice, 3)
+
+        compact = normalized.replace(" ", "")
+        reranked = []
+        for dice, candidate in close:
+            target = self._normalized[candidate].replace(" ", "")
+            distance = edit_distance(compact, target)
+            reranked.append(((dice + 1 - distance / max(len(compact), len(target))) / 2, candidate))
+        reranked.sort(reverse=True)
+        if reranked[0][0] - reranked[1][0] < TIE_MARGIN:
+            return None
+        return self.items[reranked[0][1]], round(reranked[0][0], 3)
+
+    def relevant(self, text: str, limit: int = MAX_RELEVANT) -> List[Tuple[dict, float]]:
+        """
+        Items mentioned anywhere in a whole utterance, best first. An item's
+        score is the larger of two shares: its trigrams found in the
+        utterance (whole names, typos) and its words found in the utterance
+        (partial names), so "two spicy wings and a coke" ranks "Spicy Chicken
+        Wings" and "Cola" high. Size words alone do not count as a mention.
+        """
+        normalized = normalize(text)
+        if not normalized:
+            return []
+        query = trigrams(normalized)
+        for word in normalized.split():
+            query |= trigrams(word)
+        shared: Counter = Counter()
+        for gram in query:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        scores: Dict[str, float] = {}
+        for candidate, count in shared.items():
+            coverage = count / len(self._trigrams[candidate])
+            if coverage >= MIN_COVERAGE:
+                scores[candidate] = coverage
+
+        # Words are counted per mention, so "large" in one and "cola" in another is not "Large Cola"
+        for mention in MENTION_SPLIT.split(text.lower()):
+            matched: Counter = Counter()
+            named: Set[str] = set()
+            for word in set(normalize(mention).split()):
+                for candidate in self._words.get(word, ()):
+                    matched[candidate] += 1
+                    if word not in SIZE_WORDS:
+                        named.add(candidate)
+            for candidate in named:
+                coverage = matched[candidate] / len(set(self._normalized[candidate].split()))
+                if coverage >= MIN_WORD_COVERAGE:
+                    scores[candidate] = max(coverage, scores.get(candidate, 0.0))
+
+        # Ties go to the longer (more specific) name
+        scored = sorted(((score, len(self._trigrams[candidate]), candidate) for candidate, score in scores.items()), reverse=True)
+        return [(self.items[candidate], round(score, 3)) for score, _, candidate in scored[:limit]]
+
+
+    def with_attributes(self, text: str, limit: int = MAX_RELEVANT) -> List[dict]:
+        """
+        Items whose dietary tags or category the utterance names ("do you have
+        vegan options", "what desserts are there"), by name
+        """
+        normalized = f" {normalize(text)} "
+        found: Set[str] = set()
+        for phrase, item_ids in self._attributes.items():
+            if f" {phrase} " in normalized:
+                found |= item_ids
+        return sorted((self.items[item_id] for item_id in found), key=lambda item: item["name"])[:limit]
+
+
+class MenuIndexRegistry:
+    """
+    Lazily built MenuIndex per restaurant. The menu_items routes keep this
+    worker's indexes current; entries expire after MENU_INDEX_TTL seconds so
+    other workers pick up menu edits, and the least recently used restaurant
+    is dropped beyond maxsize.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 1024):
+        self.ttl = ttl or float(os.getenv("MENU_INDEX_TTL", "300"))
+        self._indexes = TTLCache(self.ttl, maxsize)
+
+    async def get(self, restaurant_id: str) -> MenuIndex:
+        restaurant_id = str(restaurant_id)
+        index = self._indexes.get(restaurant_id)
+        if index is None:
+            items = await db.menu_items.find({"restaurant_id": restaurant_id, "available": True}).to_list(None)
+            index = MenuIndex(items)
+            self._indexes.set(restaurant_id, index)
+        return index
+
+    def upsert_item(self, item: dict) -> None:
+        index = self._indexes.get(str(item["restaurant_id"]))
+        if index is not None:
+            index.add(item)
+
+    def remove_item(self, restaurant_id: str, item_id: str) -> None:
+        index = self._indexes.get(str(restaurant_id))
+        if index is not None:
+            index.remove(item_id)
+
+    def invalidate(self, restaurant_id: str) -> None:
+        self._indexes.pop(str(restaurant_id))
+
+
+menu_indexes = MenuIndexRegistry()
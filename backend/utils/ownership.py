@@ -0,0 +1,28 @@
+import os
+from typing import FrozenSet
+
+from utils.db import db
+from utils.ttl_cache import TTLCache
+
+# user_id -> ids of the restaurants that user owns
+_owned_restaurants = TTLCache(float(os.getenv("OWNERSHIP_CACHE_TTL", "300")), maxsize=10000)
+
+
+async def owned_restaurant_ids(user_id: str) -> FrozenSet[str]:
+    """
+    Returns the ids of the restaurants owned by `user_id`, from cache when possible
+    """
+    user_id = str(user_id)
+    owned = _owned_restaurants.get(user_id)
+    if owned is None:
+        cursor = db.restaurants.find({"user_id": user_id}, {"_id": 1})
+        owned = frozenset([str(r["_id"]) async for r in cursor])
+        _owned_restaurants.set(user_id, owned)
+    return owned
+
+
+def invalidate_owner(user_id: str) -> None:
+    """
+    Drops a user's cached restaurant set; call after restaurant create, update or delete
+    """
+    _owned_restaurants.pop(str(user_id))
@@ -0,0 +1,148 @@
+import base64
+import json
+from datetime import date, timedelta
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, DESCENDING
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Documents Motor pulls per getMore while streaming NDJSON
+STREAM_BATCH_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Sort = List[Tuple[str, int]]
+
+
+class Page:
+    """
+    Query parameters shared by the paginated list endpoints.
+
+    `format=json` (default) returns one page as a JSON array and, when more
+    rows follow, an opaque cursor in the X-Next-Cursor header to pass back
+    as `cursor`. `format=ndjson` streams every remaining row, one JSON
+    document per line, ignoring `limit`.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        format: str = Query("json", pattern="^(json|ndjson)$", description="json for one page, ndjson to stream all rows")
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.format = format
+
+
+def date_range(start: Optional[str], end: Optional[str]) -> Optional[dict]:
+    """
+    Builds a Mongo range over an ISO date or timestamp string field. A bare
+    YYYY-MM-DD `end` includes that whole day.
+    """
+    bounds = {}
+    if start:
+        bounds["$gte"] = start
+    if end:
+        if len(end) == 10:
+            try:
+                bounds["$lt"] = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+        else:
+            bounds["$lte"] = end
+    return bounds or None
+
+
+def stringify_id(document: dict) -> dict:
+    document["_id"] = str(document["_id"])
+    return document
+
+
+def encode_cursor(sort: Sort, document: dict) -> str:
+    values = [document.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: Sort, cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def after_cursor(sort: Sort, values: list) -> dict:
+    """
+    Keyset condition selecting the rows that sort strictly after `values`.
+
+    For sort keys (a, b, _id) this is a > va OR (a = va AND b > vb) OR
+    (a = va AND b = vb AND _id > vid), with > flipped for descending keys.
+    Missing values sort lowest in Mongo, so a None key is handled explicitly.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        equal = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        value = values[i]
+        if value is None:
+            if direction == DESCENDING:
+                # Nothing sorts below a missing value
+                continue
+            branches.append({**equal, field: {"$ne": None}})
+        elif direction == DESCENDING:
+            # Rows with the key missing sort last in descending order
+            branches.append({**equal, "$or": [{field: {"$lt": value}}, {field: None}]})
+        else:
+            branches.append({**equal, field: {"$gt": value}})
+    return {"$or": branches} if branches else {"_id": {"$exists": False}}
+
+
+async def _ndjson_lines(cursor, prepare: Callable[[dict], dict]) -> AsyncIterator[bytes]:
+    async for document in cursor:
+        yield (json.dumps(prepare(document), default=str) + "\n").encode()
+
+
+async def paginate(
+    collection,
+    query: dict,
+    sort: Sort,
+    page: Page,
+    response: Response,
+    prepare: Callable[[dict], dict] = lambda document: document
+):
+    """
+    Runs a keyset-paginated find. `sort` must end with _id so every row has
+    a unique position. Returns a list of prepared documents (setting the
+    next-page header on `response`) or, for NDJSON, a StreamingResponse fed
+    straight from the Motor cursor.
+    """
+    if page.cursor:
+        query = {"$and": [query, after_cursor(sort, decode_cursor(sort, page.cursor))]}
+    cursor = collection.find(query).sort(sort)
+
+    if page.format == "ndjson":
+        return StreamingResponse(
+            _ndjson_lines(cursor.batch_size(STREAM_BATCH_SIZE), prepare),
+            media_type="application/x-ndjson"
+        )
+
+    documents = await cursor.limit(page.limit + 1).to_list(page.limit + 1)
+    if len(documents) > page.limit:
+        documents = documents[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, documents[-1])
+    return [prepare(document) for document in documents]
+
+
+def newest_first(field: str) -> Sort:
+    return [(field, DESCENDING), ("_id", DESCENDING)]
+
+
+def oldest_first(*fields: str) -> Sort:
+    return [(field, ASCENDING) for field in fields] + [("_id", ASCENDING)]
@@ -0,0 +1,57 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the pool already has as much password work as it will queue"""
+
+
+class PasswordPool:
+    """
+    Runs bcrypt hashing and verification on a dedicated, size-limited thread
+    pool so the CPU cost stays off the event loop (bcrypt releases the GIL,
+    so threads run in parallel). At most `workers + max_queue` operations are
+    admitted; beyond that callers get PasswordPoolSaturated immediately.
+    """
+
+    def __init__(self, context: CryptContext, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.context = context
+        self.workers = workers or int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        self.in_flight = 0
+        self.stats = {"completed": 0, "rejected": 0, "peak_in_flight": 0}
+
+    async def _run(self, fn: Callable, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.stats["rejected"] += 1
+            raise PasswordPoolSaturated()
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.stats["completed"] += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.context.verify, password, password_hash)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers)
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
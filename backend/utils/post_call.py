@@ -0,0 +1,69 @@
+"""
+Post-call work that the caller does not hear, run as background jobs.
+
+The webhook decides everything the reply depends on (transcript text,
+intent, matched order items) and pre-generates the transcript and order
+ids, so the transcript can carry its order_id from the start. Persisting
+the documents, updating the revenue rollups and rendering the receipt
+then happen in utils.jobs workers after the TwiML has been returned.
+"""
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.db import db
+from utils.jobs import job_runner
+from utils.receipts import generate_receipt
+from utils.restaurant_directory import restaurant_directory
+from utils.rollups import apply_order_created
+
+
+@job_runner.handler("transcript.persist")
+async def persist_transcript(transcript: dict) -> None:
+    try:
+        await db.transcripts.insert_one(transcript)
+    except DuplicateKeyError:
+        # Written by an earlier attempt
+        pass
+
+
+@job_runner.handler("order.persist")
+async def persist_order(order: dict) -> None:
+    try:
+        await db.orders.insert_one(order)
+    except DuplicateKeyError:
+        pass
+    # Rolled up right after the insert, as the order API does, so a later
+    # edit never moves a contribution that was not counted yet. The increment
+    # records the order id, so a retry after a failure at any point counts it
+    # once; the flag, set only afterwards, lets later retries skip the rollup.
+    stored = await db.orders.find_one({"_id": order["_id"]}, {"rolled_up": 1})
+    if not (stored or {}).get("rolled_up"):
+        await apply_order_created(order)
+        await db.orders.update_one({"_id": order["_id"]}, {"$set": {"rolled_up": True}})
+    # The receipt has its own retries; its fixed id keeps a retry of this job from queueing it twice
+    await job_runner.enqueue(
+        job_runner.job("order.receipt", {"order_id": order["_id"]}, job_id=f"order.receipt:{order['_id']}")
+    )
+
+
+@job_runner.handler("order.receipt")
+async def render_order_receipt(payload: dict) -> None:
+    order = await db.orders.find_one({"_id": payload["order_id"]})
+    if order is None:
+        # Deleted by the owner in the meantime
+        return
+    restaurant = await restaurant_directory.by_id(order["restaurant_id"])
+    receipt_path = await generate_receipt(order, restaurant.restaurant if restaurant else None)
+    await db.orders.update_one({"_id": order["_id"]}, {"$set": {"receipt_path": receipt_path}})
+
+
+async def schedule_post_call(transcript: dict, order: Optional[dict] = None) -> None:
+    """
+    Durably queues persistence of the call's transcript and order in one
+    outbox write; the order job then updates the rollups and queues the receipt
+    """
+    jobs = [job_runner.job("transcript.persist", transcript, job_id=f"transcript:{transcript['_id']}")]
+    if order is not None:
+        jobs.append(job_runner.job("order.persist", order, job_id=f"order:{order['_id']}"))
+    await job_runner.enqueue(*jobs)
@@ -0,0 +1,148 @@
+"""
+Compact, token-budgeted prompts for the voice LLM calls.
+
+A prompt is a static prefix plus a per-turn part:
+
+- The prefix (system message) holds the task instructions, the restaurant's
+  name, its hours in one line and its menu categories. It is built once per
+  restaurant and task and reused byte for byte, which also lets the
+  provider's prompt caching kick in.
+- The user message holds only the menu items relevant to what the caller
+  said (MenuIndex.relevant over their words, and for questions the items
+  whose dietary tags or category they named), the restaurant's local date,
+  weekday and time (so "tomorrow" or "Friday" can be resolved; it changes
+  every turn, so it stays out of the cached prefix) and the utterance
+  itself, with items added best match first until the token budget is used.
+
+Token counts use tiktoken when it is installed and ~4 characters per token
+otherwise.
+"""
+import os
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+from utils.hours import WeeklyHours, local_now
+from utils.menu_index import MenuIndex
+from utils.restaurant_directory import RestaurantContext
+
+INSTRUCTIONS = {
+    "intent": (
+        "Classify the caller's request as an order, booking or question and call record_intent. "
+        "Use menu item names exactly as listed; give dates as YYYY-MM-DD, resolving words like tomorrow "
+        "or Friday against today's date in the message, and times as 24-hour HH:MM."
+    ),
+    "question": (
+        "Answer the caller's question in one or two short spoken sentences, using only the "
+        "facts given. If they are not enough, say you are not sure."
+    )
+}
+# Fallback items listed when nothing the caller said matches the menu
+FALLBACK_ITEMS = 15
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def format_item(item: dict) -> str:
+    line = f"{item['name']} | {float(item.get('price') or 0):.2f}"
+    if item.get("dietary"):
+        line += f" | {', '.join(item['dietary'])}"
+    return line
+
+
+class PromptContext:
+    def __init__(self, messages: List[dict], tokens: int, items: int, truncated: bool):
+        self.messages = messages
+        self.tokens = tokens
+        self.items = items
+        self.truncated = truncated
+
+
+class PromptContextBuilder:
+    def __init__(self, token_budget: Optional[int] = None, max_items: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", "1000"))
+        self.max_items = max_items or int(os.getenv("PROMPT_MAX_MENU_ITEMS", "40"))
+        self._prefixes: Dict[Tuple[str, str], Tuple[str, str, int]] = {}
+        self.stats = {"prefix_hits": 0, "prefix_builds": 0, "truncated": 0}
+
+    def prefix(self, restaurant: RestaurantContext, index: MenuIndex, task: str) -> Tuple[str, int]:
+        """
+        The static system message for a restaurant and task, and its token count
+        """
+        material = repr((restaurant.name, restaurant.get("hours"), len(index)))
+        fingerprint = hashlib.sha1(material.encode()).hexdigest()
+        cached = self._prefixes.get((restaurant.id, task))
+        if cached is not None and cached[0] == fingerprint:
+            self.stats["prefix_hits"] += 1
+            return cached[1], cached[2]
+
+        lines = [f"You are the phone assistant for {restaurant.name or 'the restaurant'}.", INSTRUCTIONS[task]]
+        hours = WeeklyHours.parse(restaurant.get("hours"))
+        if hours.known():
+            lines.append(f"Hours: {hours.summary()}.")
+        categories = sorted({item["category"] for item in index.items.values() if item.get("category")})
+        if categories:
+            lines.append(f"Menu categories: {', '.join(categories)}.")
+        text = "\n".join(lines)
+        tokens = count_tokens(text)
+        self._prefixes[(restaurant.id, task)] = (fingerprint, text, tokens)
+        self.stats["prefix_builds"] += 1
+        return text, tokens
+
+    def build(self, restaurant: RestaurantContext, index: MenuIndex, task: str, utterance: str,
+              now: Optional[datetime] = None) -> PromptContext:
+        system, prefix_tokens = self.prefix(restaurant, index, task)
+        now = now or local_now(restaurant.get("timezone"))
+        caller = f"Today is {now.strftime('%A %Y-%m-%d')}, local time {now.strftime('%H:%M')}.\nCaller: {utterance}"
+        remaining = self.token_budget - prefix_tokens - count_tokens(caller)
+
+        items = [item for item, _ in index.relevant(utterance, self.max_items)]
+        if task == "question":
+            # "Do you have vegan options?" names a tag, not an item
+            named = {id(item) for item in items}
+            items += [item for item in index.with_attributes(utterance, self.max_items) if id(item) not in named]
+            items = items[:self.max_items]
+        heading = "Menu items matching the caller (name | price | dietary):"
+        if not items:
+            # Nothing named; popular items give the model something to suggest
+            items = sorted(index.items.values(), key=lambda item: (not item.get("isPopular"), item["name"]))[:FALLBACK_ITEMS]
+            heading = "Some menu items (name | price | dietary):"
+        lines = []
+        truncated = False
+        if items:
+            remaining -= count_tokens(heading)
+            for item in items:
+                line = format_item(item)
+                cost = count_tokens(line) + 1
+                if cost > remaining:
+                    truncated = True
+                    break
+                lines.append(line)
+                remaining -= cost
+        if truncated:
+            self.stats["truncated"] += 1
+
+        user = "\n".join([heading, *lines, "", caller]) if lines else caller
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        tokens = prefix_tokens + count_tokens(user)
+        return PromptContext(messages, tokens, len(lines), truncated)
+
+    def invalidate(self, restaurant_id: str) -> None:
+        for key in [key for key in self._prefixes if key[0] == str(restaurant_id)]:
+            del self._prefixes[key]
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "cached_prefixes": len(self._prefixes), "token_budget": self.token_budget}
+
+
+prompt_contexts = PromptContextBuilder()
@@ -0,0 +1,197 @@
+"""
+Thermal-printer receipts, rendered off the event loop in a process pool.
+
+Receipts are stored content-addressed under RECEIPTS_DIR: the file name is
+the SHA-256 of everything the receipt is rendered from (the restaurant's
+template and the order's receipt fields). Rendering is deterministic, so
+an existing file is already the right receipt and a re-request costs one
+stat() instead of a render; an edited order gets a new file.
+
+Each restaurant's header and footer are built once per worker process and
+reused for every receipt that restaurant prints. A day's orders can be
+rendered in batches and bundled into one zip archive.
+"""
+import os
+import json
+import asyncio
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from utils.metrics import Counter
+
+RECEIPT_WIDTH = 32
+RECEIPTS_DIR = os.getenv("RECEIPTS_DIR", "cache/receipts")
+# Bumping this re-renders every receipt on its next request
+TEMPLATE_VERSION = 1
+# Fields of an order that appear on its receipt
+RECEIPT_FIELDS = ("_id", "timestamp", "items", "notes", "customer_name")
+
+RECEIPTS_RENDERED = Counter("receipts_total", "Receipts requested, by whether a stored copy was reused", ("outcome",))
+
+
+def receipt_template(restaurant: Optional[dict]) -> dict:
+    """
+    The per-restaurant parts of a receipt, as a small picklable dict
+    """
+    restaurant = restaurant or {}
+    return {
+        "version": TEMPLATE_VERSION,
+        "name": restaurant.get("name") or "Receipt",
+        "address": restaurant.get("address") or "",
+        "phone": restaurant.get("phone") or ""
+    }
+
+
+def receipt_key(template: dict, order: dict) -> str:
+    fields = {field: order.get(field) for field in RECEIPT_FIELDS}
+    payload = json.dumps([template, fields], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def receipt_path(key: str, directory: str = RECEIPTS_DIR) -> str:
+    return os.path.join(directory, key[:2], f"{key}.txt")
+
+
+# Per worker process: one entry per restaurant (keyed by its details, so an
+# edited restaurant simply gets a new entry)
+@lru_cache(maxsize=256)
+def _compiled_template(name: str, address: str, phone: str) -> Tuple[str, str]:
+    header = [name.center(RECEIPT_WIDTH).rstrip()]
+    header += [line.center(RECEIPT_WIDTH).rstrip() for line in (address[:RECEIPT_WIDTH], phone) if line]
+    footer = ["", "Thank you!".center(RECEIPT_WIDTH).rstrip()]
+    return "\n".join(header), "\n".join(footer)
+
+
+def render_receipt(order: dict, template: dict) -> str:
+    """
+    Plain-text receipt sized for a 58mm thermal printer
+    """
+    header, footer = _compiled_template(template["name"], template["address"], template["phone"])
+    lines = [header, f"Order {order['_id']}", (order.get("timestamp") or "")[:16]]
+    if order.get("customer_name"):
+        lines.append(f"For {order['customer_name']}"[:RECEIPT_WIDTH])
+    lines.append("-" * RECEIPT_WIDTH)
+    total = 0.0
+    for item in order.get("items") or []:
+        amount = item.get("price", 0) * item.get("qty", 1)
+        total += amount
+        label = f"{item.get('qty', 1)} x {item.get('item', '')}"[:RECEIPT_WIDTH - 9]
+        lines.append(f"{label:<{RECEIPT_WIDTH - 9}}{amount:>9.2f}")
+    lines += ["-" * RECEIPT_WIDTH, f"{'TOTAL':<{RECEIPT_WIDTH - 9}}{total:>9.2f}"]
+    if order.get("notes"):
+        lines += ["", f"Notes: {order['notes']}"]
+    lines.append(footer)
+    return "\n".join(lines) + "\n"
+
+
+def render_to_files(template: dict, orders: List[dict], directory: str) -> List[str]:
+    """
+    Worker-side: renders and writes a batch of receipts, skipping ones already stored
+    """
+    paths = []
+    for order in orders:
+        path = receipt_path(receipt_key(template, order), directory)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a reader never sees a half-written receipt
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(render_receipt(order, template))
+            os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def build_archive(entries: List[Tuple[str, str]], archive_path: str) -> str:
+    """
+    Worker-side: zips (name in archive, file path) pairs
+    """
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in entries:
+            archive.write(path, arcname=name)
+    os.replace(tmp_path, archive_path)
+    return archive_path
+
+
+class ReceiptRenderer:
+    """
+    Renders receipts on a process pool (the work is pure-Python string
+    building, so threads would serialize on the GIL). Batches are split into
+    chunks of `batch_size` orders so one pool task amortizes the pickling.
+    """
+
+    def __init__(self, workers: Optional[int] = None, directory: Optional[str] = None, batch_size: int = 200):
+        self.workers = workers or int(os.getenv("RECEIPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.directory = directory or RECEIPTS_DIR
+        self.batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the module does not fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def render(self, order: dict, restaurant: Optional[dict] = None) -> str:
+        """
+        Returns the path of the order's receipt, rendering it only if it is not stored yet
+        """
+        template = receipt_template(restaurant)
+        path = receipt_path(receipt_key(template, order), self.directory)
+        if await asyncio.to_thread(os.path.exists, path):
+            RECEIPTS_RENDERED.inc(outcome="reused")
+            return path
+        RECEIPTS_RENDERED.inc(outcome="rendered")
+        paths = await asyncio.get_running_loop().run_in_executor(
+            self._pool(), render_to_files, template, [order], self.directory
+        )
+        return paths[0]
+
+    async def render_batch(self, orders: List[dict], restaurant: Optional[dict] = None) -> List[str]:
+        """
+        Renders many orders of one restaurant; returns their paths in order
+        """
+        if not orders:
+            return []
+        template = receipt_template(restaurant)
+        loop = asyncio.get_running_loop()
+        chunks = [orders[i:i + self.batch_size] for i in range(0, len(orders), self.batch_size)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._pool(), render_to_files, template, chunk, self.directory)
+            for chunk in chunks
+        ))
+        RECEIPTS_RENDERED.inc(len(orders), outcome="batch")
+        return [path for paths in results for path in paths]
+
+    async def archive(self, orders: List[dict], restaurant: Optional[dict], name: str) -> str:
+        """
+        Renders the orders and bundles their receipts into one zip; returns its path.
+        Archives are content-addressed too, so asking twice for an unchanged day is free.
+        """
+        paths = await self.render_batch(orders, restaurant)
+        entries = [(f"{order['_id']}.txt", path) for order, path in zip(orders, paths)]
+        digest = hashlib.sha256(json.dumps(entries).encode()).hexdigest()
+        archive_path = os.path.join(self.directory, "archives", f"{name}-{digest[:16]}.zip")
+        if await asyncio.to_thread(os.path.exists, archive_path):
+            return archive_path
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), build_archive, entries, archive_path)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+receipt_renderer = ReceiptRenderer()
+
+
+async def generate_receipt(order: dict, restaurant: Optional[dict] = None) -> str:
+    """
+    Renders and stores the receipt for an order; returns its path
+    """
+    return await receipt_renderer.render(order, restaurant)
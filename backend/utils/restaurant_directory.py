@@ -0,0 +1,119 @@
+import os
+import re
+from typing import Dict, Optional
+
+from bson import ObjectId
+
+from utils.db import db
+from utils.ttl_cache import TTLCache
+
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "1")
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Normalizes a phone number to E.164 (+<country><number>). Numbers without a
+    country code are assumed to be in DEFAULT_COUNTRY_CODE.
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    digits = re.sub(r"\D", "", phone)
+    if not digits:
+        return None
+    if phone.startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    if len(digits) == 10:
+        return f"+{DEFAULT_COUNTRY_CODE}{digits}"
+    return f"+{digits}"
+
+
+class RestaurantContext:
+    """
+    The restaurant handling a call, resolved once and passed through the
+    intent handlers so they do not fetch it again.
+    """
+
+    def __init__(self, restaurant: dict):
+        self.restaurant = restaurant
+        self.id = str(restaurant["_id"])
+        self.name = restaurant.get("name")
+        self.phone = normalize_phone(restaurant.get("phone"))
+
+    def get(self, key: str, default=None):
+        return self.restaurant.get(key, default)
+
+
+class RestaurantDirectory:
+    """
+    In-process routing table from inbound phone number (and id) to restaurant.
+
+    Entries expire after a TTL and are dropped explicitly when a restaurant is
+    created, updated or deleted. Unknown numbers are cached briefly too, so a
+    burst of calls to an unregistered number does not hammer Mongo.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, negative_ttl: Optional[float] = None, maxsize: int = 4096):
+        self.ttl = ttl or float(os.getenv("RESTAURANT_CACHE_TTL", "300"))
+        self.negative_ttl = negative_ttl or float(os.getenv("RESTAURANT_CACHE_NEGATIVE_TTL", "30"))
+        self._by_phone = TTLCache(self.ttl, maxsize)
+        self._by_id = TTLCache(self.ttl, maxsize)
+        self._phones_by_id: Dict[str, set] = {}
+
+    def _remember(self, context: RestaurantContext, phone_key: Optional[str] = None) -> None:
+        self._by_id.set(context.id, context)
+        keys = self._phones_by_id.setdefault(context.id, set())
+        for key in {phone_key, context.phone} - {None}:
+            self._by_phone.set(key, context)
+            keys.add(key)
+
+    async def by_phone(self, phone: Optional[str]) -> Optional[RestaurantContext]:
+        key = normalize_phone(phone)
+        if key is None:
+            return None
+        cached = self._by_phone.get(key, False)
+        if cached is not False:
+            return cached
+        restaurant = await db.restaurants.find_one({
+            "$or": [{"phone_e164": key}, {"phone": {"$in": list({phone, key})}}]
+        })
+        if restaurant is None:
+            self._by_phone.set(key, None, ttl=self.negative_ttl)
+            return None
+        context = RestaurantContext(restaurant)
+        self._remember(context, key)
+        return context
+
+    async def by_id(self, restaurant_id) -> Optional[RestaurantContext]:
+        cached = self._by_id.get(str(restaurant_id))
+        if cached is not None:
+            return cached
+        # Restaurants created through the API have ObjectId ids; callers pass strings
+        candidates = [restaurant_id]
+        if isinstance(restaurant_id, str) and ObjectId.is_valid(restaurant_id):
+            candidates.append(ObjectId(restaurant_id))
+        restaurant = await db.restaurants.find_one({"_id": {"$in": candidates}})
+        if restaurant is None:
+            return None
+        context = RestaurantContext(restaurant)
+        self._remember(context)
+        return context
+
+    def invalidate(self, restaurant_id) -> None:
+        """
+        Drops a restaurant from the table. Negative entries are cleared too,
+        since the change may have registered a previously unknown number.
+        """
+        restaurant_id = str(restaurant_id)
+        self._by_id.pop(restaurant_id)
+        for key in self._phones_by_id.pop(restaurant_id, set()):
+            self._by_phone.pop(key)
+        self.clear_negative()
+
+    def clear_negative(self) -> None:
+        self._by_phone.evict_if(lambda context: context is None)
+
+
+restaurant_directory = RestaurantDirectory()
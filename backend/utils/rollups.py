@@ -0,0 +1,214 @@
+"""
+Per-restaurant, per-day order counters for the dashboard.
+
+Each document in `daily_rollups` holds the totals for one restaurant on one
+UTC day (orders, gross, refunds, net). The order routes and the voice order
+path call apply_order_change() on every create, update and delete, so the
+dashboard reads one small document per day instead of scanning orders.
+
+Until a restaurant's rollups have been backfilled, load_daily_totals() falls
+back to a server-side aggregation over the orders themselves.
+
+Rebuild from order history with:
+
+    python -m utils.rollups backfill [--restaurant-id ID]
+"""
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from utils.db import db
+
+FIELDS = ("orders", "gross", "refunds", "net")
+ALL_RESTAURANTS = "*"
+
+# Restaurants known to have backfilled rollups (the marker never goes away)
+_backfilled = set()
+
+
+def order_gross(order: dict) -> float:
+    return sum(item.get("price", 0) * item.get("qty", 1) for item in order.get("items") or [])
+
+
+def order_contribution(order: dict) -> Optional[tuple]:
+    """
+    Returns (restaurant_id, day, counters) for an order, or None if it cannot be bucketed
+    """
+    timestamp = order.get("timestamp")
+    if not timestamp or not order.get("restaurant_id"):
+        return None
+    gross = order_gross(order)
+    refunds = float(order.get("refunds") or 0)
+    counters = {"orders": 1, "gross": gross, "refunds": refunds, "net": gross - refunds}
+    return str(order["restaurant_id"]), timestamp[:10], counters
+
+
+def rollup_id(restaurant_id: str, day: str) -> str:
+    return f"{restaurant_id}:{day}"
+
+
+async def _increment(restaurant_id: str, day: str, counters: Dict[str, float], sign: int) -> None:
+    await db.daily_rollups.update_one(
+        {"_id": rollup_id(restaurant_id, day)},
+        {
+            "$inc": {field: sign * counters[field] for field in FIELDS},
+            "$setOnInsert": {"restaurant_id": restaurant_id, "date": day}
+        },
+        upsert=True
+    )
+
+
+async def apply_order_change(old: Optional[dict], new: Optional[dict]) -> None:
+    """
+    Moves an order's contribution from `old` to `new`. Pass old=None on
+    create and new=None on delete.
+    """
+    before = order_contribution(old) if old else None
+    after = order_contribution(new) if new else None
+    if before == after:
+        return
+    if before:
+        await _increment(*before, sign=-1)
+    if after:
+        await _increment(*after, sign=1)
+
+
+async def apply_order_created(order: dict) -> None:
+    """
+    Counts a new order exactly once, for callers that retry (the post-call
+    job). The order id is pushed onto the day's applied_orders in the same
+    update as the increment, so a repeated update matches nothing.
+    """
+    contribution = order_contribution(order)
+    if not contribution:
+        return
+    restaurant_id, day, counters = contribution
+    query = {"_id": rollup_id(restaurant_id, day), "applied_orders": {"$ne": order["_id"]}}
+    update = {
+        "$inc": {field: counters[field] for field in FIELDS},
+        "$push": {"applied_orders": order["_id"]},
+        "$setOnInsert": {"restaurant_id": restaurant_id, "date": day}
+    }
+    try:
+        await db.daily_rollups.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # The day already exists: it lists this order, or another order created
+        # it first. Mongo does not retry a non-equality upsert, so retry without
+        # upsert; matching nothing then means the order was already counted.
+        await db.daily_rollups.update_one(query, update)
+
+
+def daily_totals_pipeline(match: dict) -> List[dict]:
+    """
+    Aggregation that buckets matching orders by restaurant and day on the
+    server, returning only per-day counters. Item totals are summed per order
+    with $map rather than $unwind, so orders are not fanned out per item.
+    """
+    return [
+        {"$match": match},
+        {"$project": {
+            "restaurant_id": 1,
+            "day": {"$substrCP": ["$timestamp", 0, 10]},
+            "refunds": {"$ifNull": ["$refunds", 0]},
+            "gross": {"$sum": {"$map": {
+                "input": {"$ifNull": ["$items", []]},
+                "as": "item",
+                "in": {"$multiply": [{"$ifNull": ["$$item.price", 0]}, {"$ifNull": ["$$item.qty", 1]}]}
+            }}}
+        }},
+        {"$group": {
+            "_id": {"restaurant_id": "$restaurant_id", "date": "$day"},
+            "orders": {"$sum": 1},
+            "gross": {"$sum": "$gross"},
+            "refunds": {"$sum": "$refunds"}
+        }}
+    ]
+
+
+async def aggregate_daily_totals(match: dict, database=db) -> Dict[tuple, Dict[str, float]]:
+    """
+    Runs daily_totals_pipeline and returns counters keyed by (restaurant_id, day)
+    """
+    # Orders without a timestamp cannot be bucketed by day
+    match = {"timestamp": {"$type": "string"}, **match}
+    totals = {}
+    async for row in database.orders.aggregate(daily_totals_pipeline(match)):
+        counters = {"orders": row["orders"], "gross": row["gross"], "refunds": row["refunds"]}
+        counters["net"] = counters["gross"] - counters["refunds"]
+        totals[(str(row["_id"]["restaurant_id"]), row["_id"]["date"])] = counters
+    return totals
+
+
+async def rollups_ready(restaurant_id: str) -> bool:
+    if restaurant_id in _backfilled:
+        return True
+    status = await db.rollup_status.find_one({"_id": {"$in": [ALL_RESTAURANTS, restaurant_id]}})
+    if status:
+        _backfilled.add(restaurant_id)
+    return status is not None
+
+
+async def load_daily_totals(restaurant_id: str, start: date, end: date, database=db) -> Dict[str, dict]:
+    """
+    Returns per-day counters for [start, end] keyed by YYYY-MM-DD, from the
+    rollups when they have been backfilled and from the orders otherwise.
+    Pass database=reporting_db to read from secondaries.
+    """
+    if await rollups_ready(restaurant_id):
+        return await load_daily_rollups(restaurant_id, start, end, database)
+    totals = await aggregate_daily_totals({
+        "restaurant_id": restaurant_id,
+        "timestamp": {"$gte": start.isoformat(), "$lt": (end + timedelta(days=1)).isoformat()}
+    }, database)
+    return {day: counters for (_, day), counters in totals.items()}
+
+
+async def load_daily_rollups(restaurant_id: str, start: date, end: date, database=db) -> Dict[str, dict]:
+    """
+    Returns rollup documents for [start, end] keyed by YYYY-MM-DD
+    """
+    cursor = database.daily_rollups.find({
+        "restaurant_id": restaurant_id,
+        "date": {"$gte": start.isoformat(), "$lte": end.isoformat()}
+    }, {"applied_orders": 0})
+    return {doc["date"]: doc async for doc in cursor}
+
+
+async def backfill(restaurant_id: Optional[str] = None) -> int:
+    """
+    Rebuilds rollups from the orders collection; returns the number of day documents written.
+    Run while order writes are paused, or live increments during the rebuild may be lost.
+    """
+    query = {"restaurant_id": restaurant_id} if restaurant_id else {}
+    totals = await aggregate_daily_totals(query, db)
+
+    await db.daily_rollups.delete_many(query)
+    operations = [
+        ReplaceOne(
+            {"_id": rollup_id(rid, day)},
+            {"restaurant_id": rid, "date": day, **counters},
+            upsert=True
+        )
+        for (rid, day), counters in totals.items()
+    ]
+    for i in range(0, len(operations), 1000):
+        await db.daily_rollups.bulk_write(operations[i:i + 1000], ordered=False)
+    await db.rollup_status.update_one(
+        {"_id": restaurant_id or ALL_RESTAURANTS},
+        {"$set": {"backfilled_at": datetime.utcnow().isoformat()}},
+        upsert=True
+    )
+    return len(operations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily order rollup maintenance")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--restaurant-id", default=None)
+    args = parser.parse_args()
+    written = asyncio.run(backfill(args.restaurant_id))
+    print(f"Rebuilt {written} daily rollup documents")
@@ -0,0 +1,165 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from utils.elevenlabs_client import ElevenLabsClient
+
+
+class TTSCache:
+    """
+    Content-addressed cache for synthesized speech.
+
+    Entries are keyed by a hash of (voice_id, voice_settings, text) and kept in
+    two tiers: a small in-memory LRU of mp3 bytes, and a directory of mp3 files
+    whose total size is capped by evicting the least recently used files.
+    """
+
+    def __init__(
+        self,
+        client: ElevenLabsClient,
+        cache_dir: Optional[str] = None,
+        max_memory_items: Optional[int] = None,
+        max_disk_bytes: Optional[int] = None
+    ):
+        self.client = client
+        self.cache_dir = cache_dir or os.getenv("TTS_CACHE_DIR", "cache/tts")
+        self.max_memory_items = max_memory_items or int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "64"))
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk_sizes: Dict[str, int] = {}
+        self._disk_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    def _scan_disk(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        # Oldest first so dict order doubles as LRU order
+        for _, key, size in sorted(entries):
+            self._disk_sizes[key] = size
+            self._disk_bytes += size
+
+    def key_for(self, text: str) -> str:
+        material = json.dumps(
+            {
+                "voice_id": self.client.voice_id,
+                "voice_settings": self.client.voice_settings,
+                "text": text
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+        return audio
+
+    def has_disk(self, key: str) -> bool:
+        return key in self._disk_sizes
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _touch_disk(self, key: str) -> None:
+        self._disk_sizes[key] = self._disk_sizes.pop(key)
+        try:
+            os.utime(self.path_for(key))
+        except OSError:
+            pass
+
+    def _store_disk(self, key: str, audio: bytes) -> None:
+        tmp_path = self.path_for(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, self.path_for(key))
+        self._disk_bytes += len(audio) - self._disk_sizes.pop(key, 0)
+        self._disk_sizes[key] = len(audio)
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_sizes) > 1:
+            oldest = next(iter(self._disk_sizes))
+            self._disk_bytes -= self._disk_sizes.pop(oldest)
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self.path_for(oldest))
+            except OSError as e:
+                logging.warning(f"Failed to evict cached TTS audio {oldest}: {e}")
+
+    async def get_or_synthesize(self, text: str) -> str:
+        """
+        Returns the cache key for `text`, synthesizing it on a miss.
+        Concurrent misses for the same text share a single synthesis call.
+        """
+        key = self.key_for(text)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return key
+        if key in self._disk_sizes:
+            self._touch_disk(key)
+            self.stats["disk_hits"] += 1
+            return key
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            await pending
+            self.stats["memory_hits"] += 1
+            return key
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            audio = await self.client.synthesize_bytes(text)
+            self._remember(key, audio)
+            self._store_disk(key, audio)
+            future.set_result(key)
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise; mark retrieved so an unawaited failure is not logged twice
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        return key
+
+    async def prewarm(self, texts: Iterable[str]) -> None:
+        """
+        Synthesizes the given prompts ahead of time, logging (not raising) failures.
+        """
+        texts = list(texts)
+        results = await asyncio.gather(
+            *(self.get_or_synthesize(text) for text in texts),
+            return_exceptions=True
+        )
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                logging.warning(f"TTS cache pre-warm failed for {text[:40]!r}: {result}")
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._disk_sizes),
+            "disk_bytes": self._disk_bytes
+        }
@@ -1,68 +1,159 @@
 import os
+import random
+import asyncio
 import aiohttp
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import Counter, Gauge, span
+
+DEFAULT_BASE_URL = "https://api.vapi.ai/call"
+
+VAPI_RETRIES = Counter("vapi_retries_total", "VAPI request attempts that were retried", ("operation",))
+
+
+class VAPIError(Exception):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"VAPI request failed with {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
 
 class VAPIClient:
-    def __init__(self):
+    """
+    Async VAPI client over one long-lived keep-alive session.
+
+    Idempotent operations are retried with full-jitter exponential backoff
+    on timeouts, connection errors, 429 and 5xx. Non-idempotent ones
+    (create_call, send_message) are only retried when the connection could
+    not be established, since then VAPI never saw the request. A circuit
+    breaker fails calls fast with CircuitOpenError while VAPI is degraded.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
         self.api_key = os.getenv("VAPI_API_KEY")
-        self.base_url = "https://api.vapi.ai/call"
+        self.base_url = (base_url or os.getenv("VAPI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.max_connections = int(os.getenv("VAPI_MAX_CONNECTIONS", "20"))
+        self.timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv("VAPI_TIMEOUT", "10")),
+            connect=float(os.getenv("VAPI_CONNECT_TIMEOUT", "3"))
+        )
+        self.max_retries = int(os.getenv("VAPI_MAX_RETRIES", "2"))
+        self.retry_base_delay = float(os.getenv("VAPI_RETRY_BASE_DELAY", "0.2"))
+        self.retry_max_delay = float(os.getenv("VAPI_RETRY_MAX_DELAY", "2"))
+        self.breaker = CircuitBreaker(
+            "vapi",
+            failure_threshold=int(os.getenv("VAPI_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("VAPI_BREAKER_RESET", "30"))
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
 
-    async def create_call(self, phone_number: str, restaurant_id: str) -> Dict[str, Any]:
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session. Called from the app lifespan on shutdown.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.retry_max_delay)
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def _request(self, operation: str, path: str, payload: Optional[dict] = None, idempotent: bool = False) -> Dict[str, Any]:
+        session = self._get_session()
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            retry_after = None
+            try:
+                async with span("vapi"), session.post(url, json=payload) as response:
+                    if response.status < 500 and response.status != 429:
+                        # VAPI answered; a 4xx is our problem, not an outage. The body
+                        # is read before the verdict so a failed read is not also a success.
+                        if response.status >= 400:
+                            body = await response.text()
+                            self.breaker.record_success()
+                            raise VAPIError(response.status, body)
+                        result = await response.json(content_type=None)
+                        self.breaker.record_success()
+                        return result
+                    retry_after = response.headers.get("Retry-After")
+                    error = VAPIError(response.status, await response.text())
+                retryable = idempotent
+            except aiohttp.ClientConnectorError as e:
+                # The request never reached VAPI, so retrying cannot duplicate it
+                error, retryable = e, True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error, retryable = e, idempotent
+            except BaseException:
+                # Cancelled, a 4xx already recorded, or a 2xx body that is not JSON:
+                # no new verdict on VAPI,
+                # but a half-open trial must not stay in flight
+                self.breaker.release()
+                raise
+
+            self.breaker.record_failure()
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            VAPI_RETRIES.inc(operation=operation)
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    async def create_call(
+        self,
+        phone_number: str,
+        restaurant_id: str,
+        first_message: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Initiates a call using VAPI
         """
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "phoneNumber": phone_number,
-                "metadata": {
-                    "restaurant_id": restaurant_id
+        payload = {
+            "phoneNumber": phone_number,
+            "metadata": {
+                **(metadata or {}),
+                "restaurant_id": restaurant_id
+            },
+            "config": {
+                "speechRecognition": {
+                    "provider": "deepgram"
                 },
-                "config": {
-                    "speechRecognition": {
-                        "provider": "deepgram"
-                    },
-                    "synthesizer": {
-                        "provider": "elevenlabs",  # Using ElevenLabs for higher quality voice
-                        "voice_id": os.getenv("ELEVENLABS_VOICE_ID")
-                    }
-                },
-                "firstMessage": "Hello! Welcome to our restaurant. How may I help you today?"
-            }
-            
-            async with session.post(
-                self.base_url,
-                json=payload,
-                headers=self.headers
-            ) as response:
-                return await response.json()
+                "synthesizer": {
+                    "provider": "elevenlabs",  # Using ElevenLabs for higher quality voice
+                    "voice_id": os.getenv("ELEVENLABS_VOICE_ID")
+                }
+            },
+            "firstMessage": first_message or "Hello! Welcome to our restaurant. How may I help you today?"
+        }
+        return await self._request("create_call", "", payload)
 
     async def send_message(self, call_id: str, message: str) -> Dict[str, Any]:
         """
         Sends a message during an active call
         """
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "text": message
-            }
-            
-            async with session.post(
-                f"{self.base_url}/{call_id}/send-message",
-                json=payload,
-                headers=self.headers
-            ) as response:
-                return await response.json()
+        return await self._request("send_message", f"/{call_id}/send-message", {"text": message})
 
     async def end_call(self, call_id: str) -> Dict[str, Any]:
         """
-        Ends an active call
+        Ends an active call (safe to retry: ending an ended call is a no-op)
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.base_url}/{call_id}/end",
-                headers=self.headers
-            ) as response:
-                return await response.json()
\ No newline at end of file
+        return await self._request("end_call", f"/{call_id}/end", idempotent=True)
+
+
+vapi_client = VAPIClient()
+Gauge("vapi_circuit_open", "1 while the VAPI circuit breaker is open",
+      function=lambda: int(vapi_client.breaker.state != CircuitBreaker.CLOSED))
@@ -0,0 +1,271 @@
+import io
+import re
+import json
+import time
+import wave
+import base64
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import openai
+
+from utils.elevenlabs_client import ElevenLabsClient
+from utils.metrics import span
+
+# Twilio Media Streams carry 8 kHz mono mu-law audio in 20 ms frames
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+
+
+def _ulaw_to_linear(byte: int) -> int:
+    byte = ~byte & 0xFF
+    sign = byte & 0x80
+    exponent = (byte >> 4) & 0x07
+    mantissa = byte & 0x0F
+    sample = ((mantissa << 3) + 0x84) << exponent
+    sample -= 0x84
+    return -sample if sign else sample
+
+
+ULAW_MAGNITUDE = [abs(_ulaw_to_linear(b)) for b in range(256)]
+
+
+class SpeechSegmenter:
+    """
+    Energy-based endpointing over mu-law frames. push() returns the buffered
+    utterance once `silence_ms` of quiet follows at least `min_speech_ms` of speech.
+    """
+
+    def __init__(self, threshold: int = 600, silence_ms: int = 600, min_speech_ms: int = 200):
+        self.threshold = threshold
+        self.silence_frames = silence_ms // FRAME_MS
+        self.min_speech_frames = min_speech_ms // FRAME_MS
+        self._buffer = bytearray()
+        self._speech_frames = 0
+        self._trailing_silence = 0
+
+    def push(self, frame: bytes) -> Optional[bytes]:
+        energy = sum(ULAW_MAGNITUDE[b] for b in frame) / max(len(frame), 1)
+        if energy >= self.threshold:
+            self._speech_frames += 1
+            self._trailing_silence = 0
+            self._buffer.extend(frame)
+            return None
+        if self._speech_frames == 0:
+            return None
+        self._buffer.extend(frame)
+        self._trailing_silence += 1
+        if self._trailing_silence < self.silence_frames:
+            return None
+        if self._speech_frames < self.min_speech_frames:
+            # A click or cough, not speech
+            self._reset()
+            return None
+        return self.flush()
+
+    def flush(self) -> Optional[bytes]:
+        utterance = bytes(self._buffer) if self._speech_frames else None
+        self._reset()
+        return utterance
+
+    def _reset(self) -> None:
+        self._buffer = bytearray()
+        self._speech_frames = 0
+        self._trailing_silence = 0
+
+
+def ulaw_to_wav(audio: bytes) -> io.BytesIO:
+    """
+    Wraps raw mu-law samples in a WAV container (format tag 7) for Whisper
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(1)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b"")
+    header = bytearray(buffer.getvalue())
+    # wave only writes PCM headers; patch the format tag to mu-law
+    header[20:22] = (7).to_bytes(2, "little")
+    header[4:8] = (36 + len(audio)).to_bytes(4, "little")
+    header[40:44] = len(audio).to_bytes(4, "little")
+    wav_file = io.BytesIO(bytes(header) + audio)
+    wav_file.name = "utterance.wav"
+    return wav_file
+
+
+class WhisperSTT:
+    async def transcribe(self, audio: bytes) -> str:
+        async with span("whisper"):
+            response = await openai.Audio.atranscribe("whisper-1", ulaw_to_wav(audio))
+        return response["text"]
+
+
+class OpenAIStreamingLLM:
+    def __init__(self, model: str = "gpt-4"):
+        self.model = model
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        # The span covers time to the first streamed byte, not the whole answer
+        async with span("gpt_stream"):
+            response = await openai.ChatCompletion.acreate(model=self.model, messages=messages, stream=True)
+        async for chunk in response:
+            delta = chunk["choices"][0]["delta"].get("content")
+            if delta:
+                yield delta
+
+
+class ElevenLabsStreamingTTS:
+    def __init__(self, client: ElevenLabsClient):
+        self.client = client
+
+    def stream(self, text: str) -> AsyncIterator[bytes]:
+        return self.client.stream(text, output_format="ulaw_8000")
+
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+async def iter_sentences(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Regroups streamed LLM tokens into sentences so TTS can start on the first
+    sentence while later ones are still being generated.
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        parts = SENTENCE_END.split(buffer)
+        for sentence in parts[:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+        buffer = parts[-1]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class MediaStreamSession:
+    """
+    Drives one Twilio Media Streams call: segments inbound audio into
+    utterances, transcribes each one, streams the LLM reply sentence by
+    sentence into TTS and sends audio frames back as soon as they exist.
+
+    Providers are duck-typed (stt.transcribe, llm.stream, tts.stream) so the
+    offline harness can swap in fakes. Per-turn timings land in `turns`.
+    """
+
+    def __init__(
+        self,
+        stt,
+        llm,
+        tts,
+        send_text: Callable[[str], Awaitable[None]],
+        system_prompt_for: Optional[Callable[[dict], Awaitable[str]]] = None,
+        segmenter: Optional[SpeechSegmenter] = None
+    ):
+        self.stt = stt
+        self.llm = llm
+        self.tts = tts
+        self.send_text = send_text
+        self.system_prompt_for = system_prompt_for
+        self.segmenter = segmenter or SpeechSegmenter()
+        self.stream_sid: Optional[str] = None
+        self.history: List[Dict[str, str]] = []
+        self.turns: List[Dict[str, float]] = []
+        self._turn_task: Optional[asyncio.Task] = None
+
+    async def run(self, receive_text: Callable[[], Awaitable[str]]) -> None:
+        while True:
+            message = json.loads(await receive_text())
+            event = message.get("event")
+            if event == "start":
+                await self._on_start(message["start"])
+            elif event == "media":
+                await self._on_media(base64.b64decode(message["media"]["payload"]))
+            elif event == "stop":
+                break
+
+    async def close(self) -> None:
+        if self._turn_task is not None and not self._turn_task.done():
+            self._turn_task.cancel()
+            try:
+                await self._turn_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _on_start(self, start: dict) -> None:
+        self.stream_sid = start.get("streamSid")
+        system_prompt = "You are a friendly restaurant phone assistant. Reply in one or two short spoken sentences."
+        if self.system_prompt_for is not None:
+            system_prompt = await self.system_prompt_for(start.get("customParameters", {}))
+        self.history = [{"role": "system", "content": system_prompt}]
+
+    async def _on_media(self, frame: bytes) -> None:
+        utterance = self.segmenter.push(frame)
+        if utterance is None:
+            return
+        if self._turn_task is not None and not self._turn_task.done():
+            # Caller spoke over the reply: stop talking and answer the new utterance
+            self._turn_task.cancel()
+            await self.send_text(json.dumps({"event": "clear", "streamSid": self.stream_sid}))
+        self._turn_task = asyncio.create_task(self._respond(utterance, time.perf_counter()))
+
+    async def _send_audio(self, chunk: bytes) -> None:
+        await self.send_text(json.dumps({
+            "event": "media",
+            "streamSid": self.stream_sid,
+            "media": {"payload": base64.b64encode(chunk).decode("ascii")}
+        }))
+
+    async def _respond(self, utterance: bytes, utterance_end: float) -> None:
+        timings: Dict[str, float] = {}
+        try:
+            text = await self.stt.transcribe(utterance)
+            timings["stt"] = time.perf_counter() - utterance_end
+            if not text.strip():
+                return
+            self.history.append({"role": "user", "content": text})
+
+            sentences: asyncio.Queue = asyncio.Queue()
+            reply: List[str] = []
+
+            async def produce():
+                try:
+                    async for sentence in iter_sentences(self.llm.stream(list(self.history))):
+                        if "llm_first_sentence" not in timings:
+                            timings["llm_first_sentence"] = time.perf_counter() - utterance_end
+                        reply.append(sentence)
+                        await sentences.put(sentence)
+                finally:
+                    await sentences.put(None)
+
+            producer = asyncio.create_task(produce())
+            try:
+                while True:
+                    sentence = await sentences.get()
+                    if sentence is None:
+                        break
+                    async for chunk in self.tts.stream(sentence):
+                        if "first_audio" not in timings:
+                            timings["first_audio"] = time.perf_counter() - utterance_end
+                        await self._send_audio(chunk)
+                await producer
+            finally:
+                if not producer.done():
+                    producer.cancel()
+
+            self.history.append({"role": "assistant", "content": " ".join(reply)})
+            await self.send_text(json.dumps({
+                "event": "mark",
+                "streamSid": self.stream_sid,
+                "mark": {"name": f"turn-{len(self.turns)}"}
+            }))
+            timings["total"] = time.perf_counter() - utterance_end
+        except asyncio.CancelledError:
+            timings["interrupted"] = 1.0
+            raise
+        except Exception as e:
+            logging.error(f"Media stream turn failed: {e}")
+        finally:
+            if timings:
+                self.turns.append(timings)